@@ -1,34 +1,35 @@
-import sys
-import yaml
+import argparse
 
-from src.ingestion.create_schema import create_star_schema, create_staging_table
-from src.ingestion.load_staging import load_staging_table
-from src.ingestion.populate_star_schema import populate_star_schema
-from src.prepocessessing.preprocess import preprocess_data
-from src.model_development.model_development import develop_model
+from src.pipeline import STAGES, run_pipeline
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the fraud detection pipeline end to end")
+    parser.add_argument("csv_file_path", nargs="?", help="Raw PaySim CSV (defaults to data.raw_csv in config.yaml)")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep existing tables, append the CSV to staging and load only steps past the star schema watermark",
+    )
+    stages = parser.add_mutually_exclusive_group()
+    stages.add_argument("--from-stage", choices=STAGES, help="Rerun this stage and every stage after it")
+    stages.add_argument("--only", nargs="+", choices=STAGES, help="Rerun just these stages")
+    parser.add_argument("--force", action="store_true", help="Rerun every stage even if its inputs are unchanged")
+    return parser.parse_args()
 
 
 def main():
-    # 1. Database schema + staging
-    create_star_schema()
-    create_staging_table()
-
-    # 2. Determine CSV source (CLI arg overrides config)
-    if len(sys.argv) > 1:
-        csv_file_path = sys.argv[1]
-    else:
-        config = yaml.safe_load(open("config/config.yaml"))
-        csv_file_path = config.get("data", {}).get("raw_csv", "data/raw/paysim1.csv")
-
-    # 3. Ingest into staging and populate star schema
-    load_staging_table(csv_file_path)
-    populate_star_schema()
-
-    # 4. Preprocess data into features/labels CSV
-    preprocess_data()
-
-    # 5. Train and evaluate model, saving artifact to models/fraud_detector.joblib
-    develop_model()
+    args = parse_args()
+
+    # Stages: schema -> staging -> star_schema -> preprocess -> train.
+    # Each one is skipped when its fingerprint (upstream result, CSV, config section, code) is unchanged
+    run_pipeline(
+        csv_file_path=args.csv_file_path,
+        incremental=args.incremental,
+        from_stage=args.from_stage,
+        only=args.only,
+        force=args.force,
+    )
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 DROP TABLE IF EXISTS staging_transactions;
 
-CREATE TABLE staging_transactions (
-  id CHAR(36) NOT NULL DEFAULT (UUID()) PRIMARY KEY,
+CREATE TABLE IF NOT EXISTS staging_transactions (
+  id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
   step INT NOT NULL,
   type ENUM('CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER') NOT NULL,
   amount DECIMAL(15, 2) NOT NULL,
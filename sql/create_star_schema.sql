@@ -3,39 +3,42 @@ DROP TABLE IF EXISTS dim_account;
 DROP TABLE IF EXISTS dim_transaction_type;
 DROP TABLE IF EXISTS dim_time;
 
-CREATE TABLE dim_transaction_type (
-  id CHAR(36) NOT NULL DEFAULT (UUID()) PRIMARY KEY,
+-- Integer surrogate keys: compact, sequential primary keys and integer joins.
+-- Natural keys stay unique so every dimension lookup is a single index probe.
+CREATE TABLE IF NOT EXISTS dim_transaction_type (
+  id TINYINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
   type_name ENUM('CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER') UNIQUE NOT NULL,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Pre populate dim_transaction_type
-INSERT INTO dim_transaction_type (type_name) VALUES ('CASH_IN'), ('CASH_OUT'), ('DEBIT'), ('PAYMENT'), ('TRANSFER');
+-- Pre populate dim_transaction_type (no-op when the rows already exist)
+INSERT IGNORE INTO dim_transaction_type (type_name) VALUES ('CASH_IN'), ('CASH_OUT'), ('DEBIT'), ('PAYMENT'), ('TRANSFER');
 
-CREATE TABLE dim_time (
-  id CHAR(36) NOT NULL DEFAULT (UUID()) PRIMARY KEY,
+CREATE TABLE IF NOT EXISTS dim_time (
+  id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
   step INT NOT NULL,
   hour INT NOT NULL,
   day INT NOT NULL,
-  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE KEY uq_step (step)
 );
 
-CREATE TABLE dim_account (
-  id CHAR(36) NOT NULL DEFAULT (UUID()) PRIMARY KEY,
+CREATE TABLE IF NOT EXISTS dim_account (
+  id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
   account_id VARCHAR(255) NOT NULL,
   account_type ENUM('C', 'M') NOT NULL,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-  INDEX idx_account_id (account_id)
+  UNIQUE KEY uq_account_id (account_id)
 );
 
-CREATE TABLE fact_transactions (
-  id CHAR(36) NOT NULL DEFAULT (UUID()) PRIMARY KEY,
+CREATE TABLE IF NOT EXISTS fact_transactions (
+  id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
 
   -- Foreign keys to dimension tables
-  time_key CHAR(36) NOT NULL,
-  type_key CHAR(36) NOT NULL,
-  origin_account_key CHAR(36) NOT NULL,
-  destination_account_key CHAR(36) NOT NULL,
+  time_key INT UNSIGNED NOT NULL,
+  type_key TINYINT UNSIGNED NOT NULL,
+  origin_account_key INT UNSIGNED NOT NULL,
+  destination_account_key INT UNSIGNED NOT NULL,
 
   -- Measures
   amount DECIMAL(15, 2) NOT NULL,
@@ -62,4 +65,17 @@ CREATE TABLE fact_transactions (
   INDEX idx_type (type_key),
   INDEX idx_origin (origin_account_key),
   INDEX idx_destination (destination_account_key)
-);
\ No newline at end of file
+);
+
+-- Incremental loads: high-water mark of what is already in the star schema
+CREATE TABLE IF NOT EXISTS etl_watermarks (
+  name VARCHAR(64) NOT NULL PRIMARY KEY,
+  high_water_mark BIGINT NOT NULL,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Applied files from sql/migrations, see src/ingestion/migrate_schema.py
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version VARCHAR(128) NOT NULL PRIMARY KEY,
+  applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,131 @@
+-- Migrate the star schema from CHAR(36) UUID keys to integer surrogate keys.
+--
+-- New tables are built next to the old ones, facts are re-keyed by joining through the
+-- natural keys (step, type_name, account_id), and all tables are swapped in one atomic
+-- RENAME. Duplicate dimension members collapse into one row via the new unique keys.
+-- Leftovers of an interrupted run are dropped first, so the file can simply be re-run.
+
+DROP TABLE IF EXISTS fact_transactions_v2;
+DROP TABLE IF EXISTS dim_account_v2;
+DROP TABLE IF EXISTS dim_transaction_type_v2;
+DROP TABLE IF EXISTS dim_time_v2;
+DROP TABLE IF EXISTS fact_transactions_old;
+DROP TABLE IF EXISTS dim_account_old;
+DROP TABLE IF EXISTS dim_transaction_type_old;
+DROP TABLE IF EXISTS dim_time_old;
+
+CREATE TABLE dim_transaction_type_v2 (
+  id TINYINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  type_name ENUM('CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER') UNIQUE NOT NULL,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT IGNORE INTO dim_transaction_type_v2 (type_name, created_at)
+SELECT type_name, created_at FROM dim_transaction_type ORDER BY type_name;
+
+CREATE TABLE dim_time_v2 (
+  id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  step INT NOT NULL,
+  hour INT NOT NULL,
+  day INT NOT NULL,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE KEY uq_step (step)
+);
+
+INSERT IGNORE INTO dim_time_v2 (step, hour, day, created_at)
+SELECT step, hour, day, created_at FROM dim_time ORDER BY step;
+
+CREATE TABLE dim_account_v2 (
+  id INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  account_id VARCHAR(255) NOT NULL,
+  account_type ENUM('C', 'M') NOT NULL,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE KEY uq_account_id (account_id)
+);
+
+INSERT IGNORE INTO dim_account_v2 (account_id, account_type, created_at)
+SELECT account_id, account_type, created_at FROM dim_account ORDER BY account_id;
+
+CREATE TABLE fact_transactions_v2 (
+  id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  time_key INT UNSIGNED NOT NULL,
+  type_key TINYINT UNSIGNED NOT NULL,
+  origin_account_key INT UNSIGNED NOT NULL,
+  destination_account_key INT UNSIGNED NOT NULL,
+  amount DECIMAL(15, 2) NOT NULL,
+  old_balance_orig DECIMAL(15, 2) NOT NULL DEFAULT 0,
+  new_balance_orig DECIMAL(15, 2) NOT NULL DEFAULT 0,
+  old_balance_dest DECIMAL(15, 2) NOT NULL DEFAULT 0,
+  new_balance_dest DECIMAL(15, 2) NOT NULL DEFAULT 0,
+  is_fraud TINYINT(1) NOT NULL DEFAULT 0,
+  is_flagged_fraud TINYINT(1) NOT NULL DEFAULT 0,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (time_key) REFERENCES dim_time_v2(id),
+  FOREIGN KEY (type_key) REFERENCES dim_transaction_type_v2(id),
+  FOREIGN KEY (origin_account_key) REFERENCES dim_account_v2(id),
+  FOREIGN KEY (destination_account_key) REFERENCES dim_account_v2(id),
+  INDEX idx_fraud (is_fraud),
+  INDEX idx_time (time_key),
+  INDEX idx_type (type_key),
+  INDEX idx_origin (origin_account_key),
+  INDEX idx_destination (destination_account_key)
+);
+
+INSERT INTO fact_transactions_v2 (
+  time_key,
+  type_key,
+  origin_account_key,
+  destination_account_key,
+  amount,
+  old_balance_orig,
+  new_balance_orig,
+  old_balance_dest,
+  new_balance_dest,
+  is_fraud,
+  is_flagged_fraud,
+  created_at
+)
+SELECT
+  dt2.id,
+  tt2.id,
+  da_orig2.id,
+  da_dest2.id,
+  ft.amount,
+  ft.old_balance_orig,
+  ft.new_balance_orig,
+  ft.old_balance_dest,
+  ft.new_balance_dest,
+  ft.is_fraud,
+  ft.is_flagged_fraud,
+  ft.created_at
+FROM fact_transactions ft
+INNER JOIN dim_time dt ON ft.time_key = dt.id
+INNER JOIN dim_time_v2 dt2 ON dt.step = dt2.step
+INNER JOIN dim_transaction_type tt ON ft.type_key = tt.id
+INNER JOIN dim_transaction_type_v2 tt2 ON tt.type_name = tt2.type_name
+INNER JOIN dim_account da_orig ON ft.origin_account_key = da_orig.id
+INNER JOIN dim_account_v2 da_orig2 ON da_orig.account_id = da_orig2.account_id
+INNER JOIN dim_account da_dest ON ft.destination_account_key = da_dest.id
+INNER JOIN dim_account_v2 da_dest2 ON da_dest.account_id = da_dest2.account_id
+ORDER BY dt.step;
+
+RENAME TABLE
+  fact_transactions TO fact_transactions_old,
+  dim_account TO dim_account_old,
+  dim_transaction_type TO dim_transaction_type_old,
+  dim_time TO dim_time_old,
+  dim_time_v2 TO dim_time,
+  dim_transaction_type_v2 TO dim_transaction_type,
+  dim_account_v2 TO dim_account,
+  fact_transactions_v2 TO fact_transactions;
+
+DROP TABLE fact_transactions_old;
+DROP TABLE dim_account_old;
+DROP TABLE dim_transaction_type_old;
+DROP TABLE dim_time_old;
+
+-- Staging is rebuilt on every full load, so only its key type changes
+ALTER TABLE staging_transactions
+  DROP PRIMARY KEY,
+  DROP COLUMN id,
+  ADD COLUMN id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST;
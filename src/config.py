@@ -0,0 +1,173 @@
+# System
+import logging
+from pathlib import Path
+from functools import lru_cache
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional
+# Config
+import yaml
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+CONFIG_PATH = 'config/config.yaml'
+
+@dataclass( frozen = True )
+class DatabaseConfig:
+  user: str
+  password: str = field( repr = False )
+  database: str
+  host: str = '127.0.0.1'
+  port: int = 3306
+  # Shared pool, sized for the most concurrent stage (ingestion writers or fact workers)
+  pool_size: int = 5
+  max_overflow: int = 10
+  pool_timeout: float = 30.0
+  pool_recycle: int = 3600
+  pool_pre_ping: bool = True
+
+  @property
+  def url( self ) -> str:
+    return f"mysql+pymysql://{ self.user }:{ self.password }@{ self.host }:{ self.port }/{ self.database }"
+
+@dataclass( frozen = True )
+class DataConfig:
+  raw_csv: str = 'data/raw/paysim1.csv'
+  # Handoff from preprocessing to training: npy (memory-mapped), parquet or csv
+  processed_format: str = 'npy'
+  processed_path: Optional[ str ] = None
+
+@dataclass( frozen = True )
+class IngestionConfig:
+  method: str = 'auto'
+  chunk_size: int = 10000
+  max_chunk_size: int = 100000
+  workers: int = 1
+  queue_size: int = 8
+  commit_every: int = 1
+  csv_engine: str = 'c'
+  validate_rows: bool = True
+  on_invalid_rows: str = 'abort'
+  reject_file: str = 'data/rejected/staging_rejects.csv'
+
+@dataclass( frozen = True )
+class StarSchemaConfig:
+  fact_batch_steps: int = 24
+  fact_workers: int = 1
+
+@dataclass( frozen = True )
+class PreprocessingConfig:
+  streaming: bool = True
+  chunk_size: int = 100000
+  # Reuse the saved feature pipeline when there is one; True fits a new one on every run
+  refit_feature_pipeline: bool = False
+
+@dataclass( frozen = True )
+class ResamplingConfig:
+  # Applied to the training split: undersample legitimate rows, then SMOTE fraud up
+  undersample_ratio: float = 0.1
+  oversample_ratio: float = 1.0
+  k_neighbors: int = 5
+  n_jobs: int = -1
+
+@dataclass( frozen = True )
+class TuningConfig:
+  # Successive-halving search over the forest hyperparameters before the final fit
+  enabled: bool = False
+  time_budget_seconds: float = 900.0
+  n_trials: int = 27
+  eta: int = 3
+  min_rows: int = 5000
+  validation_size: float = 0.2
+  scoring: str = 'average_precision'
+  workers: int = -1
+  random_state: int = 42
+  # Candidate values per RandomForestClassifier argument; None uses tune_model.SEARCH_SPACE
+  search_space: Optional[ Dict[ str, List[ Any ] ] ] = None
+
+@dataclass( frozen = True )
+class PipelineConfig:
+  # Fingerprints of the last successful run of each main.py stage
+  state_file: str = 'data/pipeline_state.json'
+  # Fingerprint the raw CSV by content instead of size + mtime
+  hash_inputs: bool = False
+
+@dataclass( frozen = True )
+class LoggingConfig:
+  level: str = 'INFO'
+  file: str = 'logs/pipeline.log'
+
+@dataclass( frozen = True )
+class ServingConfig:
+  max_batch_size: int = 64
+  max_wait_ms: float = 2.0
+  prediction_log_backend: str = 'jsonl'
+  prediction_log_path: Optional[ str ] = None
+  async_logging: bool = True
+  log_buffer_size: int = 10000
+  log_flush_batch_size: int = 500
+  log_flush_interval: float = 1.0
+  log_overflow_policy: str = 'drop'
+  metrics_window_capacity: int = 10000
+  feature_drift_window: int = 10000
+
+@dataclass( frozen = True )
+class Config:
+  # None when config.yaml has no database section; only stages that connect need it
+  database: Optional[ DatabaseConfig ] = None
+  data: DataConfig = field( default_factory = DataConfig )
+  ingestion: IngestionConfig = field( default_factory = IngestionConfig )
+  star_schema: StarSchemaConfig = field( default_factory = StarSchemaConfig )
+  preprocessing: PreprocessingConfig = field( default_factory = PreprocessingConfig )
+  resampling: ResamplingConfig = field( default_factory = ResamplingConfig )
+  tuning: TuningConfig = field( default_factory = TuningConfig )
+  pipeline: PipelineConfig = field( default_factory = PipelineConfig )
+  logging: LoggingConfig = field( default_factory = LoggingConfig )
+  serving: ServingConfig = field( default_factory = ServingConfig )
+
+def _section( cls: type, name: str, values: Optional[ Dict[ str, Any ] ] ) -> Any:
+  values = values or {}
+  known = { f.name for f in fields( cls ) }
+  unknown = sorted( set( values ) - known )
+  if unknown:
+    logger.warning( f"Ignoring unknown { name } settings: { ', '.join( unknown ) }" )
+  return cls( **{ key: value for key, value in values.items() if key in known } )
+
+def _data_section( values: Optional[ Dict[ str, Any ] ] ) -> DataConfig:
+  values = dict( values or {} )
+  # Deprecated: replaced by processed_path / processed_format
+  processed_csv = values.pop( 'processed_csv', None )
+  if processed_csv is not None:
+    if 'processed_path' in values or 'processed_format' in values:
+      logger.warning( "data.processed_csv is deprecated and ignored; processed_path / processed_format are set" )
+    else:
+      logger.warning( "data.processed_csv is deprecated; use data.processed_path with processed_format: csv" )
+      values.update( processed_path = processed_csv, processed_format = 'csv' )
+  return _section( DataConfig, 'data', values )
+
+@lru_cache( maxsize = None )
+def load_config( config_path: str = CONFIG_PATH ) -> Config:
+  # Parsed once per process; call load_config.cache_clear() to pick up edits
+  if not Path( config_path ).exists():
+    logger.warning( f"{ config_path } not found, using defaults" )
+    return Config()
+
+  with open( config_path ) as config_file:
+    raw = yaml.safe_load( config_file ) or {}
+
+  return Config(
+    database = _section( DatabaseConfig, 'database', raw[ 'database' ] ) if raw.get( 'database' ) else None,
+    data = _data_section( raw.get( 'data' ) ),
+    ingestion = _section( IngestionConfig, 'ingestion', raw.get( 'ingestion' ) ),
+    star_schema = _section( StarSchemaConfig, 'star_schema', raw.get( 'star_schema' ) ),
+    preprocessing = _section( PreprocessingConfig, 'preprocessing', raw.get( 'preprocessing' ) ),
+    resampling = _section( ResamplingConfig, 'resampling', raw.get( 'resampling' ) ),
+    tuning = _section( TuningConfig, 'tuning', raw.get( 'tuning' ) ),
+    pipeline = _section( PipelineConfig, 'pipeline', raw.get( 'pipeline' ) ),
+    logging = _section( LoggingConfig, 'logging', raw.get( 'logging' ) ),
+    serving = _section( ServingConfig, 'serving', raw.get( 'serving' ) )
+  )
@@ -1,25 +1,57 @@
-import yaml
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 import logging
 
+sys.path.append( str( Path( __file__ ).parent.parent ) )
+from src.config import load_config
+
 logging.basicConfig( level = logging.INFO )
 logger = logging.getLogger( __name__ )
 
-def create_db_engine() -> Engine:
-  config = yaml.safe_load( open( 'config/config.yaml' ) )
-  
-  db_config = config[ 'database' ]
+# One engine (and connection pool) per distinct set of driver arguments, shared by every stage and thread
+_engines: Dict[ Tuple, Engine ] = {}
+_engines_lock = threading.Lock()
+
+def _engine_key( connect_args: Optional[ Dict[ str, Any ] ] ) -> Tuple:
+  return tuple( sorted( ( connect_args or {} ).items() ) )
+
+def create_db_engine( connect_args: Optional[ Dict[ str, Any ] ] = None ) -> Engine:
+  key = _engine_key( connect_args )
+  with _engines_lock:
+    engine = _engines.get( key )
+    if engine is not None:
+      return engine
+
+    db_config = load_config().database
+    if db_config is None:
+      raise ValueError( "No database section in config/config.yaml" )
+
+    logger.info( f"Connecting to database: { db_config.database } (pool size { db_config.pool_size } + { db_config.max_overflow } overflow)" )
 
-  # Build connection string
-  connection_string = (
-    f"mysql+pymysql://{ db_config[ 'user' ] }:{ db_config[ 'password' ] }"
-    f"@{ db_config[ 'host' ] }:{ db_config[ 'port' ] }/{ db_config[ 'database' ] }"
-  )
+    engine = create_engine(
+      db_config.url,
+      echo = False,
+      connect_args = connect_args or {},
+      pool_size = db_config.pool_size,
+      max_overflow = db_config.max_overflow,
+      pool_timeout = db_config.pool_timeout,
+      # Reconnect before the server's wait_timeout drops idle connections, and test each checkout
+      pool_recycle = db_config.pool_recycle,
+      pool_pre_ping = db_config.pool_pre_ping
+    )
+    _engines[ key ] = engine
+    return engine
 
-  logger.info( f"Connecting to database: { db_config[ 'database' ] }" )
-  
-  return create_engine( connection_string, echo = False )
+def dispose_engines() -> None:
+  # Closes every pooled connection, e.g. at the end of a run or after forking
+  with _engines_lock:
+    for engine in _engines.values():
+      engine.dispose()
+    _engines.clear()
 
 def test_db_connection() -> bool:
   try:
@@ -41,4 +73,4 @@ def test_db_connection() -> bool:
 
 if __name__ == "__main__":
   # Test database connection on startup
-  test_db_connection()
\ No newline at end of file
+  test_db_connection()
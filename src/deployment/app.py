@@ -2,15 +2,20 @@
 import sys
 import logging
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
+# Numerical computing
+import numpy as np
 # FastAPI
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 
 # Add parent directory to path to import model loader
 sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
-from src.deployment.schemas import TransactionRequest, PredictionResponse, HealthResponse, ModelInfoResponse
+from src.config import load_config
+from src.deployment.schemas import TransactionRequest, RawTransactionRequest, PredictionResponse, BatchTransactionRequest, BatchRawTransactionRequest, BatchPredictionResponse, HealthResponse, ModelInfoResponse
 from src.deployment.model_loader import ModelManager
+from src.deployment.micro_batcher import MicroBatcher
 from src.monitoring.prediction_logger import PredictionLogger
 from src.monitoring.performance_tracker import PerformanceTracker
 from src.monitoring.drift_detector import DriftDetector
@@ -40,6 +45,7 @@ app.add_middleware(
 
 # Load model at startup
 model_manager = None
+micro_batcher = None
 # Initialize monitoring components
 prediction_logger = None
 performance_tracker = None
@@ -47,17 +53,53 @@ drift_detector = None
 
 @app.on_event( "startup" )
 async def startup_event():
-  global model_manager, prediction_logger, performance_tracker, drift_detector
+  global model_manager, micro_batcher, prediction_logger, performance_tracker, drift_detector
   try:
+    serving_config = load_config().serving
+
     model_manager = ModelManager()
-    prediction_logger = PredictionLogger()
-    performance_tracker = PerformanceTracker()
-    drift_detector = DriftDetector()
+    micro_batcher = MicroBatcher(
+      model_manager.predict_batch,
+      max_batch_size = serving_config.max_batch_size,
+      max_wait_ms = serving_config.max_wait_ms
+    )
+    await micro_batcher.start()
+    log_backend = serving_config.prediction_log_backend
+    default_log_path = 'logs/monitoring/predictions_columnar' if log_backend == 'columnar' else 'logs/monitoring/predictions.jsonl'
+    prediction_log_path = serving_config.prediction_log_path or default_log_path
+
+    prediction_logger = PredictionLogger(
+      prediction_log_path,
+      async_mode = serving_config.async_logging,
+      buffer_size = serving_config.log_buffer_size,
+      flush_batch_size = serving_config.log_flush_batch_size,
+      flush_interval = serving_config.log_flush_interval,
+      overflow_policy = serving_config.log_overflow_policy,
+      backend = log_backend,
+      feature_names = model_manager.feature_names
+    )
+    performance_tracker = PerformanceTracker(
+      prediction_log_path,
+      window_capacity = serving_config.metrics_window_capacity
+    )
+    drift_detector = DriftDetector(
+      prediction_log_path,
+      reference_histograms = model_manager.reference_histograms,
+      feature_window = serving_config.feature_drift_window
+    )
     logger.info( "Model loaded successfully" )
   except Exception as e:
     logger.error( f"Error loading model: { e }" )
     raise
 
+@app.on_event( "shutdown" )
+async def shutdown_event():
+  if micro_batcher is not None:
+    await micro_batcher.stop()
+  # Flush whatever is still buffered before the process exits
+  if prediction_logger is not None:
+    prediction_logger.close()
+
 @app.get( "/", tags = [ "Root" ] )
 async def root():
   return {
@@ -66,10 +108,16 @@ async def root():
     "endpoints": {
       "health": "/health",
       "predict": "/predict",
+      "predict_batch": "/predict/batch",
+      "predict_raw": "/predict/raw",
+      "predict_raw_batch": "/predict/raw/batch",
       "model_info": "/model-info",
       "monitoring_metrics": "/monitoring/metrics",
       "monitoring_distribution": "/monitoring/distribution",
       "monitoring_drift": "/monitoring/drift",
+      "monitoring_feature_drift": "/monitoring/drift/features",
+      "monitoring_batcher": "/monitoring/batcher",
+      "monitoring_logger": "/monitoring/logger",
     }
   }
 
@@ -100,6 +148,78 @@ async def model_info():
     "test_auc_roc": info[ 'test_metrics' ].get( 'auc_roc' )
   }
 
+def transaction_to_features( transaction: TransactionRequest ) -> List[ float ]:
+  # Order must match the feature columns the model was trained on
+  return [
+    transaction.step,
+    transaction.hour,
+    transaction.day,
+    transaction.type_encoded,
+    transaction.origin_type_encoded,
+    transaction.destination_type_encoded,
+    transaction.amount,
+    transaction.old_balance_orig,
+    transaction.new_balance_orig,
+    transaction.old_balance_dest,
+    transaction.new_balance_dest,
+    transaction.balance_diff_orig,
+    transaction.balance_diff_dest,
+    transaction.error_balance_orig,
+    transaction.error_balance_dest,
+    transaction.is_round_amount,
+    transaction.origin_emptied,
+    transaction.is_large_tx,
+  ]
+
+def raw_transactions_to_features( transactions: List[ RawTransactionRequest ] ) -> np.ndarray:
+  # Column arrays for the shared feature transformer; account type is the id prefix
+  raw = {
+    'step': np.array( [ transaction.step for transaction in transactions ] ),
+    'type_name': np.array( [ transaction.type.value for transaction in transactions ] ),
+    'origin_type': np.array( [ transaction.name_orig[ 0 ] for transaction in transactions ] ),
+    'destination_type': np.array( [ transaction.name_dest[ 0 ] for transaction in transactions ] ),
+    'amount': np.array( [ transaction.amount for transaction in transactions ] ),
+    'old_balance_orig': np.array( [ transaction.old_balance_orig for transaction in transactions ] ),
+    'new_balance_orig': np.array( [ transaction.new_balance_orig for transaction in transactions ] ),
+    'old_balance_dest': np.array( [ transaction.old_balance_dest for transaction in transactions ] ),
+    'new_balance_dest': np.array( [ transaction.new_balance_dest for transaction in transactions ] ),
+  }
+  return model_manager.transform_raw( raw )
+
+async def log_predictions( features: List[ List[ float ] ], predictions: List[ int ], probabilities: List[ float ] ) -> None:
+  # A full buffer under the block policy, or a synchronous file write, would stall the event loop
+  if prediction_logger.may_block:
+    await run_in_threadpool( prediction_logger.log_predictions, features, predictions, probabilities )
+  else:
+    prediction_logger.log_predictions( features, predictions, probabilities )
+
+async def score_transaction( features: List[ float ] ) -> Dict:
+  # Coalesced with concurrent requests and scored off the event loop
+  prediction, probability = await micro_batcher.submit( features )
+
+  await log_predictions( [ features ], [ prediction ], [ probability ] )
+  performance_tracker.record( prediction, probability )
+  drift_detector.update_features( [ features ] )
+  return {
+    "is_fraud": prediction == 1,
+    "fraud_probability": probability,
+  }
+
+async def score_transactions( features: np.ndarray ) -> Dict:
+  predictions, probabilities = await run_in_threadpool( model_manager.predict_batch, features )
+
+  await log_predictions( features.tolist(), predictions.tolist(), probabilities.tolist() )
+  performance_tracker.record_batch( predictions.tolist(), probabilities.tolist() )
+  drift_detector.update_features( features )
+  return {
+    "predictions": [
+      { "is_fraud": bool( prediction == 1 ), "fraud_probability": float( probability ) }
+      for prediction, probability in zip( predictions, probabilities )
+    ],
+    "n_transactions": len( features ),
+    "n_fraud": int( predictions.sum() ),
+  }
+
 @app.post( "/predict", response_model = PredictionResponse, tags = [ "Predict" ] )
 async def predict( transaction: TransactionRequest ):
 
@@ -107,41 +227,55 @@ async def predict( transaction: TransactionRequest ):
     raise HTTPException( status_code = 500, detail = "Model not loaded" )
 
   try:
-    features = [
-      transaction.step,
-      transaction.hour,
-      transaction.day,
-      transaction.type_encoded,
-      transaction.origin_type_encoded,
-      transaction.destination_type_encoded,
-      transaction.amount,
-      transaction.old_balance_orig,
-      transaction.new_balance_orig,
-      transaction.old_balance_dest,
-      transaction.new_balance_dest,
-      transaction.balance_diff_orig,
-      transaction.balance_diff_dest,
-      transaction.error_balance_orig,
-      transaction.error_balance_dest,
-      transaction.is_round_amount,
-      transaction.origin_emptied,
-      transaction.is_large_tx,
-    ]
-
-    prediction, probability = model_manager.predict( features )
-
-    prediction_logger.log_prediction( features, prediction, probability )
-    return {
-      "is_fraud": prediction == 1,
-      "fraud_probability": probability,
-    }
+    return await score_transaction( transaction_to_features( transaction ) )
 
   except Exception as e:
     logger.error( f"Error predicting transaction: { e }" )
     raise HTTPException( status_code = 500, detail = str( e ) )
 
+@app.post( "/predict/batch", response_model = BatchPredictionResponse, tags = [ "Predict" ] )
+async def predict_batch( request: BatchTransactionRequest ):
+
+  if model_manager is None:
+    raise HTTPException( status_code = 500, detail = "Model not loaded" )
+
+  try:
+    features = np.array( [ transaction_to_features( transaction ) for transaction in request.transactions ], dtype = np.float64 )
+    return await score_transactions( features )
+
+  except Exception as e:
+    logger.error( f"Error predicting transaction batch: { e }" )
+    raise HTTPException( status_code = 500, detail = str( e ) )
+
+@app.post( "/predict/raw", response_model = PredictionResponse, tags = [ "Predict" ] )
+async def predict_raw( transaction: RawTransactionRequest ):
+
+  if model_manager is None:
+    raise HTTPException( status_code = 500, detail = "Model not loaded" )
+
+  try:
+    features = raw_transactions_to_features( [ transaction ] )[ 0 ].tolist()
+    return await score_transaction( features )
+
+  except Exception as e:
+    logger.error( f"Error predicting raw transaction: { e }" )
+    raise HTTPException( status_code = 500, detail = str( e ) )
+
+@app.post( "/predict/raw/batch", response_model = BatchPredictionResponse, tags = [ "Predict" ] )
+async def predict_raw_batch( request: BatchRawTransactionRequest ):
+
+  if model_manager is None:
+    raise HTTPException( status_code = 500, detail = "Model not loaded" )
+
+  try:
+    return await score_transactions( raw_transactions_to_features( request.transactions ) )
+
+  except Exception as e:
+    logger.error( f"Error predicting raw transaction batch: { e }" )
+    raise HTTPException( status_code = 500, detail = str( e ) )
+
 @app.get("/monitoring/metrics", tags=["Monitoring"])
-async def get_metrics( window_size: int = 100 ) -> Dict:
+async def get_metrics( window_size: int = Query( 100, ge = 1 ) ) -> Dict:
     if performance_tracker is None:
       raise HTTPException( status_code=503, detail="Monitoring not initialized" )
     
@@ -149,7 +283,7 @@ async def get_metrics( window_size: int = 100 ) -> Dict:
     return metrics
 
 @app.get("/monitoring/distribution", tags=["Monitoring"])
-async def get_distribution( window_size: int = 100 ) -> Dict:
+async def get_distribution( window_size: int = Query( 100, ge = 1 ) ) -> Dict:
     if performance_tracker is None:
         raise HTTPException(status_code=503, detail="Monitoring not initialized")
     
@@ -163,4 +297,28 @@ async def check_drift( threshold: float = 0.1 ) -> Dict:
         raise HTTPException(status_code=503, detail="Monitoring not initialized")
     
     drift_result = drift_detector.detect_prediction_drift(threshold=threshold)
-    return drift_result
\ No newline at end of file
+    return drift_result
+
+@app.get("/monitoring/drift/features", tags=["Monitoring"])
+async def check_feature_drift( feature: Optional[ str ] = None, psi_threshold: float = 0.2 ) -> Dict:
+    if drift_detector is None:
+        raise HTTPException(status_code=503, detail="Monitoring not initialized")
+
+    try:
+        return drift_detector.detect_feature_drift( feature_name=feature, psi_threshold=psi_threshold )
+    except ValueError as e:
+        raise HTTPException( status_code=404, detail=str( e ) )
+
+@app.get("/monitoring/batcher", tags=["Monitoring"])
+async def get_batcher_metrics() -> Dict:
+    if micro_batcher is None:
+        raise HTTPException(status_code=503, detail="Micro-batcher not initialized")
+
+    return micro_batcher.get_metrics()
+
+@app.get("/monitoring/logger", tags=["Monitoring"])
+async def get_logger_stats() -> Dict:
+    if prediction_logger is None:
+        raise HTTPException(status_code=503, detail="Monitoring not initialized")
+
+    return prediction_logger.get_stats()
@@ -0,0 +1,141 @@
+# System
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+# Numerical computing
+import numpy as np
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+class MicroBatcher:
+  """
+  Collects concurrent single-row predictions and scores them together.
+
+  Requests wait at most `max_wait_ms` (or until `max_batch_size` rows are queued),
+  then the whole batch is scored with one `predict_fn` call on a worker thread so
+  the event loop keeps serving other connections.
+  """
+
+  def __init__(
+    self,
+    predict_fn: Callable[ [ np.ndarray ], Tuple[ np.ndarray, np.ndarray ] ],
+    max_batch_size: int = 64,
+    max_wait_ms: float = 2.0
+  ) -> None:
+    self.predict_fn = predict_fn
+    self.max_batch_size = max_batch_size
+    self.max_wait = max_wait_ms / 1000
+    self._queue: Optional[ asyncio.Queue ] = None
+    self._worker: Optional[ asyncio.Task ] = None
+
+    # Metrics
+    self.total_requests = 0
+    self.total_batches = 0
+    self.max_batch_seen = 0
+    self.last_batch_size = 0
+    self.max_queue_depth = 0
+    self.batch_size_histogram: Dict[ int, int ] = {}
+
+  async def start( self ) -> None:
+    self._queue = asyncio.Queue()
+    self._worker = asyncio.create_task( self._run() )
+    logger.info( f"Micro-batcher started (max_batch_size={ self.max_batch_size }, max_wait_ms={ self.max_wait * 1000 })" )
+
+  async def stop( self ) -> None:
+    if self._worker is None:
+      return
+
+    self._worker.cancel()
+    try:
+      await self._worker
+    except asyncio.CancelledError:
+      pass
+    self._worker = None
+
+    # Fail anything still queued so callers don't hang
+    while not self._queue.empty():
+      _, future = self._queue.get_nowait()
+      if not future.done():
+        future.set_exception( RuntimeError( "Micro-batcher stopped" ) )
+
+    logger.info( "Micro-batcher stopped" )
+
+  async def submit( self, features: List[ float ] ) -> Tuple[ int, float ]:
+    if self._worker is None:
+      raise RuntimeError( "Micro-batcher not started" )
+
+    future = asyncio.get_running_loop().create_future()
+    await self._queue.put( ( features, future ) )
+    self.max_queue_depth = max( self.max_queue_depth, self._queue.qsize() )
+
+    return await future
+
+  async def _collect_batch( self ) -> List[ tuple ]:
+    # Block for the first request, then wait up to max_wait for more
+    batch = [ await self._queue.get() ]
+    deadline = time.monotonic() + self.max_wait
+
+    while len( batch ) < self.max_batch_size:
+      remaining = deadline - time.monotonic()
+      if remaining <= 0:
+        break
+      try:
+        batch.append( await asyncio.wait_for( self._queue.get(), timeout = remaining ) )
+      except asyncio.TimeoutError:
+        break
+
+    return batch
+
+  async def _run( self ) -> None:
+    loop = asyncio.get_running_loop()
+
+    while True:
+      batch = await self._collect_batch()
+      futures = [ future for _, future in batch ]
+
+      # Anything raised for this batch (a malformed row included) fails only its own futures;
+      # the loop must survive it, or every later submit would wait forever
+      try:
+        features = np.array( [ row for row, _ in batch ] )
+        predictions, probabilities = await loop.run_in_executor( None, self.predict_fn, features )
+
+        for future, prediction, probability in zip( futures, predictions, probabilities ):
+          # Caller may have gone away (e.g. client disconnect cancelled the request)
+          if not future.done():
+            future.set_result( ( int( prediction ), float( probability ) ) )
+
+        self._record_batch( len( batch ) )
+      except Exception as e:
+        logger.error( f"Error scoring micro-batch of { len( batch ) }: { e }" )
+        for future in futures:
+          if not future.done():
+            future.set_exception( e )
+
+  def _record_batch( self, batch_size: int ) -> None:
+    self.total_requests += batch_size
+    self.total_batches += 1
+    self.last_batch_size = batch_size
+    self.max_batch_seen = max( self.max_batch_seen, batch_size )
+    self.batch_size_histogram[ batch_size ] = self.batch_size_histogram.get( batch_size, 0 ) + 1
+
+  def get_metrics( self ) -> Dict:
+    return {
+      'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+      'max_queue_depth': self.max_queue_depth,
+      'total_requests': self.total_requests,
+      'total_batches': self.total_batches,
+      'mean_batch_size': self.total_requests / self.total_batches if self.total_batches > 0 else 0.0,
+      'max_batch_size': self.max_batch_seen,
+      'last_batch_size': self.last_batch_size,
+      'batch_size_histogram': dict( sorted( self.batch_size_histogram.items() ) ),
+      'config': {
+        'max_batch_size': self.max_batch_size,
+        'max_wait_ms': self.max_wait * 1000,
+      }
+    }
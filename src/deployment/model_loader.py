@@ -2,7 +2,7 @@
 import sys
 import logging
 from pathlib import Path
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Optional
 # Machine Learning
 from sklearn.ensemble import RandomForestClassifier
 # Numerical computing
@@ -10,6 +10,10 @@ import numpy as np
 # Saving and loading models
 import joblib
 
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.model_development.flat_forest import FlatForest
+from src.prepocessessing.feature_pipeline import FeaturePipeline
+
 logging.basicConfig( 
   level = logging.INFO,
   format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -18,12 +22,21 @@ logging.basicConfig(
 logger = logging.getLogger( __name__ )
 
 class ModelManager:
-  def __init__( self, model_path: str = 'models/fraud_detector.joblib' ) -> None:
+  def __init__(
+    self,
+    model_path: str = 'models/fraud_detector.joblib',
+    flat_model_path: Optional[ str ] = 'models/fraud_detector_flat.npz'
+  ) -> None:
     self.model_path = model_path
+    self.flat_model_path = flat_model_path
     self.model: RandomForestClassifier = None
+    # Whatever answers predict_proba: the flat forest when available, else the sklearn model
+    self.engine = None
     self.feature_names: List[ str ] = None
     self.test_metrics: Dict[ str, Any ] = None
     self.confusion_matrix = None
+    self.reference_histograms: Optional[ Dict[ str, Any ] ] = None
+    self.feature_pipeline: Optional[ FeaturePipeline ] = None
     self._load_model()
 
   def _load_model( self ) -> None:
@@ -36,30 +49,70 @@ class ModelManager:
     self.feature_names = artifact[ 'feature_names' ]
     self.test_metrics = artifact[ 'test_metrics' ]
     self.confusion_matrix = artifact[ 'confusion_matrix' ]
+    self.reference_histograms = artifact.get( 'reference_histograms' )
+    self.feature_pipeline = artifact.get( 'feature_pipeline' )
 
     logger.info( f"Model loaded successfully from { self.model_path }" )
     logger.info( f"Model type: { type( self.model ) }" )
     logger.info( f"Number of features: { len( self.feature_names ) }" )
 
+    self.engine = self._load_flat_model() or self.model
+    logger.info( f"Inference engine: { type( self.engine ).__name__ }" )
+
+  def _load_flat_model( self ) -> Optional[ FlatForest ]:
+    if self.flat_model_path is None or not Path( self.flat_model_path ).exists():
+      return None
+
+    # A flat forest exported before the current artifact belongs to an older model
+    if Path( self.flat_model_path ).stat().st_mtime < Path( self.model_path ).stat().st_mtime:
+      logger.warning( f"Ignoring stale flat model { self.flat_model_path }" )
+      return None
+
+    try:
+      flat_forest = FlatForest.load( self.flat_model_path )
+    except ValueError as e:
+      logger.warning( f"Ignoring flat model { self.flat_model_path }: { e }" )
+      return None
+    if flat_forest.n_features_in_ != len( self.feature_names ):
+      logger.warning( f"Ignoring flat model with { flat_forest.n_features_in_ } features" )
+      return None
+
+    logger.info( f"Flat model loaded from { self.flat_model_path }" )
+    return flat_forest
+
   def predict( self, features: List[ float ] ) -> Tuple[ int, float ]:
-    if self.model is None:
-      raise RuntimeError( "Model not loaded" )
-    
     if len( features ) != len( self.feature_names ):
       raise ValueError( f"Expected { len( self.feature_names ) } features, got { len( features ) }" )
-    
-    features_array = np.array( features ).reshape( 1, -1 )
 
-    # Predict
-    prediction = self.model.predict( features_array )[ 0 ]
-    probability = self.model.predict_proba( features_array )[ 0 ]
-    fraud_probability = probability[ 1 ]
+    predictions, probabilities = self.predict_batch( np.array( features ).reshape( 1, -1 ) )
+
+    return int( predictions[ 0 ] ), float( probabilities[ 0 ] )
+
+  def predict_batch( self, features: np.ndarray, threshold: float = 0.5 ) -> Tuple[ np.ndarray, np.ndarray ]:
+    if self.model is None:
+      raise RuntimeError( "Model not loaded" )
+
+    features_array = np.asarray( features, dtype = np.float64 )
+    if features_array.ndim != 2 or features_array.shape[ 1 ] != len( self.feature_names ):
+      raise ValueError( f"Expected an (N, { len( self.feature_names ) }) feature matrix, got shape { features_array.shape }" )
+
+    # Single pass over the forest: labels are derived from the fraud probability.
+    # With threshold 0.5 this matches RandomForestClassifier.predict (argmax, ties go to class 0)
+    fraud_probabilities = self.engine.predict_proba( features_array )[ :, 1 ]
+    predictions = ( fraud_probabilities > threshold ).astype( int )
+
+    return predictions, fraud_probabilities
+
+  def transform_raw( self, raw: Dict[ str, np.ndarray ] ) -> np.ndarray:
+    if self.feature_pipeline is None:
+      raise RuntimeError( "Model artifact has no feature pipeline; retrain to score raw transactions" )
 
-    return int( prediction ), float( fraud_probability )
+    return self.feature_pipeline.transform_matrix( raw )
 
   def get_model_info( self ) -> Dict[ str, Any ]:
     return {
       'model_type': type( self.model ).__name__,
+      'inference_engine': type( self.engine ).__name__,
       'n_features': len( self.feature_names ),
       'feature_names': self.feature_names,
       'test_metrics': self.test_metrics
@@ -62,6 +62,36 @@ class TransactionRequest( BaseModel ):
       }
     }
 
+class RawTransactionRequest( BaseModel ):
+  # Raw PaySim fields; features are derived server-side
+  step: int = Field( ..., description = "Time step in hours", ge = 0 )
+  type: TransactionType = Field( ..., description = "Transaction type" )
+  amount: float = Field( ..., description = "Transaction amount", ge = 0 )
+  name_orig: str = Field( ..., description = "Origin account id, prefixed with its account type", pattern = "^[CM]" )
+  old_balance_orig: float = Field( ..., description = "Original account balance before transaction", ge = 0 )
+  new_balance_orig: float = Field( ..., description = "Original account balance after transaction", ge = 0 )
+  name_dest: str = Field( ..., description = "Destination account id, prefixed with its account type", pattern = "^[CM]" )
+  old_balance_dest: float = Field( ..., description = "Destination account balance before transaction", ge = 0 )
+  new_balance_dest: float = Field( ..., description = "Destination account balance after transaction", ge = 0 )
+
+  class Config:
+    json_schema_extra = {
+      "examples": {
+        "step": 1,
+        "type": "PAYMENT",
+        "amount": 9839.64,
+        "name_orig": "C1231006815",
+        "old_balance_orig": 170136.0,
+        "new_balance_orig": 160296.36,
+        "name_dest": "M1979787155",
+        "old_balance_dest": 0.0,
+        "new_balance_dest": 0.0
+      }
+    }
+
+class BatchRawTransactionRequest( BaseModel ):
+  transactions: list[ RawTransactionRequest ] = Field( ..., description = "Raw transactions to score", min_length = 1, max_length = 1000 )
+
 class PredictionResponse( BaseModel ):
   is_fraud: bool = Field( ..., description = "Whether the transaction is fraudulent" )
   fraud_probability: float = Field( ..., description = "Probability of the transaction being fraudulent" )
@@ -74,6 +104,14 @@ class PredictionResponse( BaseModel ):
       }
     }
 
+class BatchTransactionRequest( BaseModel ):
+  transactions: list[ TransactionRequest ] = Field( ..., description = "Transactions to score", min_length = 1, max_length = 1000 )
+
+class BatchPredictionResponse( BaseModel ):
+  predictions: list[ PredictionResponse ] = Field( ..., description = "Predictions in the same order as the submitted transactions" )
+  n_transactions: int = Field( ..., description = "Number of transactions scored" )
+  n_fraud: int = Field( ..., description = "Number of transactions flagged as fraudulent" )
+
 class HealthResponse( BaseModel ):
   status: str = Field( ..., description = "Status of the service" )
   model_loaded: bool = Field( ..., description = "Whether the model is loaded" )
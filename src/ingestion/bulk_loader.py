@@ -0,0 +1,391 @@
+# System imports
+import sys
+import time
+import queue
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+# Database
+from sqlalchemy import Engine
+# Data manipulation
+import pandas as pd
+
+# Optional: pyarrow's streaming CSV reader parses with multiple threads and releases the GIL
+try:
+  from pyarrow import csv as pa_csv
+except ImportError:
+  pa_csv = None
+
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.ingestion.ingestion_stats import IngestionStats
+from src.ingestion.schema_validation import StreamingSchemaValidator
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+# Column order of the PaySim CSV, which is also the insert order
+STAGING_COLUMNS: List[ str ] = [
+  'step',
+  'type',
+  'amount',
+  'nameOrig',
+  'oldbalanceOrg',
+  'newbalanceOrig',
+  'nameDest',
+  'oldbalanceDest',
+  'newbalanceDest',
+  'isFraud',
+  'isFlaggedFraud'
+]
+
+LOAD_METHODS = ( 'auto', 'load_data', 'executemany' )
+CSV_ENGINES = ( 'c', 'pyarrow' )
+
+# pyarrow reads in byte blocks; PaySim rows are roughly this long
+APPROX_ROW_BYTES = 100
+
+# DB-API placeholder for positional parameters, by driver paramstyle
+PLACEHOLDERS: Dict[ str, str ] = {
+  'qmark': '?',
+  'format': '%s',
+  'pyformat': '%s'
+}
+
+def supports_load_data( engine: Engine ) -> bool:
+  return engine.dialect.name in ( 'mysql', 'mariadb' )
+
+def _insert_sql( engine: Engine, table: str ) -> str:
+  placeholder = PLACEHOLDERS.get( engine.dialect.paramstyle )
+  if placeholder is None:
+    raise ValueError( f"Unsupported driver paramstyle: { engine.dialect.paramstyle }" )
+
+  return (
+    f"INSERT INTO { table } ({ ', '.join( STAGING_COLUMNS ) }) "
+    f"VALUES ({ ', '.join( [ placeholder ] * len( STAGING_COLUMNS ) ) })"
+  )
+
+def chunk_to_records( chunk: pd.DataFrame ) -> List[ tuple ]:
+  # Plain Python scalars, which every driver knows how to escape
+  return list( chunk[ STAGING_COLUMNS ].astype( object ).itertuples( index = False, name = None ) )
+
+def iter_csv_chunks( csv_file_path: str, chunk_size: int = 10000, csv_engine: str = 'c' ) -> Iterator[ pd.DataFrame ]:
+  if csv_engine not in CSV_ENGINES:
+    raise ValueError( f"Unknown CSV engine: { csv_engine } (expected one of { CSV_ENGINES })" )
+
+  if csv_engine == 'pyarrow' and pa_csv is None:
+    logger.warning( "pyarrow is not installed, parsing with the pandas C engine" )
+    csv_engine = 'c'
+
+  if csv_engine == 'pyarrow':
+    reader = pa_csv.open_csv(
+      csv_file_path,
+      read_options = pa_csv.ReadOptions( block_size = chunk_size * APPROX_ROW_BYTES ),
+      convert_options = pa_csv.ConvertOptions( include_columns = STAGING_COLUMNS )
+    )
+    for batch in reader:
+      yield batch.to_pandas()
+    return
+
+  for chunk in pd.read_csv( csv_file_path, usecols = STAGING_COLUMNS, chunksize = chunk_size ):
+    yield chunk
+
+def _load_result( method: str, rows: int, seconds: float, stats: IngestionStats ) -> Dict[ str, Any ]:
+  result = {
+    'method': method,
+    'rows': rows,
+    'seconds': seconds,
+    'rows_per_sec': rows / seconds if seconds > 0 else 0.0,
+    'stats': stats
+  }
+  logger.info( f"Loaded { rows } rows with { method } in { seconds:.2f}s ({ result[ 'rows_per_sec' ]:.0f} rows/sec)" )
+  return result
+
+def scan_csv(
+  csv_file_path: str,
+  validator: Optional[ StreamingSchemaValidator ] = None,
+  chunk_size: int = 100000,
+  csv_engine: str = 'c'
+) -> Tuple[ str, Optional[ str ], IngestionStats ]:
+  # The one client-side pass ahead of LOAD DATA; nothing touches the database. Validates the
+  # rows when asked and accumulates the stats, whose row count is what the server must insert.
+  # Returns the file to load, the temporary file to delete afterwards (if one was needed) and the stats
+  logger.info( f"Scanning { csv_file_path } before LOAD DATA..." )
+  stats = IngestionStats()
+
+  # Aborting raises on the first bad chunk, so only quarantining can need a filtered copy
+  temp_file = None
+  if validator is not None and validator.on_error == 'quarantine':
+    temp_file = tempfile.NamedTemporaryFile( 'w', suffix = '.csv', prefix = 'staging_', delete = False, newline = '' )
+
+  try:
+    header = True
+    for chunk in iter_csv_chunks( csv_file_path, chunk_size, csv_engine ):
+      clean = validator.validate( chunk ) if validator is not None else chunk
+      stats.update( clean )
+      if temp_file is not None:
+        # Two decimals, as the staging DECIMAL columns store them
+        clean[ STAGING_COLUMNS ].to_csv( temp_file, header = header, index = False, float_format = '%.2f', lineterminator = '\n' )
+        header = False
+  except BaseException:
+    if temp_file is not None:
+      temp_file.close()
+      Path( temp_file.name ).unlink( missing_ok = True )
+    raise
+
+  if temp_file is None:
+    return csv_file_path, None, stats
+
+  temp_file.close()
+  if not validator.rows_rejected:
+    # Every row passed, so the original file loads as is
+    Path( temp_file.name ).unlink( missing_ok = True )
+    return csv_file_path, None, stats
+
+  logger.info( f"Loading the { stats.rows } valid rows from { temp_file.name }" )
+  return temp_file.name, temp_file.name, stats
+
+def load_data_infile( engine: Engine, csv_file_path: str, stats: IngestionStats, table: str = 'staging_transactions' ) -> Dict[ str, Any ]:
+  # The server parses the file itself; needs local_infile enabled on both client and server.
+  # stats come from scan_csv over this same file, so stats.rows is the count to expect
+  sql = (
+    f"LOAD DATA LOCAL INFILE %s INTO TABLE { table } "
+    "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+    "LINES TERMINATED BY '\\n' "
+    "IGNORE 1 LINES "
+    f"({ ', '.join( STAGING_COLUMNS ) })"
+  )
+
+  logger.info( f"Bulk loading { csv_file_path } with LOAD DATA LOCAL INFILE..." )
+  start = time.perf_counter()
+
+  with engine.connect() as connection:
+    result = connection.exec_driver_sql( sql, ( str( csv_file_path ), ) )
+    rows = result.rowcount
+    # The server reports skipped or truncated rows only as warnings
+    warnings = connection.exec_driver_sql( "SELECT @@warning_count" ).scalar()
+
+    if rows != stats.rows or warnings:
+      connection.rollback()
+      raise ValueError( f"LOAD DATA inserted { rows } of { stats.rows } rows with { warnings } warnings; rolled back" )
+
+    connection.commit()
+
+  return _load_result( 'load_data', rows, time.perf_counter() - start, stats )
+
+def _max_id( engine: Engine, table: str ) -> int:
+  # Rows of a load are the ones past this id, even when appending
+  with engine.connect() as connection:
+    return connection.exec_driver_sql( f"SELECT COALESCE( MAX( id ), 0 ) FROM { table }" ).scalar()
+
+def _delete_partial_load( engine: Engine, table: str, first_id: int ) -> None:
+  # Chunks committed before a failure would otherwise stay in staging, and a rerun of an
+  # append would insert them a second time
+  try:
+    with engine.connect() as connection:
+      deleted = connection.exec_driver_sql( f"DELETE FROM { table } WHERE id > { int( first_id ) }" ).rowcount
+      connection.commit()
+    logger.warning( f"Load failed; deleted the { deleted } rows it had already committed to { table }" )
+  except Exception as e:
+    logger.error( f"Error deleting the partial load from { table } (rows with id > { first_id }): { e }" )
+
+def executemany_insert(
+  engine: Engine,
+  csv_file_path: str,
+  table: str = 'staging_transactions',
+  chunk_size: int = 10000,
+  max_chunk_size: int = 100000,
+  validator: Optional[ StreamingSchemaValidator ] = None
+) -> Dict[ str, Any ]:
+  sql = _insert_sql( engine, table )
+
+  logger.info( f"Bulk loading { csv_file_path } with executemany (initial chunk size { chunk_size })..." )
+  start = time.perf_counter()
+  rows = 0
+  stats = IngestionStats()
+
+  # Grow the chunk while throughput keeps improving, then settle on the best size
+  size, best_size, best_rate, growing = chunk_size, chunk_size, 0.0, True
+
+  first_id = _max_id( engine, table )
+  try:
+    with engine.connect() as connection:
+      reader = pd.read_csv( csv_file_path, usecols = STAGING_COLUMNS, iterator = True )
+      while True:
+        try:
+          chunk = reader.get_chunk( size )
+        except StopIteration:
+          break
+
+        n_parsed = len( chunk )
+        if validator is not None:
+          chunk = validator.validate( chunk )
+        stats.update( chunk )
+        records = chunk_to_records( chunk )
+
+        chunk_start = time.perf_counter()
+        if records:
+          connection.exec_driver_sql( sql, records )
+          connection.commit()
+        rate = len( records ) / max( time.perf_counter() - chunk_start, 1e-9 )
+
+        rows += len( records )
+
+        if growing and n_parsed == size and len( records ) == n_parsed:
+          if rate > best_rate * 1.05 and size < max_chunk_size:
+            best_size, best_rate = size, rate
+            size = min( size * 2, max_chunk_size )
+          else:
+            growing = False
+            if rate < best_rate:
+              size = best_size
+            logger.info( f"Settled on chunk size { size }" )
+
+      reader.close()
+  except BaseException:
+    _delete_partial_load( engine, table, first_id )
+    raise
+
+  return _load_result( 'executemany', rows, time.perf_counter() - start, stats )
+
+def parallel_executemany_insert(
+  engine: Engine,
+  csv_file_path: str,
+  table: str = 'staging_transactions',
+  chunk_size: int = 10000,
+  workers: int = 4,
+  queue_size: int = 8,
+  commit_every: int = 1,
+  csv_engine: str = 'c',
+  validator: Optional[ StreamingSchemaValidator ] = None
+) -> Dict[ str, Any ]:
+  sql = _insert_sql( engine, table )
+
+  logger.info( f"Bulk loading { csv_file_path } with { workers } writer connections (chunk size { chunk_size }, commit every { commit_every } chunks)..." )
+  start = time.perf_counter()
+
+  # Bounded, so the parser can run at most queue_size chunks ahead of the writers
+  chunks: queue.Queue = queue.Queue( maxsize = queue_size )
+  stop = threading.Event()
+  errors: List[ BaseException ] = []
+  rows_written = [ 0 ] * workers
+  lock = threading.Lock()
+
+  def put( item: Any ) -> bool:
+    while not stop.is_set():
+      try:
+        chunks.put( item, timeout = 0.1 )
+        return True
+      except queue.Full:
+        continue
+    return False
+
+  def write( worker: int ) -> None:
+    try:
+      # One connection per writer, so inserts run concurrently on the server
+      with engine.connect() as connection:
+        pending = 0
+        while True:
+          records = chunks.get()
+          if records is None:
+            break
+          if stop.is_set():
+            continue
+
+          connection.exec_driver_sql( sql, records )
+          pending += 1
+          rows_written[ worker ] += len( records )
+          if pending >= commit_every:
+            connection.commit()
+            pending = 0
+
+        connection.commit()
+    except BaseException as e:
+      with lock:
+        errors.append( e )
+      stop.set()
+      # Keep consuming until our sentinel so the parser is never blocked on a full queue
+      while chunks.get() is not None:
+        pass
+
+  first_id = _max_id( engine, table )
+  writers = [ threading.Thread( target = write, args = ( worker, ), name = f"staging-writer-{ worker }", daemon = True ) for worker in range( workers ) ]
+  for writer in writers:
+    writer.start()
+
+  n_chunks = 0
+  stats = IngestionStats()
+  try:
+    # Parsing runs here while the writers wait on the database
+    for chunk in iter_csv_chunks( csv_file_path, chunk_size, csv_engine ):
+      if validator is not None:
+        chunk = validator.validate( chunk )
+      stats.update( chunk )
+      if len( chunk ) and not put( chunk_to_records( chunk ) ):
+        break
+      n_chunks += 1
+  except BaseException as e:
+    with lock:
+      errors.append( e )
+    stop.set()
+  finally:
+    # Writers drain the queue even after a failure, so the sentinels always get through
+    for _ in writers:
+      chunks.put( None )
+    for writer in writers:
+      writer.join()
+
+  if errors:
+    _delete_partial_load( engine, table, first_id )
+    raise errors[ 0 ]
+
+  result = _load_result( 'executemany', sum( rows_written ), time.perf_counter() - start, stats )
+  result.update( { 'workers': workers, 'chunks': n_chunks } )
+  return result
+
+def bulk_load_csv(
+  engine: Engine,
+  csv_file_path: str,
+  table: str = 'staging_transactions',
+  method: str = 'auto',
+  chunk_size: int = 10000,
+  max_chunk_size: int = 100000,
+  workers: int = 1,
+  queue_size: int = 8,
+  commit_every: int = 1,
+  csv_engine: str = 'c',
+  validator: Optional[ StreamingSchemaValidator ] = None
+) -> Dict[ str, Any ]:
+  if method not in LOAD_METHODS:
+    raise ValueError( f"Unknown load method: { method } (expected one of { LOAD_METHODS })" )
+
+  temp_path = None
+  try:
+    if method == 'load_data' or ( method == 'auto' and supports_load_data( engine ) ):
+      # One streaming pass first validates the rows (when asked) and gathers the stats, then the
+      # server still does the parsing and inserting. Bad rows abort before anything is loaded,
+      # or are left out of a filtered copy
+      csv_file_path, temp_path, stats = scan_csv( csv_file_path, validator, max_chunk_size, csv_engine )
+      validator = None
+
+      try:
+        return load_data_infile( engine, csv_file_path, stats, table )
+      except Exception as e:
+        if method == 'load_data':
+          raise
+        # Typically local_infile disabled on the server; nothing was inserted
+        logger.warning( f"LOAD DATA LOCAL INFILE failed, falling back to executemany: { e }" )
+
+    if workers > 1:
+      return parallel_executemany_insert( engine, csv_file_path, table, chunk_size, workers, queue_size, commit_every, csv_engine, validator )
+
+    return executemany_insert( engine, csv_file_path, table, chunk_size, max_chunk_size, validator )
+
+  finally:
+    if temp_path is not None:
+      Path( temp_path ).unlink( missing_ok = True )
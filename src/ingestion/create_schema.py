@@ -8,6 +8,7 @@ from sqlalchemy import Engine, text
 # Add parent directory to path to import database module
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from src.database import create_db_engine
+from src.ingestion.migrate_schema import apply_migrations, baseline_migrations
 
 logging.basicConfig( 
   level = logging.INFO,
@@ -36,7 +37,55 @@ def verify_table_creation( engine: Engine, expected_tables: list[ str ] ) -> Non
     logger.info( "All tables were created successfully" )
 
 
-def create_star_schema() -> None:
+# Split a SQL script into statements, leaving out the DROPs when existing tables are kept
+def split_statements( sql_content: str, drop_existing: bool = True ) -> list[ str ]:
+  statements = [ statement.strip() for statement in sql_content.split( ';' ) if statement.strip() ]
+  if not drop_existing:
+    statements = [ statement for statement in statements if not statement.upper().startswith( 'DROP ' ) ]
+  return statements
+
+# Natural key of each dimension; fact population looks every staging row up through these
+NATURAL_KEYS: dict[ str, str ] = {
+  'dim_transaction_type': 'type_name',
+  'dim_time': 'step',
+  'dim_account': 'account_id'
+}
+
+def has_unique_index( engine: Engine, table: str, column: str ) -> bool:
+  # A unique index on exactly this one column (a composite one does not make it unique)
+  sql = """
+    SELECT INDEX_NAME
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+      AND TABLE_NAME = :table
+      AND NON_UNIQUE = 0
+    GROUP BY INDEX_NAME
+    HAVING COUNT(*) = 1 AND MAX(COLUMN_NAME) = :column
+  """
+  with engine.connect() as connection:
+    result = connection.execute( text( sql ), { 'table': table, 'column': column } )
+    return result.fetchone() is not None
+
+def ensure_natural_key_indexes( engine: Engine ) -> None:
+  logger.info( "Checking unique natural key indexes..." )
+
+  for table, column in NATURAL_KEYS.items():
+    if has_unique_index( engine, table, column ):
+      continue
+
+    with engine.connect() as connection:
+      duplicates = connection.execute( text( f"SELECT COUNT(*) - COUNT(DISTINCT { column }) FROM { table }" ) ).fetchone()[ 0 ]
+      if duplicates:
+        logger.error( f"{ table }.{ column } has { duplicates } duplicate values" )
+        raise ValueError( f"{ table }.{ column } has { duplicates } duplicate values; run the schema migrations to de-duplicate it" )
+
+      logger.info( f"Adding unique index on { table }.{ column }..." )
+      connection.execute( text( f"ALTER TABLE { table } ADD UNIQUE KEY uq_{ column } ({ column })" ) )
+      connection.commit()
+
+  logger.info( "Natural key indexes are in place" )
+
+def create_star_schema( drop_existing: bool = True ) -> None:
   try:
     engine = create_db_engine()
     logger.info( "Creating star schema..." )
@@ -44,27 +93,33 @@ def create_star_schema() -> None:
     sql_content = read_sql_file( 'sql/create_star_schema.sql' )
     
     # Split the SQL content into separate statements and execute them individually
-    statements = [ statement.strip() for statement in sql_content.split( ';' ) if statement.strip() ]
+    statements = split_statements( sql_content, drop_existing )
 
     with engine.connect() as connection:
       for statement in statements:
         connection.execute( text( statement ) )
         connection.commit()
     
-    verify_table_creation( engine, [ 'dim_transaction_type', 'dim_time', 'dim_account', 'fact_transactions' ] )
+    verify_table_creation( engine, [ 'dim_transaction_type', 'dim_time', 'dim_account', 'fact_transactions', 'etl_watermarks', 'schema_migrations' ] )
+
+    # Fresh tables are already at the latest version; kept tables may predate some migrations
+    if drop_existing:
+      baseline_migrations( engine )
+    else:
+      apply_migrations( engine )
 
     logger.info( "Star schema created successfully" )
   except Exception as e:
     logger.error( f"Error creating star schema: { e }" )
     raise
 
-def create_staging_table() -> None:
+def create_staging_table( drop_existing: bool = True ) -> None:
   try:
     engine = create_db_engine()
     logger.info( "Creating staging table..." )
 
     sql_content = read_sql_file( 'sql/create_staging_table.sql' )
-    statements = [ statement.strip() for statement in sql_content.split( ';' ) if statement.strip() ]
+    statements = split_statements( sql_content, drop_existing )
 
     with engine.connect() as connection:
       for statement in statements:
@@ -0,0 +1,52 @@
+# System imports
+import logging
+from typing import Dict
+# Data manipulation
+import pandas as pd
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+class IngestionStats:
+  """
+  Row count, fraud distribution and transaction type distribution of an ingestion,
+  accumulated from the chunks as they stream through the loader.
+  """
+
+  def __init__( self ) -> None:
+    self.rows = 0
+    self.fraud_counts: Dict[ int, int ] = {}
+    self.type_counts: Dict[ str, int ] = {}
+
+  def _add( self, counts: Dict, key, count: int ) -> None:
+    counts[ key ] = counts.get( key, 0 ) + int( count )
+
+  def update( self, chunk: pd.DataFrame ) -> None:
+    self.rows += len( chunk )
+    for label, count in chunk[ 'isFraud' ].value_counts().items():
+      self._add( self.fraud_counts, int( label ), count )
+    for type_name, count in chunk[ 'type' ].value_counts().items():
+      self._add( self.type_counts, str( type_name ), count )
+
+  def to_dict( self ) -> Dict:
+    return {
+      'rows': self.rows,
+      'fraud_counts': dict( self.fraud_counts ),
+      'type_counts': dict( self.type_counts )
+    }
+
+  def log_summary( self ) -> None:
+    logger.info( "Fraud distribution:" )
+    for label in sorted( self.fraud_counts ):
+      fraud_label = "fraudulent" if label == 1 else "not fraudulent"
+      count = self.fraud_counts[ label ]
+      percentage = ( count / self.rows ) * 100 if self.rows else 0.0
+      logger.info( f"{ fraud_label }: { count } rows ({ percentage:.2f}%)" )
+
+    logger.info( "Transaction type distribution:" )
+    for type_name, count in sorted( self.type_counts.items(), key = lambda item: item[ 1 ], reverse = True ):
+      logger.info( f"{ type_name }: { count } rows" )
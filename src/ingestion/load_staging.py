@@ -1,17 +1,20 @@
 # System imports
 import sys
-import yaml
 import logging
 from pathlib import Path
 # Database
-from sqlalchemy import Engine, text
+from sqlalchemy import Engine, inspect, text
 # Data manipulation
 import pandas as pd
 
 # Add parent directory to path to import custom modules
 sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.config import load_config
 from src.database import create_db_engine
-from src.ingestion.schema_validation import validate_schema
+from src.ingestion.schema_validation import check_header, StreamingSchemaValidator
+from src.ingestion.bulk_loader import bulk_load_csv
+from src.ingestion.ingestion_stats import IngestionStats
+from src.ingestion.watermarks import REBUILD_CHECKPOINT, delete_watermark
 
 logging.basicConfig( 
   level = logging.INFO,
@@ -20,89 +23,91 @@ logging.basicConfig(
 
 logger = logging.getLogger( __name__ )
 
-def verify_ingestion( engine: Engine, expected_rows: int ) -> None:
+def verify_ingestion( engine: Engine, stats: IngestionStats, baseline_rows: int = 0 ) -> None:
   try:
     logger.info( f"Verifying ingestion..." )
-  
+
+    # Distributions were collected while loading; one count confirms the table matches
     with engine.connect() as connection:
       result = connection.execute( text( "SELECT COUNT(*) FROM staging_transactions" ) )
       actual_rows = result.fetchone()[ 0 ]
 
-      if actual_rows != expected_rows:
-        logger.error( f"Expected { expected_rows } rows, but got { actual_rows }" )
-        raise ValueError( f"Expected { expected_rows } rows, but got { actual_rows }" )
-      else:
-        logger.info( f"Row count matches" )
-      
-      # Check fraud distribution
-      result = connection.execute( text(
-        "SELECT isFraud, COUNT(*) as count "
-        "FROM staging_transactions "
-        "GROUP BY isFraud"
-      ) )
-
-      logger.info( "Fraud distribution:" )
-      for row in result:
-        fraud_label = "fraudulent" if row[ 0 ] == 1 else "not fraudulent"
-        count = row[ 1 ]
-        percentage = ( count / expected_rows ) * 100
-        logger.info( f"{ fraud_label }: { count } rows ({ percentage:.2f}%)" )
-
-      # Check transaction types
-      result = connection.execute( text( 
-        "SELECT type, COUNT(*) as count "
-        "FROM staging_transactions "
-        "GROUP BY type "
-        "ORDER BY count DESC "
-      ) )
-
-      logger.info( "Transaction type distribution:" )
-      for row in result:
-        logger.info( f"{ row[ 0 ] }: { row[ 1 ] } rows" )
-
-      logger.info( f"Ingestion verified successfully" )
+    expected_rows = baseline_rows + stats.rows
+    if actual_rows != expected_rows:
+      logger.error( f"Expected { expected_rows } rows, but got { actual_rows }" )
+      raise ValueError( f"Expected { expected_rows } rows, but got { actual_rows }" )
+    else:
+      logger.info( f"Row count matches" )
+
+    stats.log_summary()
+
+    logger.info( f"Ingestion verified successfully" )
 
   except Exception as e:
     logger.error( f"Error verifying ingestion: { e }" )
     raise
 
-def load_staging_table( csv_file_path: str, chunk_size: int = 1000 ) -> None:
+def load_staging_table( csv_file_path: str, method: str = None, chunk_size: int = None, truncate: bool = True ) -> dict:
   try:
 
-    validate_schema( csv_file_path )
-    
-    engine = create_db_engine()
+    ingestion_config = load_config().ingestion
 
-    logger.info( "Clearing existing data..." )
-    # Clear existing data
-    with engine.connect() as connection:
-      connection.execute( text( "TRUNCATE TABLE staging_transactions" ) )
-      connection.commit()
-    logger.info( "Existing data cleared" )
+    # Header up front; rows are validated chunk by chunk as they load
+    check_header( pd.read_csv( csv_file_path, nrows = 0 ).columns.tolist() )
+    validator = None
+    if ingestion_config.validate_rows:
+      validator = StreamingSchemaValidator(
+        on_error = ingestion_config.on_invalid_rows,
+        reject_path = ingestion_config.reject_file
+      )
 
-    logger.info( f"Loading staging table from { csv_file_path }..." )
+    method = method or ingestion_config.method
+    chunk_size = chunk_size or ingestion_config.chunk_size
+
+    # pymysql refuses LOAD DATA LOCAL INFILE unless the client opts in
+    engine = create_db_engine( connect_args = { 'local_infile': True } if method != 'executemany' else None )
+
+    # Incremental loads append to staging; the star schema picks up steps past its watermark
+    baseline_rows = 0
+    if truncate:
+      logger.info( "Clearing existing data..." )
+      # Clear existing data
+      with engine.connect() as connection:
+        connection.execute( text( "TRUNCATE TABLE staging_transactions" ) )
+        # An unfinished fact rebuild belongs to the old staging rows and must not be resumed
+        if inspect( connection ).has_table( 'etl_watermarks' ):
+          delete_watermark( connection, REBUILD_CHECKPOINT )
+        connection.commit()
+      logger.info( "Existing data cleared" )
+    else:
+      with engine.connect() as connection:
+        baseline_rows = connection.execute( text( "SELECT COUNT(*) FROM staging_transactions" ) ).fetchone()[ 0 ]
+      logger.info( f"Appending to { baseline_rows } existing staging rows" )
 
-    logger.info( "Counting rows..." )
-    with open( csv_file_path, 'r' ) as file:
-      total_rows = sum( 1 for _ in file ) - 1 # Subtract header row
-    logger.info( f"Total rows: { total_rows }" )
-
-    # Load in chunks for memory efficiency
-    rows_ingested = 0
-    for chunk in pd.read_csv( csv_file_path, chunksize = chunk_size ):
-      chunk.to_sql( 
-        'staging_transactions', 
-        con = engine, 
-        if_exists = 'append', 
-        index = False,
-        method = 'multi'
-      )
+    logger.info( f"Loading staging table from { csv_file_path }..." )
 
-    rows_ingested += len( chunk )
-  
-    logger.info( "CSV ingestion completed" )
+    load_stats = bulk_load_csv(
+      engine,
+      csv_file_path,
+      method = method,
+      chunk_size = chunk_size,
+      max_chunk_size = ingestion_config.max_chunk_size,
+      workers = ingestion_config.workers,
+      queue_size = ingestion_config.queue_size,
+      commit_every = ingestion_config.commit_every,
+      csv_engine = ingestion_config.csv_engine,
+      validator = validator
+    )
+
+    if validator is not None:
+      validator.log_report()
+      load_stats[ 'validation' ] = validator.report()
+
+    logger.info( f"CSV ingestion completed: { load_stats[ 'rows' ] } rows ingested" )
     
-    verify_ingestion( engine, total_rows )
+    verify_ingestion( engine, load_stats[ 'stats' ], baseline_rows )
+
+    return load_stats
 
   except Exception as e:
     logger.error( f"Error loading staging table: { e }" )
@@ -113,8 +118,7 @@ if __name__ == "__main__":
     csv_file_path = sys.argv[ 1 ]
   else:
     # Use default path from config
-    config = yaml.safe_load( open( 'config/config.yaml' ) )
-    csv_file_path = config.get( 'data', {} ).get( 'raw_csv', 'data/raw/paysim1.csv' )
+    csv_file_path = load_config().data.raw_csv
 
   load_staging_table( csv_file_path )
   
\ No newline at end of file
@@ -0,0 +1,81 @@
+# System imports
+import sys
+import logging
+from pathlib import Path
+# DB
+from sqlalchemy import Engine, text
+
+# Add parent directory to path to import database module
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.database import create_db_engine
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+MIGRATIONS_DIR = 'sql/migrations'
+
+# Migrations are applied in file name order; the version is the file stem
+def list_migrations( migrations_dir: str = MIGRATIONS_DIR ) -> list[ Path ]:
+  return sorted( Path( migrations_dir ).glob( '*.sql' ) )
+
+def ensure_migrations_table( engine: Engine ) -> None:
+  with engine.connect() as connection:
+    connection.execute( text(
+      "CREATE TABLE IF NOT EXISTS schema_migrations ("
+      "version VARCHAR(128) NOT NULL PRIMARY KEY, "
+      "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ) )
+    connection.commit()
+
+def applied_migrations( engine: Engine ) -> set[ str ]:
+  ensure_migrations_table( engine )
+  with engine.connect() as connection:
+    result = connection.execute( text( "SELECT version FROM schema_migrations" ) )
+    return { row[ 0 ] for row in result }
+
+def pending_migrations( engine: Engine, migrations_dir: str = MIGRATIONS_DIR ) -> list[ Path ]:
+  applied = applied_migrations( engine )
+  return [ path for path in list_migrations( migrations_dir ) if path.stem not in applied ]
+
+def record_migration( engine: Engine, version: str ) -> None:
+  with engine.connect() as connection:
+    connection.execute( text( "INSERT IGNORE INTO schema_migrations (version) VALUES (:version)" ), { 'version': version } )
+    connection.commit()
+
+def baseline_migrations( engine: Engine, migrations_dir: str = MIGRATIONS_DIR ) -> None:
+  # A schema freshly created from sql/create_star_schema.sql already has every migration
+  for path in pending_migrations( engine, migrations_dir ):
+    record_migration( engine, path.stem )
+    logger.info( f"Migration { path.stem } marked as applied" )
+
+def apply_migrations( engine: Engine, migrations_dir: str = MIGRATIONS_DIR ) -> list[ str ]:
+  try:
+    applied = []
+    for path in pending_migrations( engine, migrations_dir ):
+      logger.info( f"Applying migration { path.stem }..." )
+
+      statements = [ statement.strip() for statement in path.read_text().split( ';' ) if statement.strip() ]
+      # DDL commits implicitly in MySQL, so each file is written to be safely re-run
+      with engine.connect() as connection:
+        for statement in statements:
+          connection.execute( text( statement ) )
+          connection.commit()
+
+      record_migration( engine, path.stem )
+      applied.append( path.stem )
+      logger.info( f"Migration { path.stem } applied" )
+
+    if not applied:
+      logger.info( "Schema is up to date" )
+    return applied
+
+  except Exception as e:
+    logger.error( f"Error applying migrations: { e }" )
+    raise
+
+if __name__ == "__main__":
+  apply_migrations( create_db_engine() )
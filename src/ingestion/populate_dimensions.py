@@ -1,5 +1,6 @@
 # System imports
 import logging
+from typing import Optional
 # Database
 from sqlalchemy import Engine, text
 
@@ -10,7 +11,10 @@ logging.basicConfig(
 
 logger = logging.getLogger( __name__ )
 
-def populate_dim_time( engine: Engine ) -> int:
+def populate_dim_time( engine: Engine, high_water_mark: Optional[ int ] = None ) -> int:
+  if high_water_mark is not None:
+    return append_dim_time( engine, high_water_mark )
+
   logger.info( "Clearing existing data..." )
 
   with engine.connect() as connection:
@@ -44,7 +48,10 @@ def populate_dim_time( engine: Engine ) -> int:
 
   return count
 
-def populate_dim_account( engine: Engine ) -> int:
+def populate_dim_account( engine: Engine, high_water_mark: Optional[ int ] = None ) -> int:
+  if high_water_mark is not None:
+    return append_dim_account( engine, high_water_mark )
+
   logger.info( "Clearing existing data..." )
 
   with engine.connect() as connection:
@@ -80,4 +87,49 @@ def populate_dim_account( engine: Engine ) -> int:
     count = count_result.fetchone()[ 0 ]
     logger.info( f"Unique accounts inserted into dim_account: { count }" )
 
-  return count
\ No newline at end of file
+  return count
+
+# Incremental mode: only staging rows past the watermark are read, and the unique natural
+# keys make INSERT IGNORE skip members that are already in the dimension
+def append_dim_time( engine: Engine, high_water_mark: int ) -> int:
+  logger.info( f"Appending new steps after { high_water_mark } to dim_time..." )
+
+  sql = """
+    INSERT IGNORE INTO dim_time (step, hour, day)
+    SELECT DISTINCT
+      st.step,
+      st.step % 24 as hour,
+      FLOOR(st.step / 24) as day
+    FROM staging_transactions st
+    WHERE st.step > :high_water_mark
+    ORDER BY st.step
+  """
+
+  with engine.connect() as connection:
+    result = connection.execute( text( sql ), { 'high_water_mark': high_water_mark } )
+    connection.commit()
+
+  logger.info( f"New steps inserted into dim_time: { result.rowcount }" )
+  return result.rowcount
+
+def append_dim_account( engine: Engine, high_water_mark: int ) -> int:
+  logger.info( f"Appending new accounts after step { high_water_mark } to dim_account..." )
+
+  sql = """
+    INSERT IGNORE INTO dim_account (account_id, account_type)
+    SELECT
+      new_accounts.account_id,
+      SUBSTRING(new_accounts.account_id, 1, 1) as account_type
+    FROM (
+      SELECT nameOrig as account_id FROM staging_transactions WHERE step > :high_water_mark
+      UNION
+      SELECT nameDest as account_id FROM staging_transactions WHERE step > :high_water_mark
+    ) AS new_accounts
+  """
+
+  with engine.connect() as connection:
+    result = connection.execute( text( sql ), { 'high_water_mark': high_water_mark } )
+    connection.commit()
+
+  logger.info( f"New accounts inserted into dim_account: { result.rowcount }" )
+  return result.rowcount
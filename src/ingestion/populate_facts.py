@@ -1,8 +1,17 @@
 # System imports
+import sys
 import logging
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 # Database
 from sqlalchemy import Engine, text
 
+# Add parent directory to path to import custom modules
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.ingestion.watermarks import STAR_SCHEMA_WATERMARK, STAGING_ID_WATERMARK, REBUILD_CHECKPOINT, get_watermark, set_watermark, delete_watermark
+
 logging.basicConfig( 
   level = logging.INFO,
   format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -10,62 +19,183 @@ logging.basicConfig(
 
 logger = logging.getLogger( __name__ )
 
-def populate_fact_transactions( engine: Engine ) -> int:
+# Staging rows joined to their dimension keys. Each dimension is probed through its unique
+# natural key; src/ingestion/query_plan_check.py EXPLAINs this same statement
+FACT_SELECT_SQL = """
+  SELECT
+    dt.id as time_key,
+    tt.id as type_key,
+    da_orig.id as origin_account_key,
+    da_dest.id as destination_account_key,
+    st.amount,
+    st.oldbalanceOrg,
+    st.newbalanceOrig,
+    st.oldbalanceDest,
+    st.newbalanceDest,
+    st.isFraud,
+    st.isFlaggedFraud
+  FROM staging_transactions st
+  INNER JOIN dim_time dt ON st.step = dt.step
+  INNER JOIN dim_transaction_type tt ON st.type = tt.type_name
+  INNER JOIN dim_account da_orig ON st.nameOrig = da_orig.account_id
+  INNER JOIN dim_account da_dest ON st.nameDest = da_dest.account_id
+  WHERE st.step > :high_water_mark
+    AND st.step <= :upper_step
+"""
 
-  logger.info( "Clearing existing data..." )
+FACT_INSERT_SQL = """
+  INSERT INTO fact_transactions (
+    time_key,
+    type_key,
+    origin_account_key,
+    destination_account_key,
+    amount,
+    old_balance_orig,
+    new_balance_orig,
+    old_balance_dest,
+    new_balance_dest,
+    is_fraud,
+    is_flagged_fraud
+  )
+""" + FACT_SELECT_SQL
+
+def step_ranges( lower_step: int, upper_step: int, batch_steps: int ) -> List[ Tuple[ int, int ] ]:
+  # Half-open ( lower, upper ] keyset ranges over staging.step
+  return [ ( lower, min( lower + batch_steps, upper_step ) ) for lower in range( lower_step, upper_step, batch_steps ) ]
+
+def delete_facts_after( engine: Engine, step: int ) -> int:
+  # Ranges finished out of order past the checkpoint; they are redone on resume
+  with engine.connect() as connection:
+    result = connection.execute( text(
+      "DELETE ft FROM fact_transactions ft "
+      "INNER JOIN dim_time dt ON ft.time_key = dt.id "
+      "WHERE dt.step > :step"
+    ), { 'step': step } )
+    connection.commit()
 
+  if result.rowcount:
+    logger.info( f"Removed { result.rowcount } facts after checkpoint step { step }" )
+  return result.rowcount
+
+def insert_fact_range( engine: Engine, lower_step: int, upper_step: int ) -> int:
+  # One short transaction per range keeps undo logs and lock time bounded
   with engine.connect() as connection:
-    # Disable FK checks temporarily to allow truncation
-    connection.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
-    connection.execute( text( "TRUNCATE TABLE fact_transactions" ) )
-    # Re-enable FK checks
-    connection.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+    result = connection.execute( text( FACT_INSERT_SQL ), { 'high_water_mark': lower_step, 'upper_step': upper_step } )
     connection.commit()
+  return result.rowcount
+
+def count_late_rows( engine: Engine, high_water_mark: int, max_id: int ) -> int:
+  # Rows appended since the last load whose step is already behind the watermark: keyset
+  # ranges over step never reach them, so only a full rebuild loads them
+  with engine.connect() as connection:
+    last_id = get_watermark( connection, STAGING_ID_WATERMARK )
+    if last_id is None:
+      return 0
+    late_rows = connection.execute( text(
+      "SELECT COUNT(*) FROM staging_transactions "
+      "WHERE id > :last_id AND id <= :max_id AND step <= :high_water_mark"
+    ), { 'last_id': last_id, 'max_id': max_id, 'high_water_mark': high_water_mark } ).fetchone()[ 0 ]
+
+  if late_rows:
+    logger.warning( f"{ late_rows } appended staging rows have steps at or before { high_water_mark } and were not loaded; run a full rebuild to include them" )
+  return int( late_rows )
+
+def populate_fact_transactions(
+  engine: Engine,
+  high_water_mark: Optional[ int ] = None,
+  batch_steps: int = 24,
+  workers: int = 1
+) -> int:
+
+  # A full rebuild checkpoints under its own name, so an interrupted one resumes instead of truncating again
+  if high_water_mark is None:
+    checkpoint_name = REBUILD_CHECKPOINT
+    with engine.connect() as connection:
+      checkpoint = get_watermark( connection, REBUILD_CHECKPOINT )
+
+    if checkpoint is None:
+      logger.info( "Clearing existing data..." )
+
+      with engine.connect() as connection:
+        # Disable FK checks temporarily to allow truncation
+        connection.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
+        connection.execute( text( "TRUNCATE TABLE fact_transactions" ) )
+        # Re-enable FK checks
+        connection.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+        # Steps start at 1, so -1 covers the whole staging table
+        checkpoint = -1
+        set_watermark( connection, REBUILD_CHECKPOINT, checkpoint )
+        connection.commit()
+
+      logger.info( "Inserting data into fact_transactions..." )
+    else:
+      logger.info( f"Resuming interrupted rebuild of fact_transactions after step { checkpoint }..." )
+  else:
+    checkpoint_name = STAR_SCHEMA_WATERMARK
+    checkpoint = high_water_mark
+    logger.info( f"Appending facts after step { high_water_mark } to fact_transactions..." )
+
+  delete_facts_after( engine, checkpoint )
+
+  with engine.connect() as connection:
+    max_step, max_id = connection.execute( text( "SELECT MAX(step), MAX(id) FROM staging_transactions" ) ).fetchone()
+
+  if high_water_mark is not None and max_id is not None:
+    count_late_rows( engine, high_water_mark, int( max_id ) )
+
+  ranges = step_ranges( checkpoint, int( max_step ), batch_steps ) if max_step is not None else []
+  logger.info( f"Populating { len( ranges ) } step ranges of { batch_steps } steps with { workers } workers..." )
+
+  # The checkpoint only moves past a range once every range before it has committed
+  done = set()
+  lock = threading.Lock()
+  state = { 'checkpoint': checkpoint, 'next': 0, 'rows': 0 }
+
+  def complete( index: int, rows: int ) -> None:
+    with lock:
+      done.add( index )
+      state[ 'rows' ] += rows
+      advanced = False
+      while state[ 'next' ] in done:
+        state[ 'checkpoint' ] = ranges[ state[ 'next' ] ][ 1 ]
+        state[ 'next' ] += 1
+        advanced = True
+
+      if advanced:
+        with engine.connect() as connection:
+          set_watermark( connection, checkpoint_name, state[ 'checkpoint' ] )
+          connection.commit()
+
+  if workers > 1:
+    with ThreadPoolExecutor( max_workers = workers ) as executor:
+      futures = { executor.submit( insert_fact_range, engine, lower, upper ): index for index, ( lower, upper ) in enumerate( ranges ) }
+      try:
+        for future in as_completed( futures ):
+          complete( futures[ future ], future.result() )
+      except Exception:
+        executor.shutdown( wait = True, cancel_futures = True )
+        raise
+  else:
+    for index, ( lower, upper ) in enumerate( ranges ):
+      complete( index, insert_fact_range( engine, lower, upper ) )
 
-    logger.info( "Inserting data into fact_transactions..." )
-
-    # Insert data into fact_transactions
-    sql = """
-      INSERT INTO fact_transactions (
-        time_key,
-        type_key,
-        origin_account_key,
-        destination_account_key,
-        amount,
-        old_balance_orig,
-        new_balance_orig,
-        old_balance_dest,
-        new_balance_dest,
-        is_fraud,
-        is_flagged_fraud
-      ) 
-      SELECT 
-        dt.id,
-        tt.id,
-        da_orig.id,
-        da_dest.id,
-        st.amount,
-        st.oldbalanceOrg,
-        st.newbalanceOrig,
-        st.oldbalanceDest,
-        st.newbalanceDest,
-        st.isFraud,
-        st.isFlaggedFraud
-      FROM staging_transactions st 
-      INNER JOIN dim_time dt ON st.step = dt.step 
-      INNER JOIN dim_transaction_type tt ON st.type = tt.type_name 
-      INNER JOIN dim_account da_orig ON st.nameOrig = da_orig.account_id 
-      INNER JOIN dim_account da_dest ON st.nameDest = da_dest.account_id
-    """
-
-    connection.execute( text( sql ) )
+  with engine.connect() as connection:
+    # Facts are complete up to the last staged step, whichever way they were loaded
+    if max_step is not None:
+      set_watermark( connection, STAR_SCHEMA_WATERMARK, max( int( max_step ), checkpoint ) )
+      set_watermark( connection, STAGING_ID_WATERMARK, int( max_id ) )
+    if checkpoint_name == REBUILD_CHECKPOINT:
+      delete_watermark( connection, REBUILD_CHECKPOINT )
     connection.commit()
 
     # Verify
-    count_result = connection.execute( text( "SELECT COUNT(*) FROM fact_transactions" ) )
-    count = count_result.fetchone()[ 0 ]
-
-    logger.info( f"Fact transactions inserted: { count }" )
+    if high_water_mark is None:
+      count_result = connection.execute( text( "SELECT COUNT(*) FROM fact_transactions" ) )
+      count = count_result.fetchone()[ 0 ]
+      logger.info( f"Fact transactions inserted: { count }" )
+    else:
+      count = state[ 'rows' ]
+      logger.info( f"New fact transactions appended: { count }" )
 
   return count
 
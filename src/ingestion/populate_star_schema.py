@@ -5,9 +5,12 @@ from pathlib import Path
 
 # Add parent directory to path to import database module
 sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.config import load_config
 from src.database import create_db_engine
+from src.ingestion.create_schema import ensure_natural_key_indexes
 from src.ingestion.populate_dimensions import populate_dim_time, populate_dim_account
 from src.ingestion.populate_facts import populate_fact_transactions, verify_referential_integrity, show_fraud_distribution
+from src.ingestion.watermarks import STAR_SCHEMA_WATERMARK, REBUILD_CHECKPOINT, get_watermark
 
 logging.basicConfig( 
   level = logging.INFO,
@@ -16,20 +19,53 @@ logging.basicConfig(
 
 logger = logging.getLogger( __name__ )
 
-def populate_star_schema() -> None:
+POPULATE_MODES = ( 'full', 'incremental' )
+
+def populate_star_schema( mode: str = 'full' ) -> None:
   try:
+    if mode not in POPULATE_MODES:
+      raise ValueError( f"Unknown populate mode: { mode } (expected one of { POPULATE_MODES })" )
+
     engine = create_db_engine()
-    logger.info( "Populating star schema..." )
+    star_schema_config = load_config().star_schema
+    logger.info( f"Populating star schema ({ mode })..." )
+
+    with engine.connect() as connection:
+      rebuild_checkpoint = get_watermark( connection, REBUILD_CHECKPOINT )
+      star_schema_watermark = get_watermark( connection, STAR_SCHEMA_WATERMARK )
+
+    # None means truncate and rebuild; otherwise only staging steps past the mark are loaded
+    high_water_mark = None
+    if rebuild_checkpoint is not None:
+      # The dimensions were complete before the checkpoint was first written
+      logger.warning( f"Unfinished full rebuild found (facts done up to step { rebuild_checkpoint }), resuming it" )
+    elif mode == 'incremental':
+      high_water_mark = star_schema_watermark
+      if high_water_mark is None:
+        logger.warning( "No star schema watermark found, running a full rebuild" )
+      else:
+        logger.info( f"Star schema watermark: step { high_water_mark }" )
+
+    # Dimension upserts and fact lookups both rely on these
+    ensure_natural_key_indexes( engine )
 
-    populate_dim_time( engine )
+    if rebuild_checkpoint is None:
+      populate_dim_time( engine, high_water_mark )
 
-    populate_dim_account( engine )
+      populate_dim_account( engine, high_water_mark )
 
-    populate_fact_transactions( engine )
+    populate_fact_transactions(
+      engine,
+      high_water_mark,
+      batch_steps = star_schema_config.fact_batch_steps,
+      workers = star_schema_config.fact_workers
+    )
 
-    verify_referential_integrity( engine )
+    # Both scan the whole fact table, so incremental runs skip them
+    if high_water_mark is None:
+      verify_referential_integrity( engine )
 
-    show_fraud_distribution( engine )
+      show_fraud_distribution( engine )
 
     logger.info( "Star schema populated successfully" )
 
@@ -38,4 +74,4 @@ def populate_star_schema() -> None:
     raise
 
 if __name__ == "__main__":
-  populate_star_schema()
\ No newline at end of file
+  populate_star_schema( sys.argv[ 1 ] if len( sys.argv ) > 1 else 'full' )
\ No newline at end of file
@@ -0,0 +1,99 @@
+# System imports
+import sys
+import time
+import argparse
+import logging
+from pathlib import Path
+from typing import Any, Dict, List
+# Database
+from sqlalchemy import Engine, text
+
+# Add parent directory to path to import custom modules
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.database import create_db_engine
+from src.ingestion.populate_facts import FACT_SELECT_SQL
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+# EXPLAIN access types that read a whole table or a whole index
+FULL_SCAN_TYPES = { 'ALL', 'index' }
+
+# Staging is the driving table and is meant to be read in full (or by step range)
+FULL_SCAN_ALLOWED = { 'st' }
+
+# Upper bound of the step range when explaining or timing the whole staging table
+MAX_STEP = 2 ** 31 - 1
+
+# Below this many estimated rows a full scan is cheaper than an index probe (e.g. the 5 transaction types)
+SMALL_TABLE_ROWS = 1000
+
+def explain( engine: Engine, sql: str, params: Dict[ str, Any ] ) -> List[ Dict[ str, Any ] ]:
+  with engine.connect() as connection:
+    result = connection.execute( text( f"EXPLAIN { sql }" ), params )
+    return [ dict( row ) for row in result.mappings() ]
+
+def find_full_scans( plan: List[ Dict[ str, Any ] ] ) -> List[ Dict[ str, Any ] ]:
+  return [
+    row for row in plan
+    if row.get( 'type' ) in FULL_SCAN_TYPES
+    and row.get( 'table' ) not in FULL_SCAN_ALLOWED
+    and ( row.get( 'rows' ) or 0 ) >= SMALL_TABLE_ROWS
+  ]
+
+def check_fact_population_plan( engine: Engine, high_water_mark: int = -1, upper_step: int = MAX_STEP ) -> List[ Dict[ str, Any ] ]:
+  logger.info( f"Explaining fact population (steps { high_water_mark } < step <= { upper_step })..." )
+
+  plan = explain( engine, FACT_SELECT_SQL, { 'high_water_mark': high_water_mark, 'upper_step': upper_step } )
+  for row in plan:
+    logger.info( f"{ row.get( 'table' ) }: type={ row.get( 'type' ) } key={ row.get( 'key' ) } rows={ row.get( 'rows' ) } extra={ row.get( 'Extra' ) }" )
+
+  full_scans = find_full_scans( plan )
+  if full_scans:
+    tables = ', '.join( f"{ row.get( 'table' ) } ({ row.get( 'type' ) }, ~{ row.get( 'rows' ) } rows)" for row in full_scans )
+    logger.error( f"Fact population falls back to full scans: { tables }" )
+    raise RuntimeError( f"Fact population falls back to full scans: { tables }" )
+
+  logger.info( "Every dimension join uses an index" )
+  return plan
+
+def time_fact_select( engine: Engine, high_water_mark: int = -1, upper_step: int = MAX_STEP, repeats: int = 3 ) -> Dict[ str, Any ]:
+  # Times the join alone; the INSERT on top of it is not executed
+  sql = f"SELECT COUNT(*) FROM ( { FACT_SELECT_SQL } ) AS fact_rows"
+
+  timings = []
+  with engine.connect() as connection:
+    for _ in range( repeats ):
+      start = time.perf_counter()
+      rows = connection.execute( text( sql ), { 'high_water_mark': high_water_mark, 'upper_step': upper_step } ).fetchone()[ 0 ]
+      timings.append( time.perf_counter() - start )
+
+  result = {
+    'rows': rows,
+    'repeats': repeats,
+    'min_seconds': min( timings ),
+    'mean_seconds': sum( timings ) / len( timings )
+  }
+  logger.info( f"Fact join: { rows } rows, best { result[ 'min_seconds' ]:.3f}s over { repeats } runs" )
+  return result
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser( description = "Check that fact population joins use the dimension indexes" )
+  parser.add_argument( "--high-water-mark", type = int, default = -1, help = "Only explain staging steps after this one" )
+  parser.add_argument( "--upper-step", type = int, default = MAX_STEP, help = "...and up to this one, e.g. one population batch" )
+  parser.add_argument( "--time", action = "store_true", help = "Also time the fact join" )
+  parser.add_argument( "--repeats", type = int, default = 3 )
+  args = parser.parse_args()
+
+  engine = create_db_engine()
+  try:
+    check_fact_population_plan( engine, args.high_water_mark, args.upper_step )
+  except RuntimeError:
+    sys.exit( 1 )
+
+  if args.time:
+    time_fact_select( engine, args.high_water_mark, args.upper_step, args.repeats )
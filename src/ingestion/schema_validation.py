@@ -1,6 +1,10 @@
 # System imports
 import sys
 import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+# Numerical computing
+import numpy as np
 # Data manipulation
 import pandas as pd
 
@@ -30,43 +34,161 @@ EXPECTED_TYPES: set[ str ] = {
   'CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER'
 }
 
-def validate_schema( csv_file_path: str ) -> bool:
+INTEGER_COLUMNS: List[ str ] = [ 'step', 'isFraud', 'isFlaggedFraud' ]
+FLAG_COLUMNS: List[ str ] = [ 'isFraud', 'isFlaggedFraud' ]
+AMOUNT_COLUMNS: List[ str ] = [ 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest' ]
+ACCOUNT_COLUMNS: List[ str ] = [ 'nameOrig', 'nameDest' ]
+
+ON_ERROR_POLICIES = ( 'abort', 'quarantine' )
+
+def check_header( columns: List[ str ] ) -> None:
+  missing_cols = EXPECTED_COLUMNS - set( columns )
+  if missing_cols:
+    logger.error( f"Missing columns: { missing_cols }" )
+    raise ValueError( f"Missing columns: { missing_cols }" )
+
+  extra_cols = set( columns ) - EXPECTED_COLUMNS
+  if extra_cols:
+    logger.error( f"Extra columns: { extra_cols }" )
+    raise ValueError( f"Extra columns: { extra_cols }" )
+
+class StreamingSchemaValidator:
+  """
+  Row-level validation of every chunk of the PaySim CSV, run inside the ingestion pass.
+
+  Each rule is a vectorized mask over the chunk. Violations are counted per rule with
+  the first few offending row offsets (0-based data rows). Bad rows either abort the
+  load or are written to a reject CSV while the valid rows continue.
+  """
+
+  def __init__(
+    self,
+    on_error: str = 'abort',
+    reject_path: Optional[ str ] = None,
+    max_offsets: int = 10
+  ) -> None:
+    if on_error not in ON_ERROR_POLICIES:
+      raise ValueError( f"Unknown on_error policy: { on_error } (expected one of { ON_ERROR_POLICIES })" )
+    if on_error == 'quarantine' and reject_path is None:
+      raise ValueError( "Quarantining invalid rows needs a reject_path" )
+
+    self.on_error = on_error
+    self.reject_path = Path( reject_path ) if reject_path else None
+    self.max_offsets = max_offsets
+    self.rows_checked = 0
+    self.rows_rejected = 0
+    self.violations: Dict[ str, Dict ] = {}
+    self._reject_header_written = False
+
+  def _rule_masks( self, chunk: pd.DataFrame, numeric: Dict[ str, pd.Series ] ) -> Dict[ str, np.ndarray ]:
+    masks = {}
+
+    masks[ 'type:invalid_value' ] = ~chunk[ 'type' ].isin( EXPECTED_TYPES ).to_numpy()
+
+    # Empty CSV fields are already parsed as NaN
+    for column in ACCOUNT_COLUMNS:
+      masks[ f'{ column }:missing' ] = chunk[ column ].isna().to_numpy()
+
+    for column in INTEGER_COLUMNS + AMOUNT_COLUMNS:
+      values = numeric[ column ].to_numpy()
+      masks[ f'{ column }:missing_or_non_numeric' ] = np.isnan( values )
+
+    for column in INTEGER_COLUMNS:
+      values = numeric[ column ].to_numpy()
+      masks[ f'{ column }:not_integer' ] = ~np.isnan( values ) & ( values != np.floor( values ) )
+
+    for column in FLAG_COLUMNS:
+      values = numeric[ column ].to_numpy()
+      masks[ f'{ column }:not_binary' ] = ~np.isnan( values ) & ( values != 0 ) & ( values != 1 )
+
+    masks[ 'step:negative' ] = numeric[ 'step' ].to_numpy() < 0
+    for column in AMOUNT_COLUMNS:
+      masks[ f'{ column }:negative' ] = numeric[ column ].to_numpy() < 0
+
+    return masks
+
+  def _record( self, rule: str, offsets: np.ndarray ) -> None:
+    violation = self.violations.setdefault( rule, { 'count': 0, 'first_offsets': [] } )
+    violation[ 'count' ] += len( offsets )
+    room = self.max_offsets - len( violation[ 'first_offsets' ] )
+    if room > 0:
+      violation[ 'first_offsets' ].extend( offsets[ :room ].tolist() )
+
+  def _quarantine( self, chunk: pd.DataFrame, offsets: np.ndarray, rules: List[ str ] ) -> None:
+    rejects = chunk.copy()
+    rejects.insert( 0, 'row_offset', offsets )
+    rejects[ 'violations' ] = rules
+
+    self.reject_path.parent.mkdir( parents = True, exist_ok = True )
+    rejects.to_csv( self.reject_path, mode = 'a' if self._reject_header_written else 'w', header = not self._reject_header_written, index = False )
+    self._reject_header_written = True
+
+  def validate( self, chunk: pd.DataFrame ) -> pd.DataFrame:
+    offset = self.rows_checked
+    self.rows_checked += len( chunk )
+
+    # Unparsable numbers become NaN, so one float view serves every numeric rule
+    numeric = { column: pd.to_numeric( chunk[ column ], errors = 'coerce' ).astype( np.float64 ) for column in INTEGER_COLUMNS + AMOUNT_COLUMNS }
+    masks = self._rule_masks( chunk, numeric )
+
+    invalid = np.zeros( len( chunk ), dtype = bool )
+    for rule, mask in masks.items():
+      if mask.any():
+        self._record( rule, offset + np.flatnonzero( mask ) )
+        invalid |= mask
+
+    if invalid.any():
+      n_invalid = int( invalid.sum() )
+      if self.on_error == 'abort':
+        self.log_report()
+        raise ValueError( f"{ n_invalid } invalid rows in chunk starting at row { offset }: { self.summary() }" )
+
+      rows = np.flatnonzero( invalid )
+      rules = [ ';'.join( rule for rule, mask in masks.items() if mask[ row ] ) for row in rows ]
+      self._quarantine( chunk.iloc[ rows ], offset + rows, rules )
+      self.rows_rejected += n_invalid
+
+    clean = chunk.loc[ ~invalid ].copy() if invalid.any() else chunk
+    # Columns parsed as text because of a bad value are restored to their real types
+    for column in INTEGER_COLUMNS:
+      clean[ column ] = numeric[ column ][ ~invalid ].astype( np.int64 ).to_numpy()
+    for column in AMOUNT_COLUMNS:
+      clean[ column ] = numeric[ column ][ ~invalid ].to_numpy()
+
+    return clean
+
+  def summary( self ) -> str:
+    return ', '.join( f"{ rule }: { violation[ 'count' ] }" for rule, violation in self.violations.items() )
+
+  def report( self ) -> Dict:
+    return {
+      'rows_checked': self.rows_checked,
+      'rows_rejected': self.rows_rejected,
+      'reject_path': str( self.reject_path ) if self.reject_path and self.rows_rejected else None,
+      'violations': self.violations
+    }
+
+  def log_report( self ) -> None:
+    if not self.violations:
+      logger.info( f"Schema validation passed for all { self.rows_checked } rows" )
+      return
+
+    logger.warning( f"Schema violations in { self.rows_checked } rows checked:" )
+    for rule, violation in self.violations.items():
+      logger.warning( f"{ rule }: { violation[ 'count' ] } rows (first at { violation[ 'first_offsets' ] })" )
+    if self.rows_rejected:
+      logger.warning( f"{ self.rows_rejected } rows quarantined to { self.reject_path }" )
+
+def validate_schema( csv_file_path: str, chunk_size: int = 100000 ) -> bool:
   try:
     logger.info( f"Validating schema for { csv_file_path }..." )
 
-    # Read the first 1000 rows of the CSV file to validate the schema
-    data_frame = pd.read_csv( csv_file_path, nrows = 1000 )
+    # Header first, then every row in chunks
+    check_header( pd.read_csv( csv_file_path, nrows = 0 ).columns.tolist() )
 
-    # Check if the columns are as expected
-    missing_cols = ( EXPECTED_COLUMNS ) - set[ str ]( data_frame.columns )
-    if missing_cols:
-      logger.error( f"Missing columns: { missing_cols }" )
-      raise ValueError( f"Missing columns: { missing_cols }" )
-
-    extra_cols = set[ str ]( data_frame.columns ) - ( EXPECTED_COLUMNS )
-    if extra_cols:
-      logger.error( f"Extra columns: { extra_cols }" )
-      raise ValueError( f"Extra columns: { extra_cols }" )
-
-    unique_types = set[ str ]( data_frame[ 'type' ].unique() )
-    invalid_types = unique_types - EXPECTED_TYPES
-
-    if invalid_types:
-      logger.error( f"Invalid types: { invalid_types }" )
-      raise ValueError( f"Invalid types: { invalid_types }" )
-
-    # Check data types
-    if not pd.api.types.is_integer_dtype( data_frame[ 'step' ] ):
-      logger.error( f"Step column is not an integer" )
-      raise ValueError( f"Step column is not an integer" )
-
-    if not pd.api.types.is_float_dtype( data_frame[ 'amount' ] ):
-      logger.error( f"Amount column is not a float" )
-      raise ValueError( f"Amount column is not a float" )
-
-    if not pd.api.types.is_integer_dtype( data_frame[ 'isFraud' ] ):
-      logger.error( f"isFraud column is not an integer" )
-      raise ValueError( f"isFraud column is not an integer" )
+    validator = StreamingSchemaValidator( on_error = 'abort' )
+    for chunk in pd.read_csv( csv_file_path, chunksize = chunk_size ):
+      validator.validate( chunk )
 
     logger.info( "Schema validation successful" )
     return True
@@ -0,0 +1,44 @@
+# System imports
+import logging
+from typing import Optional
+# Database
+from sqlalchemy import Connection, text
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+# Highest staging step already loaded into the star schema
+STAR_SCHEMA_WATERMARK = 'star_schema'
+
+# Highest staging id seen by the last star schema load; appended rows past it with steps at or
+# before the star schema watermark arrived late and are not picked up incrementally
+STAGING_ID_WATERMARK = 'staging_id'
+
+# Last step of a full fact rebuild that is still in progress; absent once it completes
+REBUILD_CHECKPOINT = 'fact_transactions_rebuild'
+
+def get_watermark( connection: Connection, name: str ) -> Optional[ int ]:
+  result = connection.execute(
+    text( "SELECT high_water_mark FROM etl_watermarks WHERE name = :name" ),
+    { 'name': name }
+  )
+  row = result.fetchone()
+  return None if row is None else int( row[ 0 ] )
+
+def set_watermark( connection: Connection, name: str, value: int ) -> None:
+  # Runs on the caller's connection so it commits together with the rows it describes
+  connection.execute(
+    text(
+      "INSERT INTO etl_watermarks (name, high_water_mark) VALUES (:name, :value) "
+      "ON DUPLICATE KEY UPDATE high_water_mark = VALUES(high_water_mark)"
+    ),
+    { 'name': name, 'value': value }
+  )
+  logger.info( f"Watermark { name } set to { value }" )
+
+def delete_watermark( connection: Connection, name: str ) -> None:
+  connection.execute( text( "DELETE FROM etl_watermarks WHERE name = :name" ), { 'name': name } )
@@ -0,0 +1,169 @@
+# System
+import logging
+from pathlib import Path
+from typing import Dict
+# Numerical computing
+import numpy as np
+import pandas as pd
+# Machine Learning
+from sklearn.ensemble import RandomForestClassifier
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+def compile_forest( model: RandomForestClassifier ) -> Dict[ str, np.ndarray ]:
+  logger.info( f"Compiling { len( model.estimators_ ) } trees into flat arrays..." )
+
+  if len( model.classes_ ) != 2:
+    raise ValueError( f"Only binary classifiers can be compiled, got { len( model.classes_ ) } classes" )
+
+  trees = [ estimator.tree_ for estimator in model.estimators_ ]
+  offsets = np.cumsum( [ 0 ] + [ tree.node_count for tree in trees ] )
+
+  features, thresholds, lefts, rights, missing_lefts, values = [], [], [], [], [], []
+  for offset, tree in zip( offsets[ :-1 ], trees ):
+    is_leaf = tree.children_left == -1
+    node_ids = np.arange( tree.node_count ) + offset
+
+    # Leaves point to themselves and always "go left", so every row can take
+    # the same number of steps without masking
+    features.append( np.where( is_leaf, 0, tree.feature ) )
+    thresholds.append( np.where( is_leaf, np.inf, tree.threshold ) )
+    lefts.append( np.where( is_leaf, node_ids, tree.children_left + offset ) )
+    rights.append( np.where( is_leaf, node_ids, tree.children_right + offset ) )
+    # Where sklearn sends NaN at each split: left or right as learned from missing values in
+    # training, else towards the child that saw more samples
+    missing_lefts.append( np.asarray( tree.missing_go_to_left, dtype = bool ) )
+
+    # Same normalisation as DecisionTreeClassifier.predict_proba
+    class_weights = tree.value[ :, 0, : ]
+    values.append( class_weights[ :, 1 ] / class_weights.sum( axis = 1 ) )
+
+  compiled = {
+    'feature': np.concatenate( features ).astype( np.intp ),
+    'threshold': np.concatenate( thresholds ).astype( np.float64 ),
+    'children_left': np.concatenate( lefts ).astype( np.intp ),
+    'children_right': np.concatenate( rights ).astype( np.intp ),
+    'missing_go_to_left': np.concatenate( missing_lefts ),
+    'value': np.concatenate( values ).astype( np.float64 ),
+    'roots': offsets[ :-1 ].astype( np.intp ),
+    'max_depth': np.array( max( tree.max_depth for tree in trees ) ),
+    'n_features': np.array( model.n_features_in_ ),
+    'classes': np.asarray( model.classes_ ),
+  }
+
+  logger.info( f"Compiled forest: { offsets[ -1 ] } nodes, max depth { compiled[ 'max_depth' ] }" )
+
+  return compiled
+
+class FlatForest:
+  def __init__( self, compiled: Dict[ str, np.ndarray ] ) -> None:
+    self.feature = compiled[ 'feature' ]
+    self.threshold = compiled[ 'threshold' ]
+    self.children_left = compiled[ 'children_left' ]
+    self.children_right = compiled[ 'children_right' ]
+    if 'missing_go_to_left' not in compiled:
+      raise ValueError( "Flat forest has no missing-value routing; re-export it from the model" )
+    self.missing_go_to_left = compiled[ 'missing_go_to_left' ]
+    self.value = compiled[ 'value' ]
+    self.roots = compiled[ 'roots' ]
+    self.max_depth = int( compiled[ 'max_depth' ] )
+    self.n_features_in_ = int( compiled[ 'n_features' ] )
+    self.classes_ = compiled[ 'classes' ]
+    self.is_leaf = self.children_left == np.arange( len( self.children_left ) )
+
+  @classmethod
+  def from_model( cls, model: RandomForestClassifier ) -> 'FlatForest':
+    return cls( compile_forest( model ) )
+
+  @classmethod
+  def load( cls, path: str ) -> 'FlatForest':
+    with np.load( path ) as data:
+      return cls( { key: data[ key ] for key in data.files } )
+
+  def save( self, path: str ) -> None:
+    Path( path ).parent.mkdir( parents = True, exist_ok = True )
+    np.savez(
+      path,
+      feature = self.feature,
+      threshold = self.threshold,
+      children_left = self.children_left,
+      children_right = self.children_right,
+      missing_go_to_left = self.missing_go_to_left,
+      value = self.value,
+      roots = self.roots,
+      max_depth = np.array( self.max_depth ),
+      n_features = np.array( self.n_features_in_ ),
+      classes = self.classes_
+    )
+    logger.info( f"Flat forest saved to { path }" )
+
+  def predict_proba( self, X: np.ndarray ) -> np.ndarray:
+    # sklearn trees compare float32 inputs against float64 thresholds
+    X = np.asarray( X, dtype = np.float32 )
+    if X.ndim != 2 or X.shape[ 1 ] != self.n_features_in_:
+      raise ValueError( f"Expected an (N, { self.n_features_in_ }) feature matrix, got shape { X.shape }" )
+
+    rows = np.arange( X.shape[ 0 ] )[ :, None ]
+    nodes = np.broadcast_to( self.roots, ( X.shape[ 0 ], len( self.roots ) ) ).copy()
+
+    # Walk every (row, tree) pair one level per iteration
+    for _ in range( self.max_depth ):
+      if self.is_leaf[ nodes ].all():
+        break
+      x = X[ rows, self.feature[ nodes ] ]
+      # NaN fails every comparison, so it follows the node's missing-value direction like sklearn
+      go_left = np.where( np.isnan( x ), self.missing_go_to_left[ nodes ], x <= self.threshold[ nodes ] )
+      nodes = np.where( go_left, self.children_left[ nodes ], self.children_right[ nodes ] )
+
+    fraud_probability = self.value[ nodes ].mean( axis = 1 )
+
+    return np.column_stack( [ 1 - fraud_probability, fraud_probability ] )
+
+  def predict( self, X: np.ndarray ) -> np.ndarray:
+    return self.classes_[ ( self.predict_proba( X )[ :, 1 ] > 0.5 ).astype( int ) ]
+
+def check_parity( model: RandomForestClassifier, flat_forest: FlatForest, X: np.ndarray, atol: float = 1e-9 ) -> float:
+  logger.info( f"Checking flat forest parity on { len( X ) } rows..." )
+
+  expected = model.predict_proba( X )[ :, 1 ]
+  actual = flat_forest.predict_proba( np.asarray( X ) )[ :, 1 ]
+  max_difference = float( np.max( np.abs( expected - actual ) ) ) if len( X ) > 0 else 0.0
+
+  if max_difference > atol:
+    logger.error( f"Flat forest diverges from predict_proba: max difference { max_difference }" )
+    raise ValueError( f"Flat forest diverges from predict_proba: max difference { max_difference }" )
+
+  logger.info( f"Flat forest matches predict_proba (max difference { max_difference })" )
+  return max_difference
+
+def with_missing_values( X: np.ndarray ) -> np.ndarray:
+  # Copy of the rows with one feature set to NaN per row, cycling through the columns,
+  # so the parity check also covers each split's missing-value direction
+  X_missing = np.array( X, dtype = np.float64, copy = True )
+  if X_missing.size:
+    X_missing[ np.arange( len( X_missing ) ), np.arange( len( X_missing ) ) % X_missing.shape[ 1 ] ] = np.nan
+  if isinstance( X, pd.DataFrame ):
+    return pd.DataFrame( X_missing, columns = X.columns )
+  return X_missing
+
+def export_flat_forest(
+  model: RandomForestClassifier,
+  X_check: np.ndarray,
+  flat_model_path: str = 'models/fraud_detector_flat.npz',
+  max_check_rows: int = 10000
+) -> FlatForest:
+  flat_forest = FlatForest.from_model( model )
+
+  # Positional slice keeps DataFrame column names for the sklearn side of the check
+  X_check = X_check[ :max_check_rows ]
+  check_parity( model, flat_forest, X_check )
+  check_parity( model, flat_forest, with_missing_values( X_check ) )
+
+  flat_forest.save( flat_model_path )
+
+  return flat_forest
@@ -2,16 +2,22 @@
 import sys
 import logging
 from pathlib import Path
+from typing import Optional
 # Save and load models
 import joblib
-# Data manipulation
-import pandas as pd
 
 # Add parent directory to path to import database module
 sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
 from src.model_development.train_test_split import split_data
 from src.model_development.train_model import train_random_forest
+from src.model_development.tune_model import tune_hyperparameters
 from src.model_development.evaluate_model import evaluate_model
+from src.model_development.flat_forest import export_flat_forest
+from src.monitoring.feature_histograms import build_reference_histograms
+from src.prepocessessing.feature_pipeline import FeaturePipeline
+from src.prepocessessing.processed_store import resolve_processed_location, load_processed
+from src.prepocessessing.resampling import resample_training_split
+from src.config import TuningConfig, load_config
 
 logging.basicConfig( 
   level = logging.INFO,
@@ -21,22 +27,38 @@ logging.basicConfig(
 logger = logging.getLogger( __name__ )
 
 def develop_model( 
-  data_path: str = 'data/processed/preprocessed_data.csv',
+  data_path: Optional[ str ] = None,
   model_path: str = 'models/fraud_detector.joblib',
+  flat_model_path: str = 'models/fraud_detector_flat.npz',
+  feature_pipeline_path: str = 'data/processed/feature_pipeline.joblib',
+  tune: Optional[ bool ] = None,
+  tuning_config: Optional[ TuningConfig ] = None
 ) -> tuple[ object, dict ]:
   try:
     logger.info( "Starting model development..." )
-    df = pd.read_csv( data_path )
+    tuning_config = tuning_config or load_config().tuning
+    tune = tuning_config.enabled if tune is None else tune
+    data_path, data_format = resolve_processed_location( data_path )
 
-    # Separate features and target
-    X = df.drop( 'is_fraud', axis = 1 )
-    Y = df[ 'is_fraud' ]
+    # Features and target; the npy format is memory-mapped, so only the split below copies rows
+    X, Y = load_processed( data_path, data_format )
 
     # Train / test split
     X_train, X_test, Y_train, Y_test = split_data( X, Y )
 
+    # Frozen training distribution for feature drift monitoring, taken before resampling
+    # so it matches the real traffic the API will see
+    reference_histograms = build_reference_histograms( X_train, X.columns.tolist() )
+
+    # Hyperparameter search on the training split; it holds out its own validation rows
+    # before resampling, so trials are scored on the real class balance
+    tuning = tune_hyperparameters( X_train, Y_train, tuning_config ) if tune else None
+
+    # Class imbalance handling, on the training split only
+    X_train, Y_train = resample_training_split( X_train, Y_train )
+
     # Train model
-    model = train_random_forest( X_train, Y_train )
+    model = train_random_forest( X_train, Y_train, config = tuning[ 'best_params' ] if tuning else None )
 
     # Evaluate model
     metrics = evaluate_model( model, X_train, Y_train, X_test, Y_test )
@@ -44,16 +66,31 @@ def develop_model(
     # Save model
     Path( model_path ).parent.mkdir( parents = True, exist_ok = True )
 
+    # Feature pipeline fitted during preprocessing, needed to score raw transactions
+    feature_pipeline = None
+    if Path( feature_pipeline_path ).exists():
+      feature_pipeline = FeaturePipeline.load( feature_pipeline_path )
+    else:
+      logger.warning( f"No feature pipeline at { feature_pipeline_path }, raw transaction scoring will be unavailable" )
+
     # Save model with metadata
     logger.info( f"Saving model to { model_path }" )
     model_artifact = {
       'model': model,
       'feature_names': X.columns.tolist(),
       'test_metrics': metrics[ 'test_metrics' ],
-      'confusion_matrix': metrics[ 'confusion_matrix' ]
+      'confusion_matrix': metrics[ 'confusion_matrix' ],
+      'reference_histograms': reference_histograms,
+      # Settings the forest was trained with, and the search that chose them (None when not tuned)
+      'hyperparameters': model.get_params(),
+      'tuning': tuning,
+      'feature_pipeline': feature_pipeline
     }
     joblib.dump( model_artifact, model_path )
 
+    # Flattened copy of the forest for low-latency serving
+    export_flat_forest( model, X_test, flat_model_path )
+
     return model, metrics
 
   except Exception as e:
@@ -12,17 +12,20 @@ logging.basicConfig(
 
 logger = logging.getLogger( __name__ )
 
+# Forest settings used unless a config (e.g. from tune_model.py) overrides them
+DEFAULT_HYPERPARAMETERS = {
+  'n_estimators': 100, # Number of trees in the forest
+  'max_depth': None, # Maximum depth of the trees
+  'min_samples_split': 2, # Minimum number of samples required to split an internal node
+  'min_samples_leaf': 1, # Minimum number of samples required to be at a leaf node
+  'random_state': 42, # Random state for reproducibility
+  'n_jobs': -1, # Number of jobs to run in parallel
+  'class_weight': 'balanced', # Class weight for imbalanced classes
+  'verbose': 1, # Verbosity of the model
+}
+
 def train_random_forest(  X_train: pd.DataFrame, Y_train: pd.Series, config = None ) -> RandomForestClassifier:
-  default_config = {
-    'n_estimators': 100, # Number of trees in the forest
-    'max_depth': None, # Maximum depth of the trees
-    'min_samples_split': 2, # Minimum number of samples required to split an internal node
-    'min_samples_leaf': 1, # Minimum number of samples required to be at a leaf node
-    'random_state': 42, # Random state for reproducibility
-    'n_jobs': -1, # Number of jobs to run in parallel
-    'class_weight': 'balanced', # Class weight for imbalanced classes
-    'verbose': 1, # Verbosity of the model
-  }
+  default_config = dict( DEFAULT_HYPERPARAMETERS )
 
   if config:
     default_config.update( config )
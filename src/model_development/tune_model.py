@@ -0,0 +1,241 @@
+# System
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import logging
+import multiprocessing
+from pathlib import Path
+from dataclasses import replace
+from typing import Any, Dict, List, Optional
+# Data manipulation
+import numpy as np
+import pandas as pd
+# Machine Learning
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import train_test_split
+
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.config import TuningConfig, load_config
+from src.model_development.train_test_split import split_data
+from src.model_development.train_model import DEFAULT_HYPERPARAMETERS
+from src.prepocessessing.processed_store import resolve_processed_location, load_processed
+from src.prepocessessing.resampling import resample_training_split
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+# Candidate values per RandomForestClassifier argument, overridable with tuning.search_space
+SEARCH_SPACE: Dict[ str, List[ Any ] ] = {
+  'n_estimators': [ 100, 200, 400 ],
+  'max_depth': [ None, 8, 12, 16, 24 ],
+  'min_samples_split': [ 2, 5, 10 ],
+  'min_samples_leaf': [ 1, 2, 4, 8 ],
+  'max_features': [ 'sqrt', 'log2', 0.5 ],
+  'class_weight': [ 'balanced', 'balanced_subsample', None ],
+}
+
+# Low rungs scale the trees down with the rows, but never below this
+MIN_TRIAL_TREES = 10
+
+# Fit and validation data, set once per worker process by the pool initializer
+_TRIAL_DATA: Dict[ str, Any ] = {}
+
+def _init_worker( X_fit: np.ndarray, Y_fit: np.ndarray, X_val: np.ndarray, Y_val: np.ndarray, scoring: str ) -> None:
+  _TRIAL_DATA.update( X_fit = X_fit, Y_fit = Y_fit, X_val = X_val, Y_val = Y_val, scoring = scoring )
+
+def run_trial( trial: int, params: Dict[ str, Any ], indices: np.ndarray, n_estimators: int, n_jobs: int ) -> Dict[ str, Any ]:
+  # One forest on a subsample of the fit rows, scored on the full validation set
+  start = time.perf_counter()
+  model = RandomForestClassifier( **{ **DEFAULT_HYPERPARAMETERS, **params, 'n_estimators': n_estimators, 'n_jobs': n_jobs, 'verbose': 0 } )
+  model.fit( _TRIAL_DATA[ 'X_fit' ][ indices ], _TRIAL_DATA[ 'Y_fit' ][ indices ] )
+  score = get_scorer( _TRIAL_DATA[ 'scoring' ] )( model, _TRIAL_DATA[ 'X_val' ], _TRIAL_DATA[ 'Y_val' ] )
+
+  return {
+    'trial': trial,
+    'score': float( score ),
+    'rows': int( len( indices ) ),
+    'n_estimators': n_estimators,
+    'n_jobs': n_jobs,
+    'seconds': time.perf_counter() - start
+  }
+
+def sample_configurations( search_space: Dict[ str, List[ Any ] ], n_trials: int, random_state: int = 42 ) -> List[ Dict[ str, Any ] ]:
+  # Distinct random draws from the grid; fewer than n_trials when the grid is smaller
+  rng = random.Random( random_state )
+  grid_size = math.prod( len( values ) for values in search_space.values() )
+  configurations, seen = [], set()
+  while len( configurations ) < min( n_trials, grid_size ):
+    params = { name: rng.choice( values ) for name, values in search_space.items() }
+    key = json.dumps( params, sort_keys = True )
+    if key not in seen:
+      seen.add( key )
+      configurations.append( params )
+  return configurations
+
+def plan_rungs( n_trials: int, n_rows: int, eta: int, min_rows: int ) -> List[ float ]:
+  # Fractions of the fit rows per rung, ending at all of them. Rungs are added while the
+  # lowest one still keeps min_rows and more than one trial reaches the last rung
+  n_rungs = 1
+  while eta ** n_rungs < n_trials and n_rows / eta ** n_rungs >= min_rows:
+    n_rungs += 1
+  return [ float( eta ) ** ( rung - n_rungs + 1 ) for rung in range( n_rungs ) ]
+
+def _rung_indices( Y_fit: np.ndarray, fraction: float, random_state: int ) -> np.ndarray:
+  indices = np.arange( len( Y_fit ) )
+  if fraction >= 1:
+    return indices
+  # Stratified, so every rung sees the resampled class balance
+  return train_test_split( indices, train_size = fraction, stratify = Y_fit, random_state = random_state )[ 0 ]
+
+def tune_hyperparameters( X_train: pd.DataFrame, Y_train: pd.Series, tuning_config: Optional[ TuningConfig ] = None ) -> Dict[ str, Any ]:
+  # Expects the training split before resampling: validation rows are held out with the
+  # real class balance, and only the rest is resampled and used to fit trials
+  try:
+    tuning_config = tuning_config or load_config().tuning
+    start = time.monotonic()
+    deadline = start + tuning_config.time_budget_seconds
+    workers = tuning_config.workers if tuning_config.workers > 0 else os.cpu_count() or 1
+    eta = tuning_config.eta
+
+    X_fit, X_val, Y_fit, Y_val = split_data( X_train, Y_train, test_size = tuning_config.validation_size, random_state = tuning_config.random_state )
+    X_fit, Y_fit = resample_training_split( X_fit, Y_fit, random_state = tuning_config.random_state )
+
+    # Plain float32 arrays: cheap to hand to each worker and what the trees train on anyway
+    X_fit, Y_fit = np.ascontiguousarray( X_fit.to_numpy( dtype = np.float32 ) ), Y_fit.to_numpy()
+    X_val, Y_val = np.ascontiguousarray( X_val.to_numpy( dtype = np.float32 ) ), Y_val.to_numpy()
+
+    configurations = sample_configurations( tuning_config.search_space or SEARCH_SPACE, tuning_config.n_trials, tuning_config.random_state )
+    fractions = plan_rungs( len( configurations ), len( Y_fit ), eta, tuning_config.min_rows )
+    logger.info( f"Tuning { len( configurations ) } configurations over { len( fractions ) } rungs on { workers } workers, { tuning_config.time_budget_seconds:.0f}s budget" )
+    logger.info( f"Fit rows per rung: { [ int( len( Y_fit ) * fraction ) for fraction in fractions ] }, { len( Y_val ) } validation rows" )
+
+    trials: List[ Dict[ str, Any ] ] = []
+    rungs: List[ Dict[ str, Any ] ] = []
+    survivors = list( range( len( configurations ) ) )
+    budget_exhausted = False
+
+    with multiprocessing.Pool( workers, initializer = _init_worker, initargs = ( X_fit, Y_fit, X_val, Y_val, tuning_config.scoring ) ) as pool:
+      for rung, fraction in enumerate( fractions ):
+        if rung > 0:
+          # Each rung has eta times the rows and trees of the one before
+          promoted = [ result for result in rungs[ -1 ][ 'results' ] if result[ 'trial' ] in survivors ]
+          estimate = sum( result[ 'seconds' ] * result[ 'n_jobs' ] for result in promoted ) * eta ** 2 / workers
+          if time.monotonic() + estimate > deadline:
+            logger.warning( f"Rung { rung } would need about { estimate:.0f}s, more than is left of the budget; stopping" )
+            budget_exhausted = True
+            break
+
+        indices = _rung_indices( Y_fit, fraction, tuning_config.random_state + rung )
+        # Spare cores go to the trees once fewer trials than workers remain
+        n_jobs = max( 1, workers // len( survivors ) )
+        pending = {
+          trial: pool.apply_async( run_trial, (
+            trial,
+            configurations[ trial ],
+            indices,
+            max( MIN_TRIAL_TREES, round( configurations[ trial ].get( 'n_estimators', DEFAULT_HYPERPARAMETERS[ 'n_estimators' ] ) * fraction ) ),
+            n_jobs
+          ) )
+          for trial in survivors
+        }
+
+        results, failed = [], []
+        for trial, pending_result in pending.items():
+          try:
+            results.append( pending_result.get( timeout = max( deadline - time.monotonic(), 0 ) ) )
+          except multiprocessing.TimeoutError:
+            budget_exhausted = True
+            break
+          except Exception as e:
+            # One bad configuration only drops that trial
+            logger.error( f"Error in trial { trial } ({ configurations[ trial ] }), dropping it: { e }" )
+            failed.append( trial )
+
+        complete = True
+        if budget_exhausted:
+          # Keep whatever finished, then kill the trials still running
+          seen = { result[ 'trial' ] for result in results } | set( failed )
+          for trial, pending_result in pending.items():
+            if trial in seen:
+              continue
+            if not pending_result.ready():
+              complete = False
+            elif pending_result.successful():
+              results.append( pending_result.get() )
+            else:
+              failed.append( trial )
+          pool.terminate()
+          logger.warning( f"Time budget reached during rung { rung }, { len( results ) } of { len( pending ) } trials finished" )
+
+        for result in results:
+          result.update( rung = rung, params = configurations[ result[ 'trial' ] ] )
+        results.sort( key = lambda result: ( -result[ 'score' ], result[ 'trial' ] ) )
+        trials.extend( results )
+        if results:
+          rungs.append( { 'rung': rung, 'fraction': fraction, 'rows': int( len( indices ) ), 'complete': complete, 'failed': failed, 'results': results } )
+          logger.info( f"Rung { rung }: { len( results ) } trials on { len( indices ) } rows, best { tuning_config.scoring } { results[ 0 ][ 'score' ]:.4f}" )
+
+        if not results and not budget_exhausted:
+          logger.warning( f"Every trial of rung { rung } failed; stopping" )
+        if budget_exhausted or not results:
+          break
+        survivors = [ result[ 'trial' ] for result in results[ :max( 1, len( results ) // eta ) ] ]
+
+    elapsed = time.monotonic() - start
+    # Highest complete rung wins: its scores come from the most data. A rung cut short by the
+    # budget only holds the trials that happened to finish first, which favours fast configurations
+    complete_rungs = [ rung for rung in rungs if rung[ 'complete' ] ]
+    if not complete_rungs:
+      logger.warning( "No rung finished within the time budget, keeping the default hyperparameters" )
+      best = None
+    else:
+      best = complete_rungs[ -1 ][ 'results' ][ 0 ]
+      logger.info( f"Best configuration (trial { best[ 'trial' ] }, { tuning_config.scoring } { best[ 'score' ]:.4f}): { best[ 'params' ] }" )
+    logger.info( f"Tuning finished in { elapsed:.1f}s, { len( trials ) } trials run" )
+
+    return {
+      'best_params': best[ 'params' ] if best else {},
+      'best_score': best[ 'score' ] if best else None,
+      'scoring': tuning_config.scoring,
+      'rungs': [ { key: value for key, value in rung.items() if key != 'results' } for rung in rungs ],
+      'trials': trials,
+      'workers': workers,
+      'elapsed_seconds': elapsed,
+      'time_budget_seconds': tuning_config.time_budget_seconds,
+      'budget_exhausted': budget_exhausted
+    }
+
+  except Exception as e:
+    logger.error( f"Error tuning hyperparameters: { e }" )
+    raise
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser( description = "Successive-halving search over the Random Forest hyperparameters, then train and save the winner" )
+  parser.add_argument( "--data-path", help = "Processed dataset (defaults to data.processed_path / processed_format)" )
+  parser.add_argument( "--time-budget", type = float, help = "Wall-clock seconds for the search (tuning.time_budget_seconds)" )
+  parser.add_argument( "--trials", type = int, help = "Configurations in the first rung (tuning.n_trials)" )
+  parser.add_argument( "--workers", type = int, help = "Trial processes, -1 for every core (tuning.workers)" )
+  parser.add_argument( "--search-only", action = "store_true", help = "Print the search result instead of training and saving the model" )
+  args = parser.parse_args()
+
+  overrides = { 'time_budget_seconds': args.time_budget, 'n_trials': args.trials, 'workers': args.workers }
+  tuning_config = replace( load_config().tuning, **{ key: value for key, value in overrides.items() if value is not None } )
+
+  if args.search_only:
+    X, Y = load_processed( *resolve_processed_location( args.data_path ) )
+    X_train, _, Y_train, _ = split_data( X, Y )
+    result = tune_hyperparameters( X_train, Y_train, tuning_config )
+    print( json.dumps( { key: value for key, value in result.items() if key != 'trials' }, indent = 2, default = str ) )
+  else:
+    # Imported here: model_development imports this module
+    from src.model_development.model_development import develop_model
+    develop_model( data_path = args.data_path, tune = True, tuning_config = tuning_config )
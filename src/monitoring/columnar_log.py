@@ -0,0 +1,194 @@
+# System
+import os
+import json
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+# Numerical computing
+import numpy as np
+
+logger = logging.getLogger( __name__ )
+
+MANIFEST = 'manifest.json'
+MISSING_LABEL = -1
+
+# Fixed columns; every feature is stored as its own float32 column named feature_<name>
+BASE_COLUMNS: Dict[ str, np.dtype ] = {
+  'timestamp': np.dtype( np.float64 ),
+  'prediction': np.dtype( np.int8 ),
+  'probability': np.dtype( np.float32 ),
+  'actual_label': np.dtype( np.int8 ),
+}
+
+class ColumnarPredictionLog:
+  """
+  Prediction log stored as rolling segments of typed `.npy` columns.
+
+  Each segment directory holds one preallocated column file per field. Rows are
+  written through memory maps and `manifest.json` records how many rows of each
+  segment are valid, so readers only map the columns and rows they need.
+  """
+
+  def __init__(
+    self,
+    log_dir: str = 'logs/monitoring/predictions_columnar',
+    feature_names: Optional[ List[ str ] ] = None,
+    segment_rows: int = 100000
+  ) -> None:
+    self.log_dir = Path( log_dir )
+    self.manifest_path = self.log_dir / MANIFEST
+    self._open_columns: Dict[ str, np.memmap ] = {}
+
+    if self.manifest_path.exists():
+      self.manifest = json.loads( self.manifest_path.read_text() )
+    else:
+      self.manifest = { 'feature_names': feature_names, 'segment_rows': segment_rows, 'segments': [] }
+
+  @staticmethod
+  def is_columnar( path: str ) -> bool:
+    return ( Path( path ) / MANIFEST ).exists()
+
+  @property
+  def feature_names( self ) -> Optional[ List[ str ] ]:
+    return self.manifest[ 'feature_names' ]
+
+  def column_dtypes( self ) -> Dict[ str, np.dtype ]:
+    dtypes = dict( BASE_COLUMNS )
+    for name in self.feature_names or []:
+      dtypes[ f'feature_{ name }' ] = np.dtype( np.float32 )
+    return dtypes
+
+  def __len__( self ) -> int:
+    return sum( segment[ 'rows' ] for segment in self.manifest[ 'segments' ] )
+
+  def _save_manifest( self ) -> None:
+    # Write then rename so readers never see a half-written manifest
+    tmp_path = self.manifest_path.with_suffix( '.tmp' )
+    tmp_path.write_text( json.dumps( self.manifest ) )
+    os.replace( tmp_path, self.manifest_path )
+
+  def _new_segment( self ) -> dict:
+    for column in self._open_columns.values():
+      column.flush()
+    self._open_columns = {}
+
+    segment = { 'name': f"segment_{ len( self.manifest[ 'segments' ] ):06d}", 'rows': 0 }
+    segment_dir = self.log_dir / segment[ 'name' ]
+    segment_dir.mkdir( parents = True, exist_ok = True )
+
+    for name, dtype in self.column_dtypes().items():
+      self._open_columns[ name ] = np.lib.format.open_memmap(
+        segment_dir / f'{ name }.npy', mode = 'w+', dtype = dtype, shape = ( self.manifest[ 'segment_rows' ], )
+      )
+
+    self.manifest[ 'segments' ].append( segment )
+    return segment
+
+  def _current_segment( self ) -> dict:
+    segments = self.manifest[ 'segments' ]
+    if not segments or segments[ -1 ][ 'rows' ] >= self.manifest[ 'segment_rows' ]:
+      return self._new_segment()
+
+    segment = segments[ -1 ]
+    if not self._open_columns:
+      segment_dir = self.log_dir / segment[ 'name' ]
+      for name in self.column_dtypes():
+        self._open_columns[ name ] = np.load( segment_dir / f'{ name }.npy', mmap_mode = 'r+' )
+    return segment
+
+  def _entries_to_columns( self, entries: List[ dict ] ) -> Dict[ str, np.ndarray ]:
+    if self.feature_names is None:
+      # First write fixes the feature layout for the life of the log
+      first = entries[ 0 ][ 'features' ]
+      self.manifest[ 'feature_names' ] = list( first ) if isinstance( first, dict ) else [ f'f{ i }' for i in range( len( first ) ) ]
+
+    feature_names = self.feature_names
+    features = np.full( ( len( entries ), len( feature_names ) ), np.nan, dtype = np.float32 )
+    for row, entry in enumerate( entries ):
+      values = entry[ 'features' ]
+      if isinstance( values, dict ):
+        features[ row ] = [ values.get( name, np.nan ) for name in feature_names ]
+      else:
+        features[ row, :len( values ) ] = values[ :len( feature_names ) ]
+
+    columns = {
+      'timestamp': np.array( [ datetime.fromisoformat( entry[ 'timestamp' ] ).timestamp() for entry in entries ] ),
+      'prediction': np.array( [ entry[ 'prediction' ] for entry in entries ] ),
+      'probability': np.array( [ entry[ 'probability' ] for entry in entries ], dtype = np.float32 ),
+      'actual_label': np.array( [ MISSING_LABEL if entry[ 'actual_label' ] is None else entry[ 'actual_label' ] for entry in entries ] ),
+    }
+    for index, name in enumerate( feature_names ):
+      columns[ f'feature_{ name }' ] = features[ :, index ]
+
+    return columns
+
+  def append( self, entries: List[ dict ] ) -> None:
+    if not entries:
+      return
+
+    columns = self._entries_to_columns( entries )
+    written = 0
+
+    while written < len( entries ):
+      segment = self._current_segment()
+      start = segment[ 'rows' ]
+      count = min( len( entries ) - written, self.manifest[ 'segment_rows' ] - start )
+
+      for name, column in self._open_columns.items():
+        column[ start:start + count ] = columns[ name ][ written:written + count ]
+        column.flush()
+
+      segment[ 'rows' ] += count
+      written += count
+
+    # Rows become visible to readers only once the data is on disk
+    self._save_manifest()
+
+  def read_columns( self, columns: List[ str ], last_n: Optional[ int ] = None ) -> Dict[ str, np.ndarray ]:
+    # Read the on-disk manifest (the writer may be another thread or process) without touching ours
+    manifest = json.loads( self.manifest_path.read_text() ) if self.manifest_path.exists() else self.manifest
+
+    remaining = sum( segment[ 'rows' ] for segment in manifest[ 'segments' ] ) if last_n is None else last_n
+    parts: Dict[ str, List[ np.ndarray ] ] = { name: [] for name in columns }
+
+    # Walk segments newest first until enough rows are collected
+    for segment in reversed( manifest[ 'segments' ] ):
+      if remaining <= 0:
+        break
+      rows = segment[ 'rows' ]
+      take = min( rows, remaining )
+      segment_dir = self.log_dir / segment[ 'name' ]
+      for name in columns:
+        mapped = np.load( segment_dir / f'{ name }.npy', mmap_mode = 'r' )
+        parts[ name ].append( np.array( mapped[ rows - take:rows ] ) )
+      remaining -= take
+
+    dtypes = self.column_dtypes()
+    return {
+      name: np.concatenate( parts[ name ][ ::-1 ] ) if parts[ name ] else np.empty( 0, dtype = dtypes.get( name ) )
+      for name in columns
+    }
+
+  def read_records( self, last_n: int ) -> List[ dict ]:
+    if self.feature_names is None and self.manifest_path.exists():
+      self.manifest[ 'feature_names' ] = json.loads( self.manifest_path.read_text() )[ 'feature_names' ]
+
+    feature_columns = [ f'feature_{ name }' for name in self.feature_names or [] ]
+    data = self.read_columns( list( BASE_COLUMNS ) + feature_columns, last_n )
+
+    return [
+      {
+        'timestamp': datetime.fromtimestamp( data[ 'timestamp' ][ row ] ).isoformat(),
+        'features': { name: float( data[ column ][ row ] ) for name, column in zip( self.feature_names or [], feature_columns ) },
+        'prediction': int( data[ 'prediction' ][ row ] ),
+        'probability': float( data[ 'probability' ][ row ] ),
+        'actual_label': None if data[ 'actual_label' ][ row ] == MISSING_LABEL else int( data[ 'actual_label' ][ row ] ),
+      }
+      for row in range( len( data[ 'prediction' ] ) )
+    ]
+
+  def close( self ) -> None:
+    for column in self._open_columns.values():
+      column.flush()
+    self._open_columns = {}
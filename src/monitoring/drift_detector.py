@@ -1,11 +1,15 @@
 # System
-import json
+import sys
 import logging
 from pathlib import Path
 from typing import Dict, List, Optional
 
 import numpy as np
 
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.monitoring.log_reader import read_last_columns, read_last_features
+from src.monitoring.feature_histograms import LiveHistograms, population_stability_index, ks_statistic, js_divergence
+
 logger = logging.getLogger( __name__ )
 
 
@@ -14,44 +18,101 @@ class DriftDetector:
     self,
     prediction_log: str = "logs/monitoring/predictions.jsonl",
     baseline_window: int = 1000,
-    current_window: int = 100
+    current_window: int = 100,
+    reference_histograms: Optional[ Dict ] = None,
+    feature_window: int = 10000
   ) -> None:
     self.prediction_log = Path( prediction_log )
     self.baseline_window = baseline_window
     self.current_window = current_window
+    self.reference_histograms = reference_histograms
+    self.live_histograms: Optional[ LiveHistograms ] = None
+
+    if reference_histograms is not None:
+      self.live_histograms = LiveHistograms( reference_histograms, window = feature_window )
+      # Warm up from the tail of the log so drift is available right after a restart
+      if self.prediction_log.exists():
+        self.live_histograms.update( read_last_features( self.prediction_log, feature_window, reference_histograms[ 'feature_names' ] ) )
+
     logger.info( f"Drift detector initialized" )
     logger.info( f"  Baseline window: { baseline_window }" )
     logger.info( f"  Current window: { current_window }" )
+    logger.info( f"  Feature window: { feature_window if reference_histograms is not None else 'disabled (no reference histograms)' }" )
+
+  def update_features( self, features: np.ndarray ) -> None:
+    if self.live_histograms is not None:
+      self.live_histograms.update( features )
+
+  def detect_feature_drift(
+    self,
+    feature_name: Optional[ str ] = None,
+    psi_threshold: float = 0.2,
+    min_samples: int = 100
+  ) -> Dict:
+    if self.live_histograms is None:
+      logger.warning( "No reference histograms available" )
+      return { 'drift_detected': False, 'message': 'No reference histograms available' }
+
+    feature_names = self.reference_histograms[ 'feature_names' ]
+    if feature_name is not None and feature_name not in feature_names:
+      raise ValueError( f"Unknown feature { feature_name }" )
+
+    n_samples = len( self.live_histograms )
+    if n_samples < min_samples:
+      logger.warning( f"Insufficient data for feature drift detection" )
+      return {
+        'drift_detected': False,
+        'message': f'Need { min_samples } samples, have { n_samples }'
+      }
+
+    results = {}
+    for index, name in enumerate( feature_names ):
+      if feature_name is not None and name != feature_name:
+        continue
+
+      expected = self.reference_histograms[ 'counts' ][ index ]
+      actual = self.live_histograms.counts[ index ]
+      psi = population_stability_index( expected, actual )
+      results[ name ] = {
+        'drift_detected': psi > psi_threshold,
+        'psi': psi,
+        'ks_statistic': ks_statistic( expected, actual ),
+        'js_divergence': js_divergence( expected, actual ),
+      }
+
+    if feature_name is not None:
+      return { **results[ feature_name ], 'feature': feature_name, 'psi_threshold': psi_threshold, 'current_samples': n_samples }
+
+    drifted = [ name for name, result in results.items() if result[ 'drift_detected' ] ]
+    return {
+      'drift_detected': len( drifted ) > 0,
+      'drifted_features': drifted,
+      'psi_threshold': psi_threshold,
+      'reference_samples': self.reference_histograms[ 'n_samples' ],
+      'current_samples': n_samples,
+      'features': results
+    }
 
   def detect_prediction_drift( self, threshold: float = 0.1 ) -> Dict:
     if not self.prediction_log.exists():
       logger.warning( "No prediction log found" )
       return { 'drift_detected': False, 'message': 'No log available' }
 
-    # Read predictions
-    with open( self.prediction_log, 'r' ) as f:
-      lines = f.readlines()
+    # Read only the most recent predictions from the end of the log
+    predictions = read_last_columns( self.prediction_log, self.baseline_window + self.current_window, [ 'prediction' ] )[ 'prediction' ]
 
-    if len( lines ) < self.baseline_window + self.current_window:
+    if len( predictions ) < self.baseline_window + self.current_window:
       logger.warning( f"Insufficient data for drift detection" )
       return {
         'drift_detected': False,
-        'message': f'Need { self.baseline_window + self.current_window } samples, have { len( lines ) }'
+        'message': f'Need { self.baseline_window + self.current_window } samples, have { len( predictions ) }'
       }
 
     # Get baseline predictions (older data)
-    baseline_start = -( self.baseline_window + self.current_window )
-    baseline_end = -self.current_window
-    baseline_predictions = [
-      json.loads( line )[ 'prediction' ]
-      for line in lines[ baseline_start:baseline_end ]
-    ]
+    baseline_predictions = predictions[ :-self.current_window ]
 
     # Get current predictions (recent data)
-    current_predictions = [
-      json.loads( line )[ 'prediction' ]
-      for line in lines[ -self.current_window: ]
-    ]
+    current_predictions = predictions[ -self.current_window: ]
 
     # Calculate fraud rates
     baseline_fraud_rate = np.mean( baseline_predictions )
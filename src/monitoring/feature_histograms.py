@@ -0,0 +1,97 @@
+# System
+import logging
+import threading
+from typing import Dict, List
+# Numerical computing
+import numpy as np
+
+logger = logging.getLogger( __name__ )
+
+# Floor for empty bins so PSI / JS stay finite
+EPSILON = 1e-6
+
+def build_reference_histograms( X: np.ndarray, feature_names: List[ str ], n_bins: int = 20 ) -> Dict:
+  logger.info( f"Building reference histograms for { len( feature_names ) } features..." )
+
+  X = np.asarray( X, dtype = np.float64 )
+  quantiles = np.linspace( 0, 1, n_bins + 1 )[ 1:-1 ]
+
+  edges, counts = [], []
+  for index in range( X.shape[ 1 ] ):
+    values = X[ :, index ]
+    # Quantile edges give roughly equal-mass bins; duplicates collapse for discrete features
+    feature_edges = np.unique( np.quantile( values, quantiles ) )
+    edges.append( feature_edges )
+    counts.append( np.bincount( np.searchsorted( feature_edges, values, side = 'right' ), minlength = len( feature_edges ) + 1 ) )
+
+  return {
+    'feature_names': list( feature_names ),
+    'edges': edges,
+    'counts': counts,
+    'n_samples': int( X.shape[ 0 ] ),
+  }
+
+def _normalise( counts: np.ndarray ) -> np.ndarray:
+  proportions = counts / max( counts.sum(), 1 )
+  proportions = np.maximum( proportions, EPSILON )
+  return proportions / proportions.sum()
+
+def population_stability_index( expected_counts: np.ndarray, actual_counts: np.ndarray ) -> float:
+  expected = _normalise( expected_counts )
+  actual = _normalise( actual_counts )
+  return float( np.sum( ( actual - expected ) * np.log( actual / expected ) ) )
+
+def ks_statistic( expected_counts: np.ndarray, actual_counts: np.ndarray ) -> float:
+  # Kolmogorov-Smirnov distance at bin resolution
+  expected_cdf = np.cumsum( expected_counts ) / max( expected_counts.sum(), 1 )
+  actual_cdf = np.cumsum( actual_counts ) / max( actual_counts.sum(), 1 )
+  return float( np.max( np.abs( expected_cdf - actual_cdf ) ) )
+
+def js_divergence( expected_counts: np.ndarray, actual_counts: np.ndarray ) -> float:
+  # Base 2, so the value is bounded by [0, 1]
+  expected = _normalise( expected_counts )
+  actual = _normalise( actual_counts )
+  mixture = ( expected + actual ) / 2
+  return float( 0.5 * np.sum( expected * np.log2( expected / mixture ) ) + 0.5 * np.sum( actual * np.log2( actual / mixture ) ) )
+
+class LiveHistograms:
+  """
+  Sliding-window histograms over the reference bins.
+
+  The bin index of every feature for the last `window` rows is kept in a ring, so
+  adding a row increments its bins and decrements the bins of the row it evicts.
+  """
+
+  def __init__( self, reference: Dict, window: int = 10000 ) -> None:
+    self.feature_names = reference[ 'feature_names' ]
+    self.edges = reference[ 'edges' ]
+    self.window = window
+    self.counts = [ np.zeros( len( edges ) + 1, dtype = np.int64 ) for edges in self.edges ]
+    self._bins = np.zeros( ( window, len( self.feature_names ) ), dtype = np.int16 )
+    self._n_seen = 0
+    self._lock = threading.Lock()
+
+  def __len__( self ) -> int:
+    return min( self._n_seen, self.window )
+
+  def update( self, X: np.ndarray ) -> None:
+    X = np.atleast_2d( np.asarray( X, dtype = np.float64 ) )[ -self.window: ]
+    n = X.shape[ 0 ]
+    if n == 0:
+      return
+
+    bins = np.column_stack( [
+      np.searchsorted( edges, X[ :, index ], side = 'right' )
+      for index, edges in enumerate( self.edges )
+    ] ).astype( np.int16 )
+
+    with self._lock:
+      positions = ( self._n_seen + np.arange( n ) ) % self.window
+      evicted = self._n_seen + np.arange( n ) >= self.window
+
+      for index in range( len( self.feature_names ) ):
+        np.subtract.at( self.counts[ index ], self._bins[ positions[ evicted ], index ], 1 )
+        np.add.at( self.counts[ index ], bins[ :, index ], 1 )
+
+      self._bins[ positions ] = bins
+      self._n_seen += n
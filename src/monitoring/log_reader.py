@@ -0,0 +1,95 @@
+# System
+import os
+import sys
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List
+# Numerical computing
+import numpy as np
+
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.monitoring.columnar_log import ColumnarPredictionLog, MISSING_LABEL
+
+logger = logging.getLogger( __name__ )
+
+def iter_lines_reversed( path: str, block_size: int = 65536 ) -> Iterator[ bytes ]:
+  with open( path, 'rb' ) as f:
+    f.seek( 0, os.SEEK_END )
+    position = f.tell()
+    if position == 0:
+      return
+
+    # A line still being appended by the writer has no newline yet; skip it
+    f.seek( position - 1 )
+    skip_partial = f.read( 1 ) != b'\n'
+    remainder = b''
+
+    while position > 0:
+      read_size = min( block_size, position )
+      position -= read_size
+      f.seek( position )
+      lines = ( f.read( read_size ) + remainder ).split( b'\n' )
+
+      # First piece may continue in the previous block
+      remainder = lines[ 0 ]
+      complete = lines[ 1: ]
+
+      if skip_partial:
+        if not complete:
+          remainder = b''
+          continue
+        complete = complete[ :-1 ]
+        skip_partial = False
+
+      for line in reversed( complete ):
+        if line.strip():
+          yield line
+
+    if remainder.strip() and not skip_partial:
+      yield remainder
+
+def read_last_records( path: str, n: int, block_size: int = 65536 ) -> List[ dict ]:
+  if n <= 0 or not Path( path ).exists():
+    return []
+
+  records = []
+  for line in iter_lines_reversed( path, block_size ):
+    records.append( json.loads( line ) )
+    if len( records ) >= n:
+      break
+
+  records.reverse()
+  return records
+
+def read_last_columns( path: str, n: int, columns: List[ str ] ) -> Dict[ str, np.ndarray ]:
+  # Columnar logs map just the requested columns; JSONL logs fall back to parsing the tail
+  if ColumnarPredictionLog.is_columnar( path ):
+    return ColumnarPredictionLog( path ).read_columns( columns, n )
+
+  records = read_last_records( path, n )
+  result = {}
+  for name in columns:
+    if name == 'actual_label':
+      values = [ MISSING_LABEL if record.get( name ) is None else record[ name ] for record in records ]
+    else:
+      values = [ np.nan if record.get( name ) is None else record[ name ] for record in records ]
+    result[ name ] = np.array( values )
+
+  return result
+
+def read_last_features( path: str, n: int, feature_names: List[ str ] ) -> np.ndarray:
+  if ColumnarPredictionLog.is_columnar( path ):
+    columns = ColumnarPredictionLog( path ).read_columns( [ f'feature_{ name }' for name in feature_names ], n )
+    return np.column_stack( [ columns[ f'feature_{ name }' ] for name in feature_names ] )
+
+  # API entries log features positionally; other callers log them by name
+  rows = []
+  for record in read_last_records( path, n ):
+    features = record.get( 'features' )
+    if isinstance( features, dict ):
+      rows.append( [ features.get( name, np.nan ) for name in feature_names ] )
+    elif features is not None and len( features ) == len( feature_names ):
+      rows.append( features )
+
+  return np.array( rows, dtype = np.float64 ).reshape( -1, len( feature_names ) )
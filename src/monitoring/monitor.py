@@ -3,6 +3,9 @@ import logging
 import random
 import sys
 from pathlib import Path
+from typing import Dict, Optional
+# Saving and loading models
+import joblib
 # Add parent directory to path to import modules
 sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
 from src.monitoring.prediction_logger import PredictionLogger, PerformanceLogger
@@ -17,9 +20,16 @@ logging.basicConfig(
 logger = logging.getLogger( __name__ )
 
 
+def load_reference_histograms( model_path: str = 'models/fraud_detector.joblib' ) -> Optional[ Dict ]:
+  if not Path( model_path ).exists():
+    logger.warning( f"No model artifact at { model_path }, feature drift disabled" )
+    return None
+  return joblib.load( model_path ).get( 'reference_histograms' )
+
+
 def run_monitoring_dashboard():
   tracker = PerformanceTracker()
-  drift_detector = DriftDetector()
+  drift_detector = DriftDetector( reference_histograms = load_reference_histograms() )
 
   metrics = tracker.calculate_metrics( window_size = 100 )
   distribution = tracker.get_prediction_distribution( window_size = 100 )
@@ -1,86 +1,161 @@
 # System
-import json
+import sys
 import logging
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional
 
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+import numpy as np
+
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.monitoring.log_reader import read_last_columns
+from src.monitoring.columnar_log import MISSING_LABEL
 
 logger = logging.getLogger( __name__ )
 
+# Columns of the cumulative counter table
+N_PREDICTIONS, N_FRAUD, N_LABELED, TP, FP, TN, FN = range( 7 )
+N_PROBABILITY_BINS = 10
+
 
 class PerformanceTracker:
-  def __init__( self, prediction_log: str = "logs/monitoring/predictions.jsonl" ) -> None:
+  def __init__(
+    self,
+    prediction_log: str = "logs/monitoring/predictions.jsonl",
+    window_capacity: int = 10000
+  ) -> None:
     self.prediction_log = Path( prediction_log )
-    logger.info( f"Performance tracker initialized: { self.prediction_log }" )
+    self.window_capacity = window_capacity
 
-  def calculate_metrics( self, window_size: Optional[ int ] = None ) -> Dict:
-    if not self.prediction_log.exists():
-      logger.warning( "No prediction log found" )
-      return {}
-
-    # Read predictions
-    predictions = []
-    actuals = []
+    # Ring of running totals: row i holds the counts after the i-th prediction (mod capacity + 1).
+    # Any window of the last w <= capacity predictions is the difference of two rows
+    self._cumulative = np.zeros( ( window_capacity + 1, 7 + N_PROBABILITY_BINS ), dtype = np.int64 )
+    self._n_recorded = 0
+    self._lock = threading.Lock()
 
-    with open( self.prediction_log, 'r' ) as f:
-      lines = f.readlines()
+    self._bootstrap_from_log()
+    logger.info( f"Performance tracker initialized: { self.prediction_log } ({ self._n_recorded } predictions loaded)" )
 
-      # Apply window if specified
-      if window_size:
-        lines = lines[ -window_size: ]
+  def _bootstrap_from_log( self ) -> None:
+    if not self.prediction_log.exists():
+      return
+
+    # Read from the end of the log: cost depends on the capacity, not the log size
+    columns = read_last_columns( self.prediction_log, self.window_capacity, [ 'prediction', 'probability', 'actual_label' ] )
+    self.record_batch(
+      columns[ 'prediction' ].tolist(),
+      [ None if np.isnan( p ) else float( p ) for p in columns[ 'probability' ] ],
+      [ None if label == MISSING_LABEL else int( label ) for label in columns[ 'actual_label' ] ]
+    )
+
+  def record( self, prediction: int, probability: Optional[ float ] = None, actual_label: Optional[ int ] = None ) -> None:
+    self.record_batch( [ prediction ], [ probability ], [ actual_label ] )
+
+  def record_batch(
+    self,
+    predictions: List[ int ],
+    probabilities: List[ Optional[ float ] ],
+    actual_labels: Optional[ List[ Optional[ int ] ] ] = None
+  ) -> None:
+    n = len( predictions )
+    if n == 0:
+      return
+    if actual_labels is None:
+      actual_labels = [ None ] * n
+
+    predicted = np.asarray( predictions, dtype = np.int64 )
+    labeled = np.array( [ label is not None for label in actual_labels ] )
+    actual = np.array( [ label if label is not None else 0 for label in actual_labels ], dtype = np.int64 )
+    probability = np.array( [ p if p is not None else np.nan for p in probabilities ], dtype = np.float64 )
+
+    increments = np.zeros( ( n, self._cumulative.shape[ 1 ] ), dtype = np.int64 )
+    increments[ :, N_PREDICTIONS ] = 1
+    increments[ :, N_FRAUD ] = predicted == 1
+    increments[ :, N_LABELED ] = labeled
+    increments[ :, TP ] = labeled & ( predicted == 1 ) & ( actual == 1 )
+    increments[ :, FP ] = labeled & ( predicted == 1 ) & ( actual == 0 )
+    increments[ :, TN ] = labeled & ( predicted == 0 ) & ( actual == 0 )
+    increments[ :, FN ] = labeled & ( predicted == 0 ) & ( actual == 1 )
+
+    has_probability = ~np.isnan( probability )
+    bins = np.clip( ( probability[ has_probability ] * N_PROBABILITY_BINS ).astype( np.int64 ), 0, N_PROBABILITY_BINS - 1 )
+    increments[ np.flatnonzero( has_probability ), 7 + bins ] = 1
+
+    with self._lock:
+      slots = self.window_capacity + 1
+      running = self._cumulative[ self._n_recorded % slots ] + np.cumsum( increments, axis = 0 )
+      # Older rows of a very large batch would be overwritten anyway
+      keep = min( n, slots )
+      positions = ( self._n_recorded + np.arange( n - keep + 1, n + 1 ) ) % slots
+      self._cumulative[ positions ] = running[ -keep: ]
+      self._n_recorded += n
+
+  def _window_counts( self, window_size: Optional[ int ] ) -> np.ndarray:
+    # Zero or negative sizes would index stale ring slots once it has wrapped
+    if window_size is not None and window_size < 1:
+      raise ValueError( f"window_size must be at least 1, got { window_size }" )
+
+    with self._lock:
+      available = min( self._n_recorded, self.window_capacity )
+      if window_size is None:
+        window_size = available
+      elif window_size > available:
+        if window_size > self.window_capacity:
+          logger.warning( f"Window { window_size } exceeds tracker capacity { self.window_capacity }" )
+        window_size = available
+
+      slots = self.window_capacity + 1
+      end = self._cumulative[ self._n_recorded % slots ]
+      start = self._cumulative[ ( self._n_recorded - window_size ) % slots ]
+      return end - start
 
-      for line in lines:
-        entry = json.loads( line )
+  def calculate_metrics( self, window_size: Optional[ int ] = None ) -> Dict:
+    if self._n_recorded == 0:
+      logger.warning( "No predictions recorded" )
+      return {}
 
-        # Only include if actual label is available
-        if entry.get( 'actual_label' ) is not None:
-          predictions.append( entry[ 'prediction' ] )
-          actuals.append( entry[ 'actual_label' ] )
+    counts = self._window_counts( window_size )
+    n_samples = int( counts[ N_LABELED ] )
 
-    if len( predictions ) == 0:
+    if n_samples == 0:
       logger.warning( "No predictions with actual labels found" )
       return {
         'n_samples': 0,
         'message': 'No labeled data available for evaluation'
       }
 
-    # Calculate metrics
+    tp, fp, tn, fn = ( int( counts[ column ] ) for column in ( TP, FP, TN, FN ) )
+    precision = tp / ( tp + fp ) if tp + fp > 0 else 0.0
+    recall = tp / ( tp + fn ) if tp + fn > 0 else 0.0
+
+    # Calculate metrics (zero_division = 0, as sklearn was called before)
     metrics = {
-      'n_samples': len( predictions ),
-      'accuracy': accuracy_score( actuals, predictions ),
-      'precision': precision_score( actuals, predictions, zero_division = 0 ),
-      'recall': recall_score( actuals, predictions, zero_division = 0 ),
-      'f1_score': f1_score( actuals, predictions, zero_division = 0 )
+      'n_samples': n_samples,
+      'accuracy': ( tp + tn ) / n_samples,
+      'precision': precision,
+      'recall': recall,
+      'f1_score': 2 * precision * recall / ( precision + recall ) if precision + recall > 0 else 0.0,
+      'confusion_matrix': { 'tp': tp, 'fp': fp, 'tn': tn, 'fn': fn }
     }
 
     return metrics
 
   def get_prediction_distribution( self, window_size: Optional[ int ] = None ) -> Dict:
-    if not self.prediction_log.exists():
+    if self._n_recorded == 0:
       return {}
 
-    predictions = []
-
-    with open( self.prediction_log, 'r' ) as f:
-      lines = f.readlines()
-
-      if window_size:
-        lines = lines[ -window_size: ]
-
-      for line in lines:
-        entry = json.loads( line )
-        predictions.append( entry[ 'prediction' ] )
+    counts = self._window_counts( window_size )
 
-    total = len( predictions )
-    fraud_count = sum( predictions )
+    total = int( counts[ N_PREDICTIONS ] )
+    fraud_count = int( counts[ N_FRAUD ] )
     legitimate_count = total - fraud_count
 
     distribution = {
       'total': total,
       'fraud': fraud_count,
       'legitimate': legitimate_count,
-      'fraud_rate': fraud_count / total if total > 0 else 0
+      'fraud_rate': fraud_count / total if total > 0 else 0,
+      'probability_histogram': counts[ 7: ].tolist()
     }
 
     return distribution
@@ -1,10 +1,18 @@
 # System
+import sys
 import json
+import time
+import queue
 import logging
+import threading
 import csv
 from pathlib import Path
 from datetime import datetime
-from typing import List
+from typing import List, Dict, Optional
+
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.monitoring.log_reader import read_last_records
+from src.monitoring.columnar_log import ColumnarPredictionLog
 
 logging.basicConfig( 
   level = logging.INFO,
@@ -13,11 +21,58 @@ logging.basicConfig(
 
 logger = logging.getLogger( __name__ )
 
+OVERFLOW_POLICIES = ( 'drop', 'block' )
+BACKENDS = ( 'jsonl', 'columnar' )
+
 class PredictionLogger:
-  def __init__( self, log_file_path: str = 'logs/monitoring/predictions.jsonl' ) -> None:
+  def __init__(
+    self,
+    log_file_path: str = 'logs/monitoring/predictions.jsonl',
+    async_mode: bool = False,
+    buffer_size: int = 10000,
+    flush_batch_size: int = 500,
+    flush_interval: float = 1.0,
+    overflow_policy: str = 'drop',
+    backend: str = 'jsonl',
+    feature_names: Optional[ List[ str ] ] = None,
+    segment_rows: int = 100000
+  ) -> None:
     self.log_file_path = Path( log_file_path )
     self.log_file_path.parent.mkdir( parents = True, exist_ok = True )
 
+    if overflow_policy not in OVERFLOW_POLICIES:
+      raise ValueError( f"Unknown overflow policy { overflow_policy }, expected one of { OVERFLOW_POLICIES }" )
+    if backend not in BACKENDS:
+      raise ValueError( f"Unknown log backend { backend }, expected one of { BACKENDS }" )
+
+    # For the columnar backend log_file_path is a directory of segments
+    self.backend = backend
+    self.columnar_log = ColumnarPredictionLog( log_file_path, feature_names, segment_rows ) if backend == 'columnar' else None
+
+    self.async_mode = async_mode
+    self.flush_batch_size = flush_batch_size
+    self.flush_interval = flush_interval
+    self.overflow_policy = overflow_policy
+    self.entries_written = 0
+    self.entries_dropped = 0
+
+    # Bounded buffer drained by a background writer thread
+    self._buffer: Optional[ queue.Queue ] = None
+    self._writer: Optional[ threading.Thread ] = None
+    self._stop = object()
+    self._closed = False
+
+    if async_mode:
+      self._buffer = queue.Queue( maxsize = buffer_size )
+      self._writer = threading.Thread( target = self._drain, name = "prediction-log-writer", daemon = True )
+      self._writer.start()
+      logger.info( f"Async prediction logging to { self.log_file_path } (buffer={ buffer_size }, policy={ overflow_policy })" )
+
+  @property
+  def may_block( self ) -> bool:
+    # Synchronous writes and the block policy can wait; async callers should log off the event loop
+    return not self.async_mode or self.overflow_policy == 'block'
+
   def log_prediction(
     self,
     features: dict,
@@ -25,28 +80,124 @@ class PredictionLogger:
     probability: float,
     actual_label: int = None
   ) -> None:
-    log_entry = {
-      'timestamp': datetime.now().isoformat(),
-      'features': features,
-      'prediction': prediction,
-      'probability': probability,
-      'actual_label': actual_label
+    self.log_predictions( [ features ], [ prediction ], [ probability ], [ actual_label ] )
+
+  def log_predictions(
+    self,
+    features: List[ dict ],
+    predictions: List[ int ],
+    probabilities: List[ float ],
+    actual_labels: List[ int ] = None
+  ) -> None:
+    if self._closed:
+      # Nothing drains the buffer any more; count the entries instead of queueing them
+      self.entries_dropped += len( predictions )
+      logger.warning( f"Prediction logger is closed, dropped { len( predictions ) } entries" )
+      return
+
+    if actual_labels is None:
+      actual_labels = [ None ] * len( predictions )
+
+    timestamp = datetime.now().isoformat()
+    entries = [
+      {
+        'timestamp': timestamp,
+        'features': row_features,
+        'prediction': prediction,
+        'probability': probability,
+        'actual_label': actual_label
+      }
+      for row_features, prediction, probability, actual_label in zip( features, predictions, probabilities, actual_labels )
+    ]
+
+    if not self.async_mode:
+      self._write_entries( entries )
+      return
+
+    for entry in entries:
+      if self.overflow_policy == 'block':
+        self._buffer.put( entry )
+        continue
+      try:
+        self._buffer.put_nowait( entry )
+      except queue.Full:
+        self.entries_dropped += 1
+        if self.entries_dropped % 1000 == 1:
+          logger.warning( f"Prediction log buffer full, { self.entries_dropped } entries dropped so far" )
+
+  def _write_entries( self, entries: List[ dict ] ) -> None:
+    if not entries:
+      return
+
+    if self.columnar_log is not None:
+      self.columnar_log.append( entries )
+    else:
+      # One open/write for the whole batch
+      with open( self.log_file_path, 'a' ) as file:
+        file.writelines( json.dumps( entry ) + '\n' for entry in entries )
+
+    self.entries_written += len( entries )
+
+  def _drain( self ) -> None:
+    batch = []
+    deadline = time.monotonic() + self.flush_interval
+    stopping = False
+
+    while not stopping:
+      try:
+        entry = self._buffer.get( timeout = max( deadline - time.monotonic(), 0 ) )
+        if entry is self._stop:
+          stopping = True
+        else:
+          batch.append( entry )
+      except queue.Empty:
+        pass
+
+      # Flush on size, on time, or on shutdown
+      if stopping or len( batch ) >= self.flush_batch_size or time.monotonic() >= deadline:
+        try:
+          self._write_entries( batch )
+        except Exception as e:
+          logger.error( f"Error writing { len( batch ) } prediction log entries: { e }" )
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+  def close( self, timeout: float = 10.0 ) -> None:
+    if self._closed:
+      return
+    self._closed = True
+
+    if self._writer is None:
+      if self.columnar_log is not None:
+        self.columnar_log.close()
+      return
+
+    # Sentinel goes behind everything already buffered, so the writer flushes it all first
+    self._buffer.put( self._stop )
+    self._writer.join( timeout = timeout )
+    if self._writer.is_alive():
+      logger.warning( "Prediction log writer did not finish flushing before timeout" )
+    self._writer = None
+    if self.columnar_log is not None:
+      self.columnar_log.close()
+
+    logger.info( f"Prediction logger closed: { self.entries_written } written, { self.entries_dropped } dropped" )
+
+  def get_stats( self ) -> Dict:
+    return {
+      'async_mode': self.async_mode,
+      'buffered': self._buffer.qsize() if self._buffer is not None else 0,
+      'written': self.entries_written,
+      'dropped': self.entries_dropped,
+      'overflow_policy': self.overflow_policy,
+      'backend': self.backend,
     }
-    
-    with open( self.log_file_path, 'a' ) as file:
-      file.write( json.dumps( log_entry ) + '\n' )
 
   def get_recent_predictions( self, n: int = 100 ) -> List[ dict ]:
-    if not self.log_file_path.exists():
-      return []
-    
-    predictions = []
-    with open( self.log_file_path, 'r' ) as file:
-      lines = file.readlines()
-      for line in lines[ -n: ]:
-        predictions.append( json.loads( line ) )
-    
-    return predictions
+    if self.columnar_log is not None:
+      return self.columnar_log.read_records( n )
+
+    return read_last_records( self.log_file_path, n )
 
 class PerformanceLogger:
   def __init__( self, log_file_path: str = 'logs/monitoring/performance.csv' ) -> None:
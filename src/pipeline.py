@@ -0,0 +1,238 @@
+# System
+import os
+import sys
+import json
+import hashlib
+import logging
+from pathlib import Path
+from datetime import datetime, timezone
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+sys.path.append( str( Path( __file__ ).parent.parent ) )
+from src.config import load_config
+from src.database import dispose_engines
+from src.ingestion.create_schema import create_star_schema, create_staging_table
+from src.ingestion.load_staging import load_staging_table
+from src.ingestion.populate_star_schema import populate_star_schema
+from src.prepocessessing.preprocess import preprocess_data
+from src.prepocessessing.processed_store import resolve_processed_location
+from src.model_development.model_development import develop_model
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+# In dependency order; each stage consumes what the previous one produced
+STAGES = ( 'schema', 'staging', 'star_schema', 'preprocess', 'train' )
+
+# Source files whose content is part of each stage's fingerprint
+STAGE_CODE: Dict[ str, List[ str ] ] = {
+  'schema': [ 'sql/create_star_schema.sql', 'sql/migrations/*.sql', 'src/ingestion/create_schema.py', 'src/ingestion/migrate_schema.py' ],
+  'staging': [ 'src/ingestion/load_staging.py', 'src/ingestion/bulk_loader.py', 'src/ingestion/schema_validation.py', 'src/ingestion/ingestion_stats.py' ],
+  'star_schema': [ 'src/ingestion/populate_star_schema.py', 'src/ingestion/populate_dimensions.py', 'src/ingestion/populate_facts.py', 'src/ingestion/watermarks.py' ],
+  'preprocess': [ 'src/prepocessessing/*.py' ],
+  'train': [ 'src/model_development/*.py', 'src/prepocessessing/resampling.py', 'src/monitoring/feature_histograms.py' ],
+}
+
+FEATURE_PIPELINE_PATH = 'data/processed/feature_pipeline.joblib'
+MODEL_PATH = 'models/fraud_detector.joblib'
+FLAT_MODEL_PATH = 'models/fraud_detector_flat.npz'
+
+HASH_BLOCK_BYTES = 1 << 20
+
+@dataclass
+class Stage:
+  name: str
+  run: Callable[ [], Any ]
+  # Anything that changes what the stage produces: config values, input file identities
+  params: Dict[ str, Any ]
+  # Files that must still exist for a cached result to count
+  outputs: List[ str ] = field( default_factory = list )
+  # Incremental runs append to this stage's tables, so a full run cannot reuse an incremental result
+  appends: bool = False
+  # Content identity of what an appending stage adds, kept per full run so the same input is never appended twice
+  load_id: Optional[ Callable[ [], str ] ] = None
+
+def _digest( value: Any ) -> str:
+  return hashlib.sha256( json.dumps( value, sort_keys = True, default = str ).encode() ).hexdigest()
+
+def hash_file( path: str ) -> str:
+  sha256 = hashlib.sha256()
+  with open( path, 'rb' ) as file:
+    for block in iter( lambda: file.read( HASH_BLOCK_BYTES ), b'' ):
+      sha256.update( block )
+  return sha256.hexdigest()
+
+def file_fingerprint( path: str, hash_contents: bool = False ) -> Dict[ str, Any ]:
+  # mtime + size is instant; hashing survives copies and touches but reads the whole file
+  stat = os.stat( path )
+  if hash_contents:
+    # No path: a copy of the same file is the same input
+    return { 'sha256': hash_file( path ) }
+  return { 'path': str( path ), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns }
+
+def code_fingerprint( patterns: Sequence[ str ], root: Path = Path( '.' ) ) -> str:
+  files = sorted( { path for pattern in patterns for path in root.glob( pattern ) if path.is_file() } )
+  return _digest( { str( path ): hash_file( path ) for path in files } )
+
+def stage_fingerprint( stage: Stage, upstream: Optional[ str ] ) -> str:
+  return _digest( {
+    'stage': stage.name,
+    'upstream': upstream,
+    'code': code_fingerprint( STAGE_CODE[ stage.name ] ),
+    'params': stage.params
+  } )
+
+def load_state( state_path: str ) -> Dict[ str, Any ]:
+  if not Path( state_path ).exists():
+    return {}
+  with open( state_path ) as state_file:
+    return json.load( state_file )
+
+def save_state( state_path: str, state: Dict[ str, Any ] ) -> None:
+  Path( state_path ).parent.mkdir( parents = True, exist_ok = True )
+  # Write then rename, so an interrupted run never leaves a truncated state file
+  tmp_path = f"{ state_path }.tmp"
+  with open( tmp_path, 'w' ) as state_file:
+    json.dump( state, state_file, indent = 2, sort_keys = True )
+  os.replace( tmp_path, state_path )
+
+def build_stages( csv_file_path: str, incremental: bool = False ) -> List[ Stage ]:
+  config = load_config()
+  processed_path, processed_format = resolve_processed_location()
+
+  # Which database is being built, not how to log in to it
+  database = { key: getattr( config.database, key ) for key in ( 'host', 'port', 'database' ) } if config.database else None
+
+  def train() -> None:
+    # The database stages are done; release their pooled connections first
+    dispose_engines()
+    develop_model( data_path = processed_path, model_path = MODEL_PATH, flat_model_path = FLAT_MODEL_PATH, feature_pipeline_path = FEATURE_PIPELINE_PATH )
+
+  return [
+    # Incremental runs keep what is already loaded; full runs drop and recreate
+    Stage(
+      'schema',
+      lambda: ( create_star_schema( drop_existing = not incremental ), create_staging_table( drop_existing = not incremental ) ),
+      { 'database': database }
+    ),
+    Stage(
+      'staging',
+      lambda: load_staging_table( csv_file_path, truncate = not incremental ),
+      # Only settings that change which rows are loaded; chunk sizes, workers and the load method do not
+      {
+        'csv': file_fingerprint( csv_file_path, config.pipeline.hash_inputs ),
+        'validation': { 'validate_rows': config.ingestion.validate_rows, 'on_invalid_rows': config.ingestion.on_invalid_rows }
+      },
+      appends = True,
+      load_id = lambda: hash_file( csv_file_path )
+    ),
+    Stage(
+      'star_schema',
+      lambda: populate_star_schema( mode = 'incremental' if incremental else 'full' ),
+      { 'star_schema': asdict( config.star_schema ) },
+      appends = True
+    ),
+    Stage(
+      'preprocess',
+      lambda: preprocess_data( save_path = processed_path, feature_pipeline_path = FEATURE_PIPELINE_PATH, refit = config.preprocessing.refit_feature_pipeline, output_format = processed_format ),
+      { 'preprocessing': asdict( config.preprocessing ), 'processed_path': processed_path, 'processed_format': processed_format },
+      [ processed_path, FEATURE_PIPELINE_PATH ]
+    ),
+    Stage(
+      'train',
+      train,
+      { 'processed_path': processed_path, 'resampling': asdict( config.resampling ), 'tuning': asdict( config.tuning ) },
+      [ MODEL_PATH, FLAT_MODEL_PATH ]
+    ),
+  ]
+
+def run_pipeline(
+  csv_file_path: Optional[ str ] = None,
+  incremental: bool = False,
+  from_stage: Optional[ str ] = None,
+  only: Optional[ Sequence[ str ] ] = None,
+  force: bool = False
+) -> Dict[ str, str ]:
+  try:
+    for name in ( [ from_stage ] if from_stage else [] ) + list( only or [] ):
+      if name not in STAGES:
+        raise ValueError( f"Unknown stage: { name } (expected one of { STAGES })" )
+    if from_stage and only:
+      raise ValueError( "Use either from_stage or only, not both" )
+
+    config = load_config()
+    csv_file_path = csv_file_path or config.data.raw_csv
+    state_path = config.pipeline.state_file
+    state = load_state( state_path )
+
+    # Stages named explicitly always run; the rest run only when their fingerprint changed
+    if only:
+      selected, forced = set( only ), set( only )
+    elif from_stage:
+      selected = forced = set( STAGES[ STAGES.index( from_stage ): ] )
+    else:
+      selected, forced = set( STAGES ), set( STAGES ) if force else set()
+
+    mode = 'incremental' if incremental else 'full'
+    statuses: Dict[ str, str ] = {}
+    upstream: Optional[ str ] = None
+    for stage in build_stages( csv_file_path, incremental ):
+      fingerprint = stage_fingerprint( stage, upstream )
+      recorded = state.get( stage.name, {} )
+
+      if stage.name not in selected:
+        # Not part of this run: downstream stages build on whatever it last produced
+        upstream = recorded.get( 'fingerprint', fingerprint )
+        statuses[ stage.name ] = 'not selected'
+        continue
+
+      outputs_exist = all( Path( output ).exists() for output in stage.outputs )
+      # A full run must replace appended data, so it cannot reuse an incremental result
+      mode_matches = not stage.appends or incremental or recorded.get( 'mode' ) == 'full'
+      if stage.name not in forced and recorded.get( 'fingerprint' ) == fingerprint and outputs_exist and mode_matches:
+        logger.info( f"Stage { stage.name }: inputs unchanged, skipping" )
+        statuses[ stage.name ] = 'cached'
+        upstream = fingerprint
+        continue
+
+      # Inputs appended since the last full run; only incremental runs add to them
+      loaded = recorded.get( 'loaded', [] ) if incremental else []
+      load_id = stage.load_id() if stage.load_id is not None else None
+      if stage.name not in forced and incremental and load_id in loaded:
+        # Touched, copied or loaded with other performance settings: appending it again would duplicate rows
+        logger.info( f"Stage { stage.name }: input already loaded, skipping" )
+        statuses[ stage.name ] = 'cached'
+        upstream = recorded.get( 'fingerprint', fingerprint )
+        continue
+
+      logger.info( f"Stage { stage.name }: running" )
+      # Forget the old result first, so a failure part-way is never mistaken for a finished stage.
+      # The ledger of appended inputs stays: those rows are in the tables either way
+      state[ stage.name ] = { 'loaded': recorded.get( 'loaded', [] ) } if stage.load_id is not None else {}
+      save_state( state_path, state )
+
+      stage.run()
+
+      state[ stage.name ] = {
+        'fingerprint': fingerprint,
+        'params': stage.params,
+        'mode': mode,
+        'completed_at': datetime.now( timezone.utc ).isoformat()
+      }
+      if load_id is not None:
+        state[ stage.name ][ 'loaded' ] = loaded + [ load_id ]
+      save_state( state_path, state )
+      statuses[ stage.name ] = 'ran'
+      upstream = fingerprint
+
+    logger.info( "Pipeline stages: " + ', '.join( f"{ name } { status }" for name, status in statuses.items() ) )
+    return statuses
+
+  except Exception as e:
+    logger.error( f"Error running pipeline: { e }" )
+    raise
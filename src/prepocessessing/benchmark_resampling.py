@@ -0,0 +1,108 @@
+# System
+import sys
+import time
+import argparse
+import logging
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+# Data manipulation
+import pandas as pd
+# Machine Learning
+from imblearn.over_sampling import SMOTE
+from imblearn.under_sampling import RandomUnderSampler
+from imblearn.pipeline import Pipeline
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.model_development.train_test_split import split_data
+from src.prepocessessing.processed_store import resolve_processed_location, load_processed
+from src.prepocessessing.resampling import resample_training_split
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+# Both schemes return the training set the forest is fitted on, so each includes its split
+
+def legacy_resample( X: pd.DataFrame, Y: pd.Series, random_state: int = 42 ) -> Tuple[ pd.DataFrame, pd.Series ]:
+  # The previous scheme: SMOTE over the whole dataset to 1:2, undersample to 1:1, then split
+  pipeline = Pipeline( [
+    ( 'over', SMOTE( sampling_strategy = 0.5, random_state = random_state ) ),
+    ( 'under', RandomUnderSampler( sampling_strategy = 1, random_state = random_state ) ),
+  ] )
+  X_resampled, Y_resampled = pipeline.fit_resample( X, Y )
+  X_train, _, Y_train, _ = split_data( X_resampled, Y_resampled, random_state = random_state )
+  return X_train, Y_train
+
+def split_then_resample( X: pd.DataFrame, Y: pd.Series, random_state: int = 42 ) -> Tuple[ pd.DataFrame, pd.Series ]:
+  # What develop_model does now: split, then undersample and SMOTE the training split
+  X_train, _, Y_train, _ = split_data( X, Y, random_state = random_state )
+  return resample_training_split( X_train, Y_train, random_state = random_state )
+
+def measure( resample: Callable, X: pd.DataFrame, Y: pd.Series, fit_trees: int = 0 ) -> Dict[ str, Any ]:
+  start = time.perf_counter()
+  X_train, Y_train = resample( X, Y )
+  seconds = time.perf_counter() - start
+
+  # Optionally show what the training set size does to the model fit downstream
+  fit_seconds = None
+  if fit_trees:
+    start = time.perf_counter()
+    RandomForestClassifier( n_estimators = fit_trees, n_jobs = -1, random_state = 42 ).fit( X_train, Y_train )
+    fit_seconds = time.perf_counter() - start
+  rows_out = len( Y_train )
+  del X_train, Y_train
+
+  # Separate pass for memory: tracing slows down Python-level allocations (e.g. in the
+  # stratified split) too much to time under it. It sees NumPy buffers, so the peak covers the copies
+  tracemalloc.start()
+  resample( X, Y )
+  peak = tracemalloc.get_traced_memory()[ 1 ]
+  tracemalloc.stop()
+
+  return {
+    'seconds': seconds,
+    'peak_mib': peak / 2 ** 20,
+    'rows_out': int( rows_out ),
+    'fit_seconds': fit_seconds
+  }
+
+def benchmark_resampling( X: pd.DataFrame, Y: pd.Series, include_legacy: bool = True, fit_trees: int = 0 ) -> Dict[ str, Dict[ str, Any ] ]:
+  logger.info( f"Benchmarking resampling on { len( Y ) } rows ({ int( Y.sum() ) } fraud)..." )
+
+  schemes = { 'split_then_resample': split_then_resample }
+  if include_legacy:
+    schemes = { 'legacy': legacy_resample, **schemes }
+
+  results = {}
+  for name, resample in schemes.items():
+    results[ name ] = measure( resample, X, Y, fit_trees )
+    result = results[ name ]
+    fit = f", { fit_trees }-tree forest fit { result[ 'fit_seconds' ]:.2f}s" if fit_trees else ''
+    logger.info( f"{ name }: { result[ 'seconds' ]:.2f}s, peak { result[ 'peak_mib' ]:.0f} MiB, { result[ 'rows_out' ] } training rows{ fit }" )
+
+  if include_legacy:
+    legacy, current = results[ 'legacy' ], results[ 'split_then_resample' ]
+    logger.info( f"Speedup { legacy[ 'seconds' ] / max( current[ 'seconds' ], 1e-9 ):.1f}x, peak memory { legacy[ 'peak_mib' ] / max( current[ 'peak_mib' ], 1e-9 ):.1f}x lower" )
+
+  return results
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser( description = "Compare the old whole-dataset SMOTE with undersample-then-SMOTE on the training split" )
+  parser.add_argument( "--data-path", help = "Processed dataset (defaults to data.processed_path / processed_format)" )
+  parser.add_argument( "--rows", type = int, help = "Benchmark on a random sample of this many rows" )
+  parser.add_argument( "--fit-trees", type = int, default = 0, help = "Also time fitting a forest of this many trees on each training set" )
+  parser.add_argument( "--skip-legacy", action = "store_true", help = "Only time the current scheme (the old one can need many GB on full PaySim)" )
+  args = parser.parse_args()
+
+  data_path, data_format = resolve_processed_location( args.data_path )
+  X, Y = load_processed( data_path, data_format )
+  if args.rows and args.rows < len( Y ):
+    sample = Y.sample( n = args.rows, random_state = 42 ).index
+    X, Y = X.loc[ sample ].reset_index( drop = True ), Y.loc[ sample ].reset_index( drop = True )
+
+  benchmark_resampling( X, Y, include_legacy = not args.skip_legacy, fit_trees = args.fit_trees )
@@ -1,54 +1,67 @@
 # System
+import sys
 import logging
+from pathlib import Path
+from typing import Iterator
 # Database
 from sqlalchemy import Engine, text
 # Data manipulation
 import pandas as pd
 
-logging.basicConfig( 
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.prepocessessing.feature_engineering import CATEGORY_TABLES
+
+logging.basicConfig(
   level = logging.INFO,
   format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
 logger = logging.getLogger( __name__ )
 
-def load_data_from_star_schema( engine: Engine ) -> pd.DataFrame:
+STAR_SCHEMA_SQL = """
+  SELECT
+    -- Time features
+    dt.step,
+    dt.hour,
+    dt.day,
+
+    -- Tx type
+    tt.type_name,
+
+    -- Account info
+    {account_ids}da_orig.account_type as origin_type,
+    da_dest.account_type as destination_type,
+
+    -- Tx amount
+    ft.amount,
+    ft.old_balance_orig,
+    ft.new_balance_orig,
+    ft.old_balance_dest,
+    ft.new_balance_dest,
+
+    -- Tx measures
+    ft.is_fraud,
+    ft.is_flagged_fraud
+
+  FROM fact_transactions ft
+  INNER JOIN dim_time dt ON ft.time_key = dt.id
+  INNER JOIN dim_transaction_type tt ON ft.type_key = tt.id
+  INNER JOIN dim_account da_orig ON ft.origin_account_key = da_orig.id
+  INNER JOIN dim_account da_dest ON ft.destination_account_key = da_dest.id
+"""
+
+ACCOUNT_ID_COLUMNS = """da_orig.account_id as origin_account,
+    da_dest.account_id as destination_account,
+    """
+
+# Integer columns the streaming loader narrows to the smallest type that holds each chunk
+INTEGER_COLUMNS: list[ str ] = [ 'step', 'hour', 'day', 'is_fraud', 'is_flagged_fraud' ]
+
+def load_data_from_star_schema( engine: Engine, include_account_ids: bool = True ) -> pd.DataFrame:
   try:
     logger.info( "Loading data from star schema..." )
 
-    sql = """
-      SELECT 
-        -- Time features
-        dt.step,
-        dt.hour,
-        dt.day,
-
-        -- Tx type
-        tt.type_name,
-
-        -- Account info 
-        da_orig.account_id as origin_account,
-        da_orig.account_type as origin_type,
-        da_dest.account_id as destination_account,
-        da_dest.account_type as destination_type,
-
-        -- Tx amount
-        ft.amount,
-        ft.old_balance_orig,
-        ft.new_balance_orig,
-        ft.old_balance_dest,
-        ft.new_balance_dest,
-
-        -- Tx measures
-        ft.is_fraud,
-        ft.is_flagged_fraud 
-
-      FROM fact_transactions ft 
-      INNER JOIN dim_time dt ON ft.time_key = dt.id 
-      INNER JOIN dim_transaction_type tt ON ft.type_key = tt.id 
-      INNER JOIN dim_account da_orig ON ft.origin_account_key = da_orig.id 
-      INNER JOIN dim_account da_dest ON ft.destination_account_key = da_dest.id 
-    """
+    sql = STAR_SCHEMA_SQL.format( account_ids = ACCOUNT_ID_COLUMNS if include_account_ids else '' )
 
     with engine.connect() as connection:
       df = pd.read_sql_query( sql, connection )
@@ -58,4 +71,41 @@ def load_data_from_star_schema( engine: Engine ) -> pd.DataFrame:
     return df
   except Exception as e:
     logger.error( f"Error loading data: { e }" )
-    raise
\ No newline at end of file
+    raise
+
+def downcast_chunk( chunk: pd.DataFrame ) -> pd.DataFrame:
+  for column in INTEGER_COLUMNS:
+    chunk[ column ] = pd.to_numeric( chunk[ column ], downcast = 'integer' )
+
+  # Fixed category lists, so codes are int8 and identical in every chunk; unknown values become NaN
+  for column, categories in CATEGORY_TABLES.items():
+    chunk[ column ] = chunk[ column ].astype( pd.CategoricalDtype( categories ) )
+
+  # Measures stay float64 until the features are derived: balance errors are differences
+  # of values up to ~1e8, which float32 cannot hold to the cent
+  return chunk
+
+def iter_data_from_star_schema( engine: Engine, chunk_size: int = 100000 ) -> Iterator[ pd.DataFrame ]:
+  try:
+    logger.info( f"Streaming data from star schema in chunks of { chunk_size } rows..." )
+
+    # Account ids are not model features, so they are never fetched
+    sql = STAR_SCHEMA_SQL.format( account_ids = '' )
+
+    rows = 0
+    # Server-side cursor: the driver holds one chunk at a time instead of the whole result set
+    with engine.connect().execution_options( stream_results = True, max_row_buffer = chunk_size ) as connection:
+      for chunk in pd.read_sql_query( text( sql ), connection, chunksize = chunk_size ):
+        rows += len( chunk )
+        yield downcast_chunk( chunk )
+
+    logger.info( f"Data streamed successfully: { rows } rows" )
+  except Exception as e:
+    logger.error( f"Error streaming data: { e }" )
+    raise
+
+def iter_amounts_from_star_schema( engine: Engine, chunk_size: int = 100000 ) -> Iterator[ pd.DataFrame ]:
+  # Single-table pass for fitting the feature pipeline, which only needs the amounts
+  with engine.connect().execution_options( stream_results = True, max_row_buffer = chunk_size ) as connection:
+    for chunk in pd.read_sql_query( text( "SELECT amount FROM fact_transactions" ), connection, chunksize = chunk_size ):
+      yield chunk
@@ -1,7 +1,14 @@
 # System
+import sys
 import logging
+from pathlib import Path
+from typing import Any, Dict, Mapping
 # Data manipulation
 import pandas as pd
+import numpy as np
+
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.ingestion.schema_validation import EXPECTED_TYPES
 
 logging.basicConfig( 
   level = logging.INFO,
@@ -10,29 +17,139 @@ logging.basicConfig(
 
 logger = logging.getLogger( __name__ )
 
-def engineer_features( df: pd.DataFrame ) -> pd.DataFrame:
+# Model input columns, in the order the model is trained and served with
+FEATURE_COLUMNS: list[ str ] = [
+  # Temporal features
+  'step', 'hour', 'day',
+
+  # Tx type
+  'type_encoded',
+
+  # Account info
+  'origin_type_encoded', 'destination_type_encoded',
+
+  # Tx measures
+  'amount', 'old_balance_orig', 'new_balance_orig', 'old_balance_dest', 'new_balance_dest',
+
+  # Engineered features
+  'balance_diff_orig', 'balance_diff_dest', 'error_balance_orig', 'error_balance_dest', 'is_round_amount', 'origin_emptied', 'is_large_tx',
+]
+
+# Storage dtype of each feature once computed (features are always computed in float64/int64).
+# Measures are float32, which is what the tree models cast to anyway; codes are signed since unknowns are -1
+MEASURE_DTYPE = np.float32
+FLAG_DTYPE = np.uint8
+FEATURE_DTYPES: dict[ str, type ] = {
+  'step': np.int16, 'hour': np.int16, 'day': np.int16,
+  'type_encoded': np.int8, 'origin_type_encoded': np.int8, 'destination_type_encoded': np.int8,
+  'is_round_amount': FLAG_DTYPE, 'origin_emptied': FLAG_DTYPE, 'is_large_tx': FLAG_DTYPE,
+  **{ column: MEASURE_DTYPE for column in [
+    'amount', 'old_balance_orig', 'new_balance_orig', 'old_balance_dest', 'new_balance_dest',
+    'balance_diff_orig', 'balance_diff_dest', 'error_balance_orig', 'error_balance_dest',
+  ] },
+}
+LABEL_DTYPE = np.uint8
+
+# Categorical source column -> encoded feature
+CATEGORICAL_COLUMNS: dict[ str, str ] = {
+  'type_name': 'type_encoded',
+  'origin_type': 'origin_type_encoded',
+  'destination_type': 'destination_type_encoded',
+}
+
+# Fixed lookup tables, so codes don't depend on which categories a dataset happens to contain.
+# Sorted, which gives the same codes pandas assigned when every category was present
+ACCOUNT_TYPES: list[ str ] = [ 'C', 'M' ]
+CATEGORY_TABLES: dict[ str, list[ str ] ] = {
+  'type_name': sorted( EXPECTED_TYPES ),
+  'origin_type': ACCOUNT_TYPES,
+  'destination_type': ACCOUNT_TYPES,
+}
+
+def fit_feature_params( df: pd.DataFrame ) -> Dict[ str, Any ]:
+  logger.info( "Fitting feature parameters..." )
+
+  return {
+    'large_tx_threshold': float( df[ 'amount' ].quantile( 0.90 ) ),
+    'categories': CATEGORY_TABLES
+  }
+
+def _encode( values: np.ndarray, categories: list[ str ] ) -> np.ndarray:
+  # Vectorized lookup in the sorted category list; unknown values get -1
+  if isinstance( getattr( values, 'dtype', None ), pd.CategoricalDtype ):
+    # Streamed chunks are already coded; only the (few) categories need looking up
+    lookup = _encode( np.asarray( values.cat.categories ), categories )
+    codes = values.cat.codes.to_numpy()
+    return np.where( codes >= 0, lookup[ codes ], -1 ).astype( np.int64 )
+
+  categories = np.asarray( categories, dtype = str )
+  values = np.asarray( values ).astype( str )
+  positions = np.searchsorted( categories, values )
+  clipped = np.minimum( positions, max( len( categories ) - 1, 0 ) )
+  found = ( positions < len( categories ) ) & ( categories[ clipped ] == values ) if len( categories ) > 0 else np.zeros( len( values ), dtype = bool )
+  return np.where( found, positions, -1 ).astype( np.int64 )
+
+def compute_features( raw: Mapping[ str, Any ], feature_params: Dict[ str, Any ] ) -> Dict[ str, np.ndarray ]:
+  # Shared by training (DataFrame columns) and serving (arrays built from requests)
+  step = np.asarray( raw[ 'step' ], dtype = np.int64 )
+  amount = np.asarray( raw[ 'amount' ], dtype = np.float64 )
+  old_balance_orig = np.asarray( raw[ 'old_balance_orig' ], dtype = np.float64 )
+  new_balance_orig = np.asarray( raw[ 'new_balance_orig' ], dtype = np.float64 )
+  old_balance_dest = np.asarray( raw[ 'old_balance_dest' ], dtype = np.float64 )
+  new_balance_dest = np.asarray( raw[ 'new_balance_dest' ], dtype = np.float64 )
+
+  # Balance changes
+  balance_diff_orig = new_balance_orig - old_balance_orig
+  balance_diff_dest = new_balance_dest - old_balance_dest
+
+  features = {
+    # Same derivation as dim_time
+    'step': step,
+    'hour': np.asarray( raw[ 'hour' ], dtype = np.int64 ) if 'hour' in raw else step % 24,
+    'day': np.asarray( raw[ 'day' ], dtype = np.int64 ) if 'day' in raw else step // 24,
+    'amount': amount,
+    'old_balance_orig': old_balance_orig,
+    'new_balance_orig': new_balance_orig,
+    'old_balance_dest': old_balance_dest,
+    'new_balance_dest': new_balance_dest,
+    'balance_diff_orig': balance_diff_orig,
+    'balance_diff_dest': balance_diff_dest,
+    # Balance errors (detect inconsistencies)
+    'error_balance_orig': balance_diff_orig + amount,
+    'error_balance_dest': balance_diff_dest - amount,
+    # Fraud indicators
+    'is_round_amount': ( amount % 1000 == 0 ).astype( np.int64 ),
+    'origin_emptied': ( new_balance_orig == 0 ).astype( np.int64 ),
+    'is_large_tx': ( amount > feature_params[ 'large_tx_threshold' ] ).astype( np.int64 ),
+  }
+
+  # Encode categorical variables
+  for column, encoded in CATEGORICAL_COLUMNS.items():
+    features[ encoded ] = _encode( raw[ column ], feature_params[ 'categories' ][ column ] )
+
+  return features
+
+def build_feature_matrix( raw: Mapping[ str, Any ], feature_params: Dict[ str, Any ] ) -> np.ndarray:
+  features = compute_features( raw, feature_params )
+  return np.column_stack( [ features[ column ] for column in FEATURE_COLUMNS ] ).astype( np.float64 )
+
+def build_feature_frame( raw: Mapping[ str, Any ], feature_params: Dict[ str, Any ] ) -> pd.DataFrame:
+  features = compute_features( raw, feature_params )
+  return pd.DataFrame( { column: features[ column ].astype( FEATURE_DTYPES[ column ] ) for column in FEATURE_COLUMNS } )
+
+def engineer_features( df: pd.DataFrame, feature_params: Dict[ str, Any ] = None ) -> pd.DataFrame:
   try:
     logger.info( "Engineering features..." )
 
     initial_cols = len( df.columns )
 
-    # Balance changes
-    df[ 'balance_diff_orig' ] = df[ 'new_balance_orig' ] - df[ 'old_balance_orig' ]
-    df[ 'balance_diff_dest' ] = df[ 'new_balance_dest' ] - df[ 'old_balance_dest' ]
+    if feature_params is None:
+      feature_params = fit_feature_params( df )
 
-    # Balance errors (detect inconsistencies)
-    df[ 'error_balance_orig' ] = df[ 'balance_diff_orig' ] + df[ 'amount' ]
-    df[ 'error_balance_dest' ] = df[ 'balance_diff_dest' ] - df[ 'amount' ]
-
-    # Fraud indicators
-    df[ 'is_round_amount' ] = ( df[ 'amount' ] % 1000 == 0 ).astype( int )
-    df[ 'origin_emptied' ] = ( df[ 'new_balance_orig' ] == 0 ).astype( int )
-    df[ 'is_large_tx' ] = ( df[ 'amount' ] > df[ 'amount' ].quantile( 0.90 ) ).astype( int )
-
-    # Encode categorical variables
-    df[ 'type_encoded' ] = df[ 'type_name' ].astype( 'category' ).cat.codes
-    df[ 'origin_type_encoded' ] = df[ 'origin_type' ].astype( 'category' ).cat.codes
-    df[ 'destination_type_encoded' ] = df[ 'destination_type' ].astype( 'category' ).cat.codes
+    # Existing columns (the raw measures, step/hour/day) are narrowed to the plan as well;
+    # the features were already derived from their full-precision values
+    for column, values in compute_features( df, feature_params ).items():
+      df[ column ] = values.astype( FEATURE_DTYPES[ column ] )
 
     final_cols = len( df.columns )
     new_features = final_cols - initial_cols
@@ -48,22 +165,7 @@ def engineer_features( df: pd.DataFrame ) -> pd.DataFrame:
 def select_features( df: pd.DataFrame ) -> tuple[ pd.DataFrame, pd.Series, list[ str ] ]:
   logger.info( "Selecting features..." )
 
-  feature_cols = [
-    # Temporal features
-    'step', 'hour', 'day',
-
-    # Tx type
-    'type_encoded',
-
-    # Account info
-    'origin_type_encoded', 'destination_type_encoded',
-    
-    # Tx measures
-    'amount', 'old_balance_orig', 'new_balance_orig', 'old_balance_dest', 'new_balance_dest',
-
-    # Engineered features
-    'balance_diff_orig', 'balance_diff_dest', 'error_balance_orig', 'error_balance_dest', 'is_round_amount', 'origin_emptied', 'is_large_tx',
-  ]
+  feature_cols = FEATURE_COLUMNS
 
   # Verify features exist
   missing_features = set( feature_cols ) - set( df.columns )
@@ -71,8 +173,9 @@ def select_features( df: pd.DataFrame ) -> tuple[ pd.DataFrame, pd.Series, list[
     logger.error( f"Missing features: { missing_features }" )
     raise ValueError( f"Missing features: { missing_features }" )
   
-  X = df[ feature_cols ].copy()
-  Y = df[ 'is_fraud' ].copy()
+  # Column selection already yields a new frame (copy-on-write), so no defensive copies
+  X = df[ feature_cols ]
+  Y = df[ 'is_fraud' ].astype( LABEL_DTYPE, copy = False )
 
   logger.info( f"Selected { len( X.columns ) } features" )
   logger.info( f"Feature matrix shape: { X.shape }" )
@@ -0,0 +1,132 @@
+# System
+import sys
+import math
+import logging
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+# Saving and loading models
+import joblib
+# Data manipulation
+import numpy as np
+import pandas as pd
+
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.prepocessessing.feature_engineering import CATEGORY_TABLES, compute_features, build_feature_matrix, build_feature_frame
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+class QuantileSketch:
+  """
+  Streaming quantile sketch for non-negative values with bounded relative error.
+
+  Values fall into logarithmic buckets (gamma = (1 + a) / (1 - a)), so any quantile
+  is answered within `relative_accuracy` of the true value after a single pass,
+  using memory proportional to the log of the value range rather than the row count.
+  """
+
+  def __init__( self, relative_accuracy: float = 0.005 ) -> None:
+    self.relative_accuracy = relative_accuracy
+    self.gamma = ( 1 + relative_accuracy ) / ( 1 - relative_accuracy )
+    self.log_gamma = math.log( self.gamma )
+    self.buckets: Dict[ int, int ] = {}
+    self.zero_count = 0
+    self.count = 0
+
+  def update( self, values: np.ndarray ) -> None:
+    values = np.asarray( values, dtype = np.float64 )
+    values = values[ ~np.isnan( values ) ]
+
+    positive = values[ values > 0 ]
+    self.zero_count += int( len( values ) - len( positive ) )
+    self.count += int( len( values ) )
+
+    indices, counts = np.unique( np.ceil( np.log( positive ) / self.log_gamma ).astype( np.int64 ), return_counts = True )
+    for index, count in zip( indices.tolist(), counts.tolist() ):
+      self.buckets[ index ] = self.buckets.get( index, 0 ) + count
+
+  def merge( self, other: 'QuantileSketch' ) -> None:
+    if other.gamma != self.gamma:
+      raise ValueError( "Cannot merge sketches with different accuracy" )
+    for index, count in other.buckets.items():
+      self.buckets[ index ] = self.buckets.get( index, 0 ) + count
+    self.zero_count += other.zero_count
+    self.count += other.count
+
+  def quantile( self, q: float ) -> float:
+    if self.count == 0:
+      raise ValueError( "Cannot compute a quantile of an empty sketch" )
+
+    rank = q * ( self.count - 1 )
+    if rank < self.zero_count:
+      return 0.0
+
+    seen = self.zero_count
+    for index in sorted( self.buckets ):
+      seen += self.buckets[ index ]
+      if seen > rank:
+        # Midpoint (in relative terms) of the bucket ( gamma^(i-1), gamma^i ]
+        return 2 * self.gamma ** index / ( self.gamma + 1 )
+
+    return 2 * self.gamma ** max( self.buckets ) / ( self.gamma + 1 )
+
+class FeaturePipeline:
+  def __init__( self, large_tx_quantile: float = 0.90, relative_accuracy: float = 0.005 ) -> None:
+    self.large_tx_quantile = large_tx_quantile
+    self.amount_sketch = QuantileSketch( relative_accuracy )
+    self.large_tx_threshold: Optional[ float ] = None
+    self.categories = { column: list( values ) for column, values in CATEGORY_TABLES.items() }
+
+  def partial_fit( self, df: pd.DataFrame ) -> 'FeaturePipeline':
+    # Chunks can be streamed through; only the amount sketch carries state
+    self.amount_sketch.update( df[ 'amount' ].to_numpy() )
+    self.large_tx_threshold = self.amount_sketch.quantile( self.large_tx_quantile )
+    return self
+
+  def fit( self, df: pd.DataFrame ) -> 'FeaturePipeline':
+    self.amount_sketch = QuantileSketch( self.amount_sketch.relative_accuracy )
+    self.partial_fit( df )
+    logger.info( f"Feature pipeline fitted on { self.amount_sketch.count } rows (large tx threshold: { self.large_tx_threshold:.2f})" )
+    return self
+
+  @property
+  def is_fitted( self ) -> bool:
+    return self.large_tx_threshold is not None
+
+  @property
+  def params( self ) -> Dict[ str, Any ]:
+    if not self.is_fitted:
+      raise RuntimeError( "Feature pipeline is not fitted" )
+    return {
+      'large_tx_threshold': self.large_tx_threshold,
+      'categories': self.categories
+    }
+
+  def transform( self, raw: Mapping[ str, Any ] ) -> Dict[ str, np.ndarray ]:
+    return compute_features( raw, self.params )
+
+  def transform_matrix( self, raw: Mapping[ str, Any ] ) -> np.ndarray:
+    return build_feature_matrix( raw, self.params )
+
+  def transform_frame( self, raw: Mapping[ str, Any ] ) -> pd.DataFrame:
+    # Same features with the compact storage dtypes, for building training sets
+    return build_feature_frame( raw, self.params )
+
+  def save( self, path: str ) -> None:
+    Path( path ).parent.mkdir( parents = True, exist_ok = True )
+    joblib.dump( self, path )
+    logger.info( f"Feature pipeline saved to { path }" )
+
+  @classmethod
+  def load( cls, path: str ) -> 'FeaturePipeline':
+    loaded = joblib.load( path )
+    # Accept a standalone pipeline or a model artifact that embeds one
+    pipeline = loaded.get( 'feature_pipeline' ) if isinstance( loaded, dict ) else loaded
+    if not isinstance( pipeline, cls ):
+      raise ValueError( f"No feature pipeline found in { path }" )
+    logger.info( f"Feature pipeline loaded from { path }" )
+    return pipeline
@@ -0,0 +1,88 @@
+# System
+import os
+import sys
+import logging
+from typing import Any, Dict, List, Optional
+# Data manipulation
+import numpy as np
+import pandas as pd
+
+# Optional: not available on Windows, where peak RSS is simply not reported
+try:
+  import resource
+except ImportError:
+  resource = None
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+MIB = 2 ** 20
+
+def current_rss_mib() -> Optional[ float ]:
+  # Linux only; elsewhere just the peak is reported
+  try:
+    with open( '/proc/self/statm' ) as statm:
+      resident_pages = int( statm.read().split()[ 1 ] )
+    return resident_pages * os.sysconf( 'SC_PAGE_SIZE' ) / MIB
+  except ( OSError, ValueError, IndexError ):
+    return None
+
+def peak_rss_mib() -> Optional[ float ]:
+  if resource is None:
+    return None
+  max_rss = resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss
+  # Kilobytes on Linux, bytes on macOS
+  return max_rss / MIB if sys.platform == 'darwin' else max_rss / 1024
+
+def object_mib( obj: Any ) -> float:
+  if isinstance( obj, pd.DataFrame ):
+    return obj.memory_usage( index = True, deep = True ).sum() / MIB
+  if isinstance( obj, pd.Series ):
+    return obj.memory_usage( index = True, deep = True ) / MIB
+  if isinstance( obj, np.ndarray ):
+    return obj.nbytes / MIB
+  return 0.0
+
+class MemoryReport:
+  """
+  Per-stage memory usage of a pipeline run: the size of the data a stage produced,
+  the process RSS after it, and the peak RSS so far.
+  """
+
+  def __init__( self, name: str ) -> None:
+    self.name = name
+    self.stages: List[ Dict[ str, Any ] ] = []
+
+  def record( self, stage: str, *objects: Any ) -> Dict[ str, Any ]:
+    entry = {
+      'stage': stage,
+      'data_mib': sum( object_mib( obj ) for obj in objects ),
+      'rss_mib': current_rss_mib(),
+      'peak_rss_mib': peak_rss_mib()
+    }
+    self.stages.append( entry )
+    logger.info( f"[{ self.name }] { stage }: { self._format( entry ) }" )
+    return entry
+
+  def _format( self, entry: Dict[ str, Any ] ) -> str:
+    parts = [ f"data { entry[ 'data_mib' ]:.1f} MiB" ]
+    if entry[ 'rss_mib' ] is not None:
+      parts.append( f"rss { entry[ 'rss_mib' ]:.1f} MiB" )
+    if entry[ 'peak_rss_mib' ] is not None:
+      parts.append( f"peak rss { entry[ 'peak_rss_mib' ]:.1f} MiB" )
+    return ', '.join( parts )
+
+  def to_dict( self ) -> Dict[ str, Any ]:
+    return {
+      'name': self.name,
+      'stages': [ dict( entry ) for entry in self.stages ]
+    }
+
+  def log_summary( self ) -> None:
+    logger.info( f"Memory usage of { self.name }:" )
+    for entry in self.stages:
+      logger.info( f"{ entry[ 'stage' ] }: { self._format( entry ) }" )
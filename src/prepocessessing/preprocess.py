@@ -1,17 +1,22 @@
 # System
 import sys
+import argparse
 import logging
 from pathlib import Path
+from typing import Optional, Tuple
 # Database
 from sqlalchemy.engine import Engine
 # Data manipulation
 import pandas as pd
 # Add parent directory to path to import database module
 sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.config import load_config
 from src.database import create_db_engine
-from src.prepocessessing.data_loader import load_data_from_star_schema
-from src.prepocessessing.feature_engineering import engineer_features, select_features
-from src.prepocessessing.resampling import handle_class_imbalance
+from src.prepocessessing.data_loader import load_data_from_star_schema, iter_data_from_star_schema, iter_amounts_from_star_schema, downcast_chunk
+from src.prepocessessing.feature_engineering import FEATURE_COLUMNS, LABEL_DTYPE, engineer_features, select_features
+from src.prepocessessing.feature_pipeline import FeaturePipeline
+from src.prepocessessing.memory_report import MemoryReport
+from src.prepocessessing.processed_store import resolve_processed_location, save_processed
 
 logging.basicConfig( 
   level = logging.INFO,
@@ -20,32 +25,93 @@ logging.basicConfig(
 
 logger = logging.getLogger( __name__ )
 
-def preprocess_data( save_path: str = 'data/processed/preprocessed_data.csv' ) -> pd.DataFrame:
+def fit_feature_pipeline_streaming( engine: Engine, chunk_size: int = 100000 ) -> FeaturePipeline:
+  feature_pipeline = FeaturePipeline()
+  for chunk in iter_amounts_from_star_schema( engine, chunk_size ):
+    feature_pipeline.partial_fit( chunk )
+
+  if not feature_pipeline.is_fitted:
+    raise ValueError( "No transactions found in the star schema" )
+
+  logger.info( f"Feature pipeline fitted on { feature_pipeline.amount_sketch.count } rows (large tx threshold: { feature_pipeline.large_tx_threshold:.2f})" )
+  return feature_pipeline
+
+def build_features_streaming( engine: Engine, feature_pipeline: FeaturePipeline, chunk_size: int = 100000 ) -> Tuple[ pd.DataFrame, pd.Series ]:
+  # Only the typed feature block of each chunk is kept; the raw chunk is dropped before the next one is fetched
+  feature_blocks, label_blocks = [], []
+  for chunk in iter_data_from_star_schema( engine, chunk_size ):
+    feature_blocks.append( feature_pipeline.transform_frame( chunk ) )
+    label_blocks.append( chunk[ 'is_fraud' ].astype( LABEL_DTYPE ) )
+
+  if not feature_blocks:
+    raise ValueError( "No transactions found in the star schema" )
+
+  X = pd.concat( feature_blocks, ignore_index = True )
+  del feature_blocks
+  Y = pd.concat( label_blocks, ignore_index = True )
+
+  logger.info( f"Feature matrix shape: { X.shape }" )
+  return X, Y
+
+def preprocess_data(
+  save_path: Optional[ str ] = None,
+  feature_pipeline_path: str = 'data/processed/feature_pipeline.joblib',
+  refit: Optional[ bool ] = None,
+  streaming: Optional[ bool ] = None,
+  chunk_size: Optional[ int ] = None,
+  output_format: Optional[ str ] = None
+) -> pd.DataFrame:
   try:
     logger.info( "Preprocessing data..." )
 
+    preprocessing_config = load_config().preprocessing
+    streaming = preprocessing_config.streaming if streaming is None else streaming
+    refit = preprocessing_config.refit_feature_pipeline if refit is None else refit
+    chunk_size = chunk_size or preprocessing_config.chunk_size
+    save_path, output_format = resolve_processed_location( save_path, output_format )
+
     engine = create_db_engine()
+    memory = MemoryReport( 'preprocess_data' )
 
-    # Load data
-    df = load_data_from_star_schema( engine )
+    # Fit once; re-runs reuse the saved pipeline (or the one inside a model artifact) unless refit.
+    # It is fitted on every row, the later test split included: the large transaction threshold is
+    # an unsupervised amount quantile that never sees a label, and scoring uses the same fitted pipeline
+    reuse_pipeline = not refit and Path( feature_pipeline_path ).exists()
 
-    # Feature engineering
-    df = engineer_features( df )
+    if streaming:
+      feature_pipeline = FeaturePipeline.load( feature_pipeline_path ) if reuse_pipeline else fit_feature_pipeline_streaming( engine, chunk_size )
+      X, Y = build_features_streaming( engine, feature_pipeline, chunk_size )
+      feature_cols = FEATURE_COLUMNS
+      memory.record( 'features', X, Y )
+    else:
+      # Load data, without the unused account ids and with integer/categorical columns downcast
+      df = downcast_chunk( load_data_from_star_schema( engine, include_account_ids = False ) )
+      memory.record( 'load', df )
 
-    # Feature selection
-    X, Y, feature_cols = select_features( df )
+      feature_pipeline = FeaturePipeline.load( feature_pipeline_path ) if reuse_pipeline else FeaturePipeline().fit( df )
 
-    # Class imbalance handling
-    X_resampled, Y_resampled = handle_class_imbalance( X, Y )
+      # Feature engineering
+      df = engineer_features( df, feature_pipeline.params )
+      memory.record( 'features', df )
 
-    # Save data
-    Path( save_path ).parent.mkdir( parents = True, exist_ok = True )
+      # Feature selection
+      X, Y, feature_cols = select_features( df )
+      del df
+      memory.record( 'selection', X, Y )
+
+    # Class imbalance is handled in develop_model, on the training split only
 
-    # Combine X and Y for saving
-    df_processed = pd.DataFrame( X_resampled, columns = feature_cols )
-    df_processed[ 'is_fraud' ] = Y_resampled.values
+    # Combine X and Y for saving (copy-on-write: the feature columns are not copied)
+    df_processed = pd.DataFrame( X, columns = feature_cols ).assign( is_fraud = Y.to_numpy() )
 
-    df_processed.to_csv( save_path, index = False )
+    # Save data
+    save_processed( df_processed, save_path, output_format )
+    memory.record( 'save', df_processed )
+    memory.log_summary()
+
+    # Also when there was no saved pipeline to reuse, so training can bundle it
+    if not reuse_pipeline:
+      feature_pipeline.save( feature_pipeline_path )
 
     logger.info( f"Data saved to { save_path }" )
     return df_processed
@@ -55,4 +121,8 @@ def preprocess_data( save_path: str = 'data/processed/preprocessed_data.csv' ) -
     raise
 
 if __name__ == "__main__":
-  preprocess_data()
\ No newline at end of file
+  parser = argparse.ArgumentParser( description = "Feature-engineer the star schema into the processed dataset" )
+  parser.add_argument( "--refit", action = "store_true", help = "Fit a new feature pipeline instead of reusing the saved one (preprocessing.refit_feature_pipeline)" )
+  args = parser.parse_args()
+
+  preprocess_data( refit = True if args.refit else None )
\ No newline at end of file
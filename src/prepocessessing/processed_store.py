@@ -0,0 +1,126 @@
+# System
+import sys
+import json
+import logging
+from pathlib import Path
+from typing import Optional, Tuple
+# Data manipulation
+import numpy as np
+import pandas as pd
+
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.config import load_config
+
+logging.basicConfig(
+  level = logging.INFO,
+  format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger( __name__ )
+
+# npy: a directory holding the float32 feature matrix, the labels and a manifest, memory-mapped on load.
+# parquet needs pyarrow (or fastparquet); csv is kept for inspecting the data by hand
+PROCESSED_FORMATS = ( 'npy', 'parquet', 'csv' )
+
+DEFAULT_PROCESSED_PATHS = {
+  'npy': 'data/processed/preprocessed_data',
+  'parquet': 'data/processed/preprocessed_data.parquet',
+  'csv': 'data/processed/preprocessed_data.csv'
+}
+
+LABEL_COLUMN = 'is_fraud'
+
+# The tree models train on float32, so the matrix is stored as they consume it
+MATRIX_DTYPE = np.float32
+
+# Rows converted per block when writing the matrix, to bound the temporary copy
+WRITE_BLOCK_ROWS = 1_000_000
+
+def infer_format( path: str ) -> str:
+  suffix = Path( path ).suffix.lower()
+  if suffix == '.csv':
+    return 'csv'
+  if suffix == '.parquet':
+    return 'parquet'
+  return 'npy'
+
+def resolve_processed_location( path: Optional[ str ] = None, data_format: Optional[ str ] = None ) -> Tuple[ str, str ]:
+  # An explicit path decides the format by its suffix; otherwise both come from config
+  data_config = load_config().data
+  if path is not None:
+    return path, data_format or infer_format( path )
+
+  data_format = data_format or data_config.processed_format
+  if data_format not in PROCESSED_FORMATS:
+    raise ValueError( f"Unknown processed data format: { data_format } (expected one of { PROCESSED_FORMATS })" )
+  return data_config.processed_path or DEFAULT_PROCESSED_PATHS[ data_format ], data_format
+
+def save_processed( df: pd.DataFrame, path: str, output_format: Optional[ str ] = None ) -> None:
+  output_format = output_format or infer_format( path )
+  if output_format not in PROCESSED_FORMATS:
+    raise ValueError( f"Unknown processed data format: { output_format } (expected one of { PROCESSED_FORMATS })" )
+
+  Path( path ).parent.mkdir( parents = True, exist_ok = True )
+
+  if output_format == 'csv':
+    df.to_csv( path, index = False )
+  elif output_format == 'parquet':
+    df.to_parquet( path, index = False )
+  else:
+    _save_npy( df, Path( path ) )
+
+  logger.info( f"Processed data saved to { path } ({ output_format }, { len( df ) } rows)" )
+
+def _save_npy( df: pd.DataFrame, directory: Path ) -> None:
+  directory.mkdir( parents = True, exist_ok = True )
+  feature_names = [ column for column in df.columns if column != LABEL_COLUMN ]
+
+  # Written block by block straight into the file, so no full-size float32 copy is held in RAM
+  feature_frame = df[ feature_names ]
+  features = np.lib.format.open_memmap( directory / 'features.npy', mode = 'w+', dtype = MATRIX_DTYPE, shape = ( len( df ), len( feature_names ) ) )
+  for start in range( 0, len( df ), WRITE_BLOCK_ROWS ):
+    features[ start:start + WRITE_BLOCK_ROWS ] = feature_frame.iloc[ start:start + WRITE_BLOCK_ROWS ].to_numpy( dtype = MATRIX_DTYPE )
+  features.flush()
+  del features
+
+  labels = df[ LABEL_COLUMN ].to_numpy()
+  np.save( directory / 'labels.npy', labels )
+
+  manifest = {
+    'rows': len( df ),
+    'feature_names': feature_names,
+    # Storage dtypes of the columns, so the compact frame can be restored with astype
+    'dtypes': { column: str( df[ column ].dtype ) for column in df.columns },
+    'matrix_dtype': np.dtype( MATRIX_DTYPE ).name
+  }
+  with open( directory / 'manifest.json', 'w' ) as manifest_file:
+    json.dump( manifest, manifest_file, indent = 2 )
+
+def load_processed( path: str, input_format: Optional[ str ] = None, mmap: bool = True ) -> Tuple[ pd.DataFrame, pd.Series ]:
+  input_format = input_format or infer_format( path )
+  if input_format not in PROCESSED_FORMATS:
+    raise ValueError( f"Unknown processed data format: { input_format } (expected one of { PROCESSED_FORMATS })" )
+
+  if input_format == 'npy':
+    return _load_npy( Path( path ), mmap )
+
+  df = pd.read_csv( path ) if input_format == 'csv' else pd.read_parquet( path )
+  logger.info( f"Processed data loaded from { path } ({ input_format }, { len( df ) } rows)" )
+  return df.drop( LABEL_COLUMN, axis = 1 ), df[ LABEL_COLUMN ]
+
+def _load_npy( directory: Path, mmap: bool = True ) -> Tuple[ pd.DataFrame, pd.Series ]:
+  with open( directory / 'manifest.json' ) as manifest_file:
+    manifest = json.load( manifest_file )
+
+  features = np.load( directory / 'features.npy', mmap_mode = 'r' if mmap else None )
+  labels = np.load( directory / 'labels.npy' )
+
+  if features.shape != ( manifest[ 'rows' ], len( manifest[ 'feature_names' ] ) ) or len( labels ) != manifest[ 'rows' ]:
+    raise ValueError( f"Processed data in { directory } does not match its manifest" )
+
+  # A single-dtype frame over the mapped matrix; pages are read from disk as the rows are used
+  X = pd.DataFrame( features, columns = manifest[ 'feature_names' ], copy = False )
+  Y = pd.Series( labels, name = LABEL_COLUMN )
+
+  logger.info( f"Processed data loaded from { directory } (npy{ ', memory-mapped' if mmap else '' }, { manifest[ 'rows' ] } rows)" )
+  return X, Y
@@ -1,11 +1,17 @@
 # System
+import sys
 import logging
+from pathlib import Path
 # Data manipulation
 import pandas as pd
 # Machine Learning
 from imblearn.over_sampling import SMOTE
 from imblearn.under_sampling import RandomUnderSampler
 from imblearn.pipeline import Pipeline
+from sklearn.neighbors import NearestNeighbors
+
+sys.path.append( str( Path( __file__ ).parent.parent.parent ) )
+from src.config import load_config
 
 logging.basicConfig( 
   level = logging.INFO,
@@ -14,7 +20,16 @@ logging.basicConfig(
 
 logger = logging.getLogger( __name__ )
 
-def handle_class_imbalance( X: pd.DataFrame, Y: pd.Series, random_state: int = 42 ) -> tuple[ pd.DataFrame, pd.Series ]:
+def handle_class_imbalance(
+  X: pd.DataFrame,
+  Y: pd.Series,
+  random_state: int = 42,
+  undersample_ratio: float = 0.1,
+  oversample_ratio: float = 1.0,
+  k_neighbors: int = 5,
+  n_jobs: int = -1
+) -> tuple[ pd.DataFrame, pd.Series ]:
+  # Meant for the training split only; the test split keeps the real class balance
   logger.info( "Handling class imbalance..." )
 
   # Original distribution
@@ -22,36 +37,56 @@ def handle_class_imbalance( X: pd.DataFrame, Y: pd.Series, random_state: int = 4
 
   min_samples = original_counts.min()
 
-  if min_samples < 6:
-    logger.warning( f"Minimum samples is less than 6, using 6 as minimum samples" )
-    logger.warning( "SMOTE requires at least 6 samples per class (k_neighbors=6)" )
+  if min_samples < k_neighbors + 1:
+    logger.warning( f"Minority class has { min_samples } samples" )
+    logger.warning( f"SMOTE requires at least { k_neighbors + 1 } samples per class (k_neighbors={ k_neighbors })" )
     logger.warning( "Skipping resampling for small datasets" )
     return X, Y
-    
-  # Define resampling strategy
-  over_sampler = SMOTE( 
-    sampling_strategy = 0.5, # Oversample fraud to 50% of legitimate
-    random_state = random_state 
-  )
-  under_sampler = RandomUnderSampler( 
-    sampling_strategy = 1, # Undersample to 1:1 ratio
-    random_state = random_state 
-  )
 
-  # Create pipeline
-  pipeline = Pipeline( [
-    ( 'over', over_sampler ),
-    ( 'under', under_sampler ),
-  ] )
+  ratio = min_samples / original_counts.max()
+
+  # Undersample first, so SMOTE and the model only ever see a few majority rows per fraud
+  # instead of the whole legitimate class
+  steps = []
+  if ratio < undersample_ratio:
+    steps.append( ( 'under', RandomUnderSampler(
+      sampling_strategy = undersample_ratio, # Keep 1 / undersample_ratio legitimate rows per fraud
+      random_state = random_state
+    ) ) )
+
+  if max( ratio, undersample_ratio ) < oversample_ratio:
+    steps.append( ( 'over', SMOTE(
+      sampling_strategy = oversample_ratio, # Synthesize fraud up to this ratio
+      # SMOTE searches neighbours within the minority class; the tree search runs on n_jobs cores
+      k_neighbors = NearestNeighbors( n_neighbors = k_neighbors + 1, n_jobs = n_jobs ),
+      random_state = random_state
+    ) ) )
+
+  if not steps:
+    logger.info( f"Class ratio { ratio:.3f} already meets the target, skipping resampling" )
+    return X, Y
 
   # Fit and transform data
-  X_resampled, Y_resampled = pipeline.fit_resample( X, Y )
+  X_resampled, Y_resampled = Pipeline( steps ).fit_resample( X, Y )
 
   # New distribution
   resampled_counts = Y_resampled.value_counts()
   logger.info( f"Legitimate: { resampled_counts[ 0 ] }" )
   logger.info( f"Fraud: { resampled_counts[ 1 ] }" )
   logger.info( f"Ratio: { resampled_counts[ 1 ] / resampled_counts[ 0 ] }" )
-  logger.info( f"Total: { resampled_counts[ 0 ] + resampled_counts[ 1 ] }" )
+  logger.info( f"Total: { resampled_counts[ 0 ] + resampled_counts[ 1 ] } (from { len( Y ) })" )
 
-  return X_resampled, Y_resampled
\ No newline at end of file
+  return X_resampled, Y_resampled
+
+def resample_training_split( X: pd.DataFrame, Y: pd.Series, random_state: int = 42 ) -> tuple[ pd.DataFrame, pd.Series ]:
+  # handle_class_imbalance with the ratios from the resampling config section
+  resampling_config = load_config().resampling
+  return handle_class_imbalance(
+    X,
+    Y,
+    random_state = random_state,
+    undersample_ratio = resampling_config.undersample_ratio,
+    oversample_ratio = resampling_config.oversample_ratio,
+    k_neighbors = resampling_config.k_neighbors,
+    n_jobs = resampling_config.n_jobs
+  )
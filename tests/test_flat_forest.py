@@ -0,0 +1,44 @@
+# System
+import sys
+from pathlib import Path
+from typing import Tuple
+# Data manipulation
+import numpy as np
+# Testing
+import pytest
+# Machine Learning
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.append( str( Path( __file__ ).parent.parent ) )
+from src.model_development.flat_forest import FlatForest
+
+@pytest.fixture( scope = 'module' )
+def data() -> Tuple[ np.ndarray, np.ndarray ]:
+  rng = np.random.default_rng( 0 )
+  X = rng.normal( size = ( 2000, 6 ) ).astype( np.float32 )
+  Y = ( X[ :, 0 ] + 0.5 * X[ :, 1 ] + rng.normal( scale = 0.5, size = len( X ) ) > 1 ).astype( int )
+  # Missing values in every column, so the trees learn a missing-value direction per split
+  X[ rng.random( X.shape ) < 0.1 ] = np.nan
+  return X, Y
+
+@pytest.fixture( scope = 'module' )
+def model( data ) -> RandomForestClassifier:
+  X, Y = data
+  return RandomForestClassifier( n_estimators = 5, max_depth = 8, random_state = 0 ).fit( X, Y )
+
+def test_batch_matches_predict_proba( data, model ) -> None:
+  X, _ = data
+  flat_forest = FlatForest.from_model( model )
+  assert np.allclose( flat_forest.predict_proba( X ), model.predict_proba( X ) )
+
+def test_single_row_matches_predict_proba( data, model ) -> None:
+  X, _ = data
+  flat_forest = FlatForest.from_model( model )
+  row = X[ np.isnan( X ).any( axis = 1 ) ][ :1 ]
+  assert np.allclose( flat_forest.predict_proba( row ), model.predict_proba( row ) )
+
+def test_missing_values_unseen_in_training( data ) -> None:
+  X, Y = data
+  model = RandomForestClassifier( n_estimators = 5, max_depth = 8, random_state = 0 ).fit( np.nan_to_num( X ), Y )
+  flat_forest = FlatForest.from_model( model )
+  assert np.allclose( flat_forest.predict_proba( X ), model.predict_proba( X ) )